@@ -11,6 +11,7 @@
 #include <sys/socket.h>
 #include "lwip/sockets.h"
 #include "esp_heap_caps.h"
+#include "esp_wifi.h"
 
 static const char *TAG = "camera_httpd";
 
@@ -59,6 +60,11 @@ static esp_err_t status_handler(httpd_req_t *req){
     p+=sprintf(p, "\"hmirror\":%u,", s->status.hmirror);
     p+=sprintf(p, "\"dcw\":%u,", s->status.dcw);
     p+=sprintf(p, "\"colorbar\":%u", s->status.colorbar);
+    // Link quality for the PC-side rate controller (only available in STA mode)
+    wifi_ap_record_t ap_info;
+    if (esp_wifi_sta_get_ap_info(&ap_info) == ESP_OK) {
+        p+=sprintf(p, ",\"rssi\":%d", ap_info.rssi);
+    }
     *p++ = '}';
     *p++ = 0;
     httpd_resp_set_type(req, "application/json");
@@ -143,6 +149,55 @@ static esp_err_t cmd_handler(httpd_req_t *req){
     return httpd_resp_send(req, NULL, 0);
 }
 
+// ⭐ Binary control protocol (PC_Client/control_protocol.py), little-endian:
+//   HELLO  [ver][0x00]                                        -> echoed back = "binary supported"
+//   CMD    [ver][0x01][flags][seq u32][left i16][right i16][sent_ms u32]
+//   ACK    [ver][0x02][seq u32][sent_ms u32]                  <- sent when flags & 0x01
+#define CTRL_PROTO_VERSION 1
+#define CTRL_TYPE_HELLO    0x00
+#define CTRL_TYPE_CMD      0x01
+#define CTRL_TYPE_ACK      0x02
+#define CTRL_FLAG_ACK      0x01
+#define CTRL_CMD_LEN       15
+
+static esp_err_t ctrl_ws_send_binary(httpd_req_t *req, uint8_t *data, size_t len)
+{
+    httpd_ws_frame_t out;
+    memset(&out, 0, sizeof(out));
+    out.type = HTTPD_WS_TYPE_BINARY;
+    out.final = true;
+    out.payload = data;
+    out.len = len;
+    return httpd_ws_send_frame(req, &out);
+}
+
+static esp_err_t ctrl_ws_handle_binary(httpd_req_t *req, const uint8_t *buf, size_t len)
+{
+    if (len < 2 || buf[0] != CTRL_PROTO_VERSION) {
+        return ESP_OK;  // Unknown version: ignore
+    }
+    if (buf[1] == CTRL_TYPE_HELLO) {
+        uint8_t hello[2] = { CTRL_PROTO_VERSION, CTRL_TYPE_HELLO };
+        return ctrl_ws_send_binary(req, hello, sizeof(hello));
+    }
+    if (buf[1] == CTRL_TYPE_CMD && len >= CTRL_CMD_LEN) {
+        uint8_t flags = buf[2];
+        int16_t left_val, right_val;
+        memcpy(&left_val, buf + 7, sizeof(left_val));    // ESP32 is little-endian
+        memcpy(&right_val, buf + 9, sizeof(right_val));
+        app_motor_set_pwm(left_val, right_val);
+
+        if (flags & CTRL_FLAG_ACK) {
+            // Echo seq + sender timestamp so the PC can measure RTT / loss / reordering
+            uint8_t ack[10] = { CTRL_PROTO_VERSION, CTRL_TYPE_ACK };
+            memcpy(ack + 2, buf + 3, 4);   // seq
+            memcpy(ack + 6, buf + 11, 4);  // sent_ms
+            return ctrl_ws_send_binary(req, ack, sizeof(ack));
+        }
+    }
+    return ESP_OK;
+}
+
 // ⭐ WebSocket Control Handler (Low Latency)
 static esp_err_t ctrl_ws_handler(httpd_req_t *req)
 {
@@ -174,7 +229,9 @@ static esp_err_t ctrl_ws_handler(httpd_req_t *req)
         
         // 3. Get Payload
         ret = httpd_ws_recv_frame(req, &ws_pkt, ws_pkt.len);
-        if (ret == ESP_OK) {
+        if (ret == ESP_OK && ws_pkt.type == HTTPD_WS_TYPE_BINARY) {
+            ret = ctrl_ws_handle_binary(req, buf, ws_pkt.len);
+        } else if (ret == ESP_OK) {
             // 4. Parse JSON (Manual parsing for speed/independence)
             // Expected: {"l":200,"r":200}
             // Logic: Find "l" and "r" keys and parse subsequent integers
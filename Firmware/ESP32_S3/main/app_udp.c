@@ -15,14 +15,24 @@
 #include "esp_netif.h"
 
 #include "app_udp.h"
+#include "app_motor.h"
+#include "esp_timer.h"
 
 static const char *TAG = "app_udp";
 static float g_latest_distance = -1.0;
 static SemaphoreHandle_t xMutexDistance = NULL;
 
 #define PORT 4211
+#define CONTROL_PORT 4212
 #define DISCOVERY_PORT 4213
 
+// UDP chassis packet (PC_Client/udp_control.py):
+// 'R' 'M' 0x10 | seq u32 | left i16 | right i16 | deadline_ms u16 | CRC16-CCITT (LE)
+#define CTRL_UDP_CMD_CHASSIS 0x10
+#define CTRL_UDP_PACKET_LEN  15
+#define CTRL_UDP_RESYNC_US   1000000  // After 1 s of silence accept any seq (PC restarted)
+#define CTRL_UDP_POLL_MS     20
+
 static void udp_broadcast_task(void *pvParameters)
 {
     struct sockaddr_in dest_addr;
@@ -41,10 +51,14 @@ static void udp_broadcast_task(void *pvParameters)
     int broadcast = 1;
     setsockopt(sock, SOL_SOCKET, SO_BROADCAST, &broadcast, sizeof(broadcast));
 
-    char tx_buffer[128];
+    char tx_buffer[192];
     esp_netif_ip_info_t ip_info;
     esp_netif_t *netif = NULL;
 
+    // Stable device ID from the STA MAC so the PC can tell several cars apart
+    uint8_t mac[6] = {0};
+    esp_wifi_get_mac(WIFI_IF_STA, mac);
+
     while (1) {
         // Get IP
         netif = esp_netif_get_handle_from_ifkey("WIFI_STA_DEF");
@@ -53,8 +67,9 @@ static void udp_broadcast_task(void *pvParameters)
 
             if (ip_info.ip.addr != 0) {
                 snprintf(tx_buffer, sizeof(tx_buffer),
-                         "{\"device\": \"esp32-s3-car\", \"ip\": \"" IPSTR "\"}",
-                         IP2STR(&ip_info.ip));
+                         "{\"device\": \"esp32-s3-car\", \"id\": \"car-%02x%02x%02x\", \"ip\": \"" IPSTR "\", "
+                         "\"caps\": [\"stream\", \"ws_control\", \"udp_control\"]}",
+                         mac[3], mac[4], mac[5], IP2STR(&ip_info.ip));
 
                 int err = sendto(sock, tx_buffer, strlen(tx_buffer), 0, (struct sockaddr *)&dest_addr, sizeof(dest_addr));
                 if (err < 0) {
@@ -70,6 +85,89 @@ static void udp_broadcast_task(void *pvParameters)
     vTaskDelete(NULL);
 }
 
+static uint16_t crc16_ccitt(const uint8_t *data, size_t len)
+{
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < len; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (int b = 0; b < 8; b++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+// ⭐ UDP Chassis Control: newest seq wins, stop when the sender's deadline passes
+static void udp_control_task(void *pvParameters)
+{
+    uint8_t rx_buffer[32];
+    struct sockaddr_in bind_addr;
+    bind_addr.sin_addr.s_addr = htonl(INADDR_ANY);
+    bind_addr.sin_family = AF_INET;
+    bind_addr.sin_port = htons(CONTROL_PORT);
+
+    int sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_IP);
+    if (sock < 0) {
+        ESP_LOGE(TAG, "Control: Unable to create socket: errno %d", errno);
+        vTaskDelete(NULL);
+        return;
+    }
+    if (bind(sock, (struct sockaddr *)&bind_addr, sizeof(bind_addr)) < 0) {
+        ESP_LOGE(TAG, "Control: Socket unable to bind: errno %d", errno);
+        close(sock);
+        vTaskDelete(NULL);
+        return;
+    }
+
+    // Short receive timeout so the dead-man check runs even when nothing arrives
+    struct timeval tv = { .tv_sec = 0, .tv_usec = CTRL_UDP_POLL_MS * 1000 };
+    setsockopt(sock, SOL_SOCKET, SO_RCVTIMEO, &tv, sizeof(tv));
+    ESP_LOGI(TAG, "UDP Control listening on port %d", CONTROL_PORT);
+
+    uint32_t last_seq = 0;
+    int64_t last_rx = 0;
+    int64_t deadline_us = 0;
+    bool moving = false;
+
+    while (1) {
+        int len = recv(sock, rx_buffer, sizeof(rx_buffer), 0);
+        int64_t now = esp_timer_get_time();
+
+        if (len == CTRL_UDP_PACKET_LEN && rx_buffer[0] == 'R' && rx_buffer[1] == 'M'
+            && rx_buffer[2] == CTRL_UDP_CMD_CHASSIS) {
+            uint16_t crc;
+            memcpy(&crc, rx_buffer + len - 2, sizeof(crc));  // ESP32 is little-endian
+            if (crc == crc16_ccitt(rx_buffer, len - 2)) {
+                uint32_t seq;
+                int16_t left_val, right_val;
+                uint16_t deadline_ms;
+                memcpy(&seq, rx_buffer + 3, sizeof(seq));
+                memcpy(&left_val, rx_buffer + 7, sizeof(left_val));
+                memcpy(&right_val, rx_buffer + 9, sizeof(right_val));
+                memcpy(&deadline_ms, rx_buffer + 11, sizeof(deadline_ms));
+
+                // Drop late (reordered) packets; wrap-safe compare
+                bool fresh = last_rx == 0 || now - last_rx > CTRL_UDP_RESYNC_US
+                             || (int32_t)(seq - last_seq) > 0;
+                if (fresh) {
+                    last_seq = seq;
+                    last_rx = now;
+                    deadline_us = (int64_t)deadline_ms * 1000;
+                    moving = left_val != 0 || right_val != 0;
+                    app_motor_set_pwm(left_val, right_val);
+                }
+            }
+        }
+
+        // Dead-man: the PC keeps re-sending while moving, silence means the link is gone
+        if (moving && deadline_us > 0 && now - last_rx > deadline_us) {
+            ESP_LOGW(TAG, "UDP control deadline missed, stopping motors");
+            app_motor_set_pwm(0, 0);
+            moving = false;
+        }
+    }
+}
+
 static void udp_server_task(void *pvParameters)
 {
     char rx_buffer[128];
@@ -142,6 +240,7 @@ void app_udp_init(void)
         xMutexDistance = xSemaphoreCreateMutex();
     }
     xTaskCreate(udp_server_task, "udp_server", 4096, NULL, 5, NULL);
+    xTaskCreate(udp_control_task, "udp_control", 4096, NULL, 6, NULL);
     xTaskCreate(udp_broadcast_task, "udp_broadcast", 4096, NULL, 5, NULL);
 }
 
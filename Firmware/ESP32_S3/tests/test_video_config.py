@@ -2,7 +2,7 @@ import sys
 from pathlib import Path
 
 # Ensure the PC_Client directory is on the import path without pulling heavy dependencies
-sys.path.append(str(Path(__file__).resolve().parents[1] / "PC_Client"))
+sys.path.append(str(Path(__file__).resolve().parents[3] / "PC_Client"))
 
 from video_config import build_initial_video_config
 
@@ -22,3 +22,8 @@ def test_build_initial_video_config_uses_expected_keys():
     assert config["camera_ip"] == "10.0.0.5"
     assert config["camera_net_ip"] == "10.0.0.1"
     assert config["ai_enabled"] is True
+    assert config["max_frame_age_ms"] is None
+    assert config["stream_stall_timeout_ms"] is None
+    assert config["frame_ring"] is None
+    assert config["camera_rate_control"] is False
+    assert config["frame_bus_port"] is None
@@ -78,6 +78,13 @@ except ImportError as e:
     print(f"⚠️ 警告: 無法載入 ultralytics ({e})。請確認 'yolov13-main' 資料夾存在或已安裝 'pip install ultralytics'")
     YOLO_AVAILABLE = False
 
+# 標註框顏色 (BGR)，依類別 ID 輪用
+ANNOTATION_COLORS = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (211, 188, 0), (209, 85, 0),
+]
+
+
 class ObjectDetector:
     def __init__(self, model_path='./models/yolov13n.pt'):
         self.model = None
@@ -274,12 +281,42 @@ class ObjectDetector:
 
         return v, w
 
-    def detect(self, frame):
+    def annotate_in_place(self, frame, result):
+        """
+        直接在 frame 上畫出偵測框 (不像 result.plot() 會 deepcopy 整張影像)
+
+        Args:
+            frame: BGR 圖像，會被修改
+            result: YOLO Results
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return frame
+        names = getattr(self.model, 'names', {}) or {}
+        xyxy = boxes.xyxy.cpu().numpy().astype(int)
+        classes = boxes.cls.cpu().numpy().astype(int)
+        confs = boxes.conf.cpu().numpy()
+        ids = boxes.id.cpu().numpy().astype(int) if boxes.id is not None else None
+        for i, (x1, y1, x2, y2) in enumerate(xyxy):
+            cls_id = int(classes[i])
+            color = ANNOTATION_COLORS[cls_id % len(ANNOTATION_COLORS)]
+            label = f"{names.get(cls_id, cls_id)} {confs[i]:.2f}"
+            if ids is not None:
+                label = f"#{ids[i]} {label}"
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            top = max(y1 - th - 4, 0)
+            cv2.rectangle(frame, (x1, top), (x1 + tw + 4, top + th + 4), color, -1)
+            cv2.putText(frame, label, (x1 + 2, top + th + 1), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        return frame
+
+    def detect(self, frame, in_place=False):
         """
         核心偵測方法
         
         Args:
             frame: BGR 圖像 (numpy array)
+            in_place: True 時直接在 frame 上繪製結果 (frame 會被修改，省去整張影像的複製)
             
         Returns:
             (annotated_frame, detections_list, control_cmd)
@@ -314,8 +351,11 @@ class ObjectDetector:
             )
             result = results[0]
             
-            # 2. 繪製結果 (YOLO 內建最快)
-            annotated_frame = result.plot()
+            # 2. 繪製結果 (in_place: 畫在原 buffer 上；否則用 YOLO 內建繪圖，會複製一份)
+            if in_place:
+                annotated_frame = self.annotate_in_place(frame, result)
+            else:
+                annotated_frame = result.plot()
             
             # 3. 計算控制指令
             v, ang_w = self.decide_control(result, w_img, h)
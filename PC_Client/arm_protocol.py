@@ -0,0 +1,102 @@
+"""
+RM 二進位 UDP 協定 (v2.0) 的編解碼與傳送
+
+    'RM' + cmd_id (B) + payload + CRC16-CCITT (<H，poly 0x1021，init 0xFFFF，涵蓋 magic 到 payload)
+
+手臂 (Firmware/ESP8266/esp8266_arm_v2/app_net.cpp) 在 UDP 4211 接收 CMD_SET_ANGLES；
+底盤 UDP 通道 (udp_control) 也使用同一種封包格式。
+
+CRC 改用 ``binascii.crc_hqx`` (C 實作的查表 CRC-CCITT)，結果與韌體逐位元計算相同。
+``ArmSender`` 重複使用同一個 socket，知道手臂 IP 時直接 unicast，只有還沒發現手臂時才廣播。
+"""
+
+import binascii
+import socket
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+MAGIC = b'RM'
+CRC = struct.Struct('<H')
+CMD_SET_ANGLES = 0x03
+ANGLES = struct.Struct('<ffff')  # base, shoulder, elbow, gripper
+ARM_PORT = 4211
+
+
+def crc16(data: bytes) -> int:
+    """CRC16-CCITT (poly 0x1021, init 0xFFFF)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_packet(cmd_id: int, payload: bytes) -> bytes:
+    body = MAGIC + bytes((cmd_id,)) + payload
+    return body + CRC.pack(crc16(body))
+
+
+def decode_packet(packet: bytes) -> Optional[Tuple[int, bytes]]:
+    """驗證 magic 與 CRC，返回 (cmd_id, payload)；不合法返回 None"""
+    if len(packet) < len(MAGIC) + 1 + CRC.size or not packet.startswith(MAGIC):
+        return None
+    body, (crc,) = packet[:-CRC.size], CRC.unpack_from(packet, len(packet) - CRC.size)
+    if crc16(body) != crc:
+        return None
+    return body[len(MAGIC)], body[len(MAGIC) + 1:]
+
+
+def encode_angles(base: float, shoulder: float, elbow: float, gripper: float) -> bytes:
+    return encode_packet(CMD_SET_ANGLES, ANGLES.pack(base, shoulder, elbow, gripper))
+
+
+class ArmSender:
+    """共用一個 UDP socket 送封包給手臂：已知 IP 時 unicast，未知時廣播"""
+
+    def __init__(self, port: int = ARM_PORT, broadcast_address: str = '<broadcast>'):
+        self.port = port
+        self.broadcast_address = broadcast_address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.lock = threading.Lock()
+        self.unicast = 0
+        self.broadcast = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def send(self, packet: bytes, target_ip: Optional[str] = None) -> bool:
+        """
+        Args:
+            packet: 完整封包 (encode_packet 的結果或其他手臂格式)
+            target_ip: 手臂 IP；None 時廣播
+        """
+        if target_ip:
+            try:
+                self.sock.sendto(packet, (target_ip, self.port))
+                with self.lock:
+                    self.unicast += 1
+                return True
+            except OSError as e:
+                # 位址失效 (例如手臂換了 IP)：這一個封包改用廣播，等 discovery 更新 arm_ip
+                self._error(e)
+        try:
+            self.sock.sendto(packet, (self.broadcast_address, self.port))
+            with self.lock:
+                self.broadcast += 1
+            return True
+        except OSError as e:
+            self._error(e)
+            return False
+
+    def _error(self, e: OSError):
+        with self.lock:
+            self.errors += 1
+            self.last_error = str(e)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "unicast": self.unicast,
+            "broadcast": self.broadcast,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,90 @@
+"""
+手臂指令的 send-on-change 串流
+
+原本手把線程不論搖桿有沒有動，每 100 ms 都送一次完整的 ``<ffff`` 封包；網頁滑桿也會
+重複送出相同的角度。多餘的封包佔用與影像共用的 Wi-Fi airtime，伺服馬達也會因為
+重複更新而抖動。
+
+``ArmStream`` 記住上一次「實際送出」的角度：
+- 任一關節與上次送出的差距超過該關節的 epsilon 才送 (變化)，且兩次之間至少間隔 1 / max_rate
+- 靜止時每 keepalive 秒補送一次目前角度 (手臂重開機 / 封包遺失後仍會收斂)
+所以移動中最多 max_rate (預設 12.5 Hz，20 Hz 的手把迴圈約每兩輪送一次)，靜止時降到 keepalive 頻率。
+送出失敗時呼叫端要 reset()，否則下一次 offer 會和沒送到的角度比較而被略過。
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+JOINTS = ('b', 's', 'e', 'g')  # base, shoulder, elbow, gripper (與 state.arm_angles 相同)
+
+
+class ArmStream:
+    """決定手臂角度是否需要送出 (多個線程共用一個實例)"""
+
+    def __init__(self,
+                 epsilon: Union[float, Sequence[float]] = (0.5, 0.5, 0.5, 1.0),
+                 max_rate: float = 12.5,
+                 keepalive: float = 1.0):
+        """
+        Args:
+            epsilon: 每個關節 (b, s, e, g) 視為「有變化」的最小角度差；單一數值套用到全部關節
+            max_rate: 移動中每秒最多送出幾次
+            keepalive: 角度不變時多久補送一次 (秒，0 = 不補送)
+        """
+        if isinstance(epsilon, (int, float)):
+            epsilon = (float(epsilon),) * len(JOINTS)
+        self.epsilon = tuple(epsilon)
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._last: Optional[Tuple[float, ...]] = None
+        self._last_send = 0.0
+
+        self.changes = 0
+        self.keepalives = 0
+        self.skipped = 0
+
+    def offer(self, angles: Sequence[float], now: Optional[float] = None, throttle: bool = True) -> Optional[str]:
+        """
+        提出目前的目標角度；需要送出時記錄為已送並返回原因 ('change' / 'keepalive')，否則返回 None
+
+        throttle=False 時變化不受 max_rate 限制：單發的指令 (網頁滑桿) 之後未必還有下一次
+        offer，被節流掉的最終位置就永遠不會送出；手把迴圈則會在下一輪補上。
+        """
+        now = now if now is not None else time.monotonic()
+        angles = tuple(float(a) for a in angles)
+        with self._lock:
+            elapsed = now - self._last_send
+            if self._last is None:
+                reason = 'change'
+            elif any(abs(a - b) > eps for a, b, eps in zip(angles, self._last, self.epsilon)):
+                reason = 'change' if not throttle or elapsed >= self.min_interval else None
+            elif self.keepalive > 0 and elapsed >= self.keepalive:
+                reason = 'keepalive'
+            else:
+                reason = None
+
+            if reason is None:
+                self.skipped += 1
+                return None
+            self._last = angles
+            self._last_send = now
+            if reason == 'change':
+                self.changes += 1
+            else:
+                self.keepalives += 1
+            return reason
+
+    def reset(self):
+        """下一次 offer 一定送出 (例如手臂 IP 改變後、上一個封包沒送出去)"""
+        with self._lock:
+            self._last = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "changes": self.changes,
+            "keepalives": self.keepalives,
+            "skipped": self.skipped,
+            "last": dict(zip(JOINTS, self._last)) if self._last else None,
+        }
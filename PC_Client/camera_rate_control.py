@@ -0,0 +1,271 @@
+"""
+ESP32 相機閉迴路碼率控制 (framesize / JPEG quality)
+
+在影像進程裡定期讀取 MJPEGStreamReader 的統計 (實際幀率、平均幀大小、停滯 / 重連次數)
+以及 ESP32 /status 回報的 RSSI，透過 /control 調整 framesize 與 quality，維持目標幀率。
+車子開離 AP 時畫質逐步下降，而不是整條串流卡住。
+
+遲滯設計：
+- 降階：單一量測窗不合格就降 (每次變更後至少等一個窗，讓相機套用新設定)
+- 升階：連續合格 upgrade_after 秒才升；升上去後很快又降下來，該階的等待時間加倍 (上限 max_hold)
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# (framesize, quality) 由好到差；ESP32 quality 數字越大畫質越差、幀越小
+# framesize: 9=SVGA 800x600, 8=VGA 640x480, 7=HVGA 480x320, 5=QVGA 320x240
+RATE_LADDER: Tuple[Tuple[int, int], ...] = (
+    (9, 12), (9, 18), (8, 15), (8, 22), (7, 20), (5, 20), (5, 30),
+)
+
+
+class CameraRateController:
+    """依串流統計調整 ESP32 framesize / quality (所有 HTTP 都在背景線程，不阻塞影像迴圈)"""
+
+    def __init__(self,
+                 target_fps: float = 20.0,
+                 window: float = 2.0,
+                 upgrade_after: float = 10.0,
+                 max_hold: float = 120.0,
+                 weak_rssi: int = -75,
+                 ladder: Tuple[Tuple[int, int], ...] = RATE_LADDER,
+                 send: Optional[Callable[[str, int], bool]] = None,
+                 fetch_status: Optional[Callable[[], Optional[dict]]] = None,
+                 status_interval: float = 5.0,
+                 control_port: int = 80,
+                 log_callback: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            target_fps: 目標幀率；低於 80% 視為不合格
+            window: 量測窗長度 (秒)
+            upgrade_after: 連續合格多久才升一階 (秒)
+            max_hold: 升階等待時間加倍的上限 (秒)
+            weak_rssi: RSSI 低於此值 (dBm) 時不升階，並視為不合格
+            ladder: (framesize, quality) 階梯，由好到差
+            send: send(var, val) -> bool，預設為 HTTP /control (需先 set_host)
+            fetch_status: fetch_status() -> dict，預設為 HTTP /status
+            status_interval: 讀取 /status (RSSI、目前設定) 的間隔 (秒)
+            control_port: /control 與 /status 所在的 port (串流在 81)
+        """
+        self.target_fps = target_fps
+        self.window = window
+        self.upgrade_after = upgrade_after
+        self.max_hold = max_hold
+        self.weak_rssi = weak_rssi
+        self.ladder = ladder
+        self.status_interval = status_interval
+        self.control_port = control_port
+        self.log = log_callback or print
+        self._send = send or self._http_send
+        self._fetch_status = fetch_status or self._http_status
+
+        self.enabled = True
+        self.level = 0
+        self.rssi: Optional[int] = None
+        self.last_window: Dict[str, float] = {}
+        self.adjustments = 0
+        self._adopt_pending = True  # 下次讀到 /status 時從相機實際設定接手
+        self._hold = [upgrade_after] * len(ladder)
+        self._window_start = None
+        self._window_stats = None
+        self._good_since = None
+        self._last_change = 0.0
+        self._last_upgrade = None
+        self._last_upgrade_level = 0
+
+        self.host = None
+        self._session = None
+        self._source_ip = None
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._last_status = 0.0
+
+    # ------------------------------------------------------------------
+    # Wiring
+    # ------------------------------------------------------------------
+    def set_host(self, stream_url: str, source_ip: Optional[str] = None):
+        """以串流 URL 的主機為 /control 目標 (port 為 control_port)"""
+        host = urlparse(stream_url).hostname if stream_url and '://' in stream_url else None
+        if host and self.control_port != 80:
+            host = f"{host}:{self.control_port}"
+        if host != self.host:
+            self.host = host
+            self._source_ip = source_ip
+            self._session = None
+            self._last_status = 0.0
+
+    def start(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        if self._worker is not None:
+            self._jobs.put(None)
+            self._worker.join(timeout=3)
+            self._worker = None
+
+    def reset_window(self):
+        """重新開始量測 (串流暫停 / 切換來源後，避免把空窗當成低幀率)"""
+        self._window_start = None
+        self._good_since = None
+
+    def set_enabled(self, enabled: bool):
+        """手動調整相機設定時停用，之後重新啟用會從 /status 的實際設定接手"""
+        self.enabled = bool(enabled)
+        self._adopt_pending = self.enabled
+        self._window_start = None
+        self._good_since = None
+        self._last_status = 0.0
+        self.log(f"📶 Camera rate control {'enabled' if enabled else 'disabled'}")
+
+    # ------------------------------------------------------------------
+    # Control loop (called from the video loop; cheap, never blocks)
+    # ------------------------------------------------------------------
+    def update(self, reader_stats: Optional[dict], now: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        以 reader.stats 的累計值更新量測窗；窗結束時決定是否換階
+
+        Returns:
+            換階時返回新的 (framesize, quality)，否則 None
+        """
+        now = now if now is not None else time.time()
+        if self._worker is not None and now - self._last_status >= self.status_interval:
+            self._last_status = now
+            self._jobs.put(('status', None))
+        if not self.enabled or reader_stats is None:
+            return None
+
+        snapshot = (reader_stats.get('frames', 0), reader_stats.get('bytes', 0),
+                    reader_stats.get('stalls', 0) + reader_stats.get('failed_connects', 0),
+                    reader_stats.get('connects', 0))
+        if self._window_start is None:
+            self._window_start, self._window_stats = now, snapshot
+            return None
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return None
+
+        frames, nbytes, link_errors, connects = (a - b for a, b in zip(snapshot, self._window_stats))
+        self._window_start, self._window_stats = now, snapshot
+        fps = frames / elapsed
+        self.last_window = {
+            'fps': round(fps, 1),
+            'kbps': round(nbytes * 8 / elapsed / 1000, 1),
+            'avg_frame_kb': round(nbytes / frames / 1024, 1) if frames else 0.0,
+            'link_errors': link_errors + max(0, connects - 1),
+        }
+        weak_signal = self.rssi is not None and self.rssi < self.weak_rssi
+        bad = fps < self.target_fps * 0.8 or self.last_window['link_errors'] > 0 or weak_signal
+        good = fps >= self.target_fps * 0.95 and not self.last_window['link_errors'] and not weak_signal
+
+        if bad:
+            self._good_since = None
+            if self.level < len(self.ladder) - 1 and now - self._last_change >= self.window:
+                if self._last_upgrade is not None and now - self._last_upgrade < self._hold[self._last_upgrade_level]:
+                    # 剛升上來就撐不住：下次要在這一階等更久
+                    level = self._last_upgrade_level
+                    self._hold[level] = min(self._hold[level] * 2, self.max_hold)
+                self._last_upgrade = None
+                return self._apply(self.level + 1, now, 'degrade')
+        elif good:
+            if self._good_since is None:
+                self._good_since = now
+            elif self.level > 0 and now - self._good_since >= self._hold[self.level - 1]:
+                self._good_since = now
+                self._last_upgrade = now
+                self._last_upgrade_level = self.level - 1
+                return self._apply(self.level - 1, now, 'upgrade')
+        else:
+            self._good_since = None
+        return None
+
+    def _apply(self, level: int, now: float, reason: str) -> Tuple[int, int]:
+        old = self.ladder[self.level]
+        self.level = level
+        self._last_change = now
+        framesize, quality = self.ladder[level]
+        self.adjustments += 1
+        self.log(f"📶 Camera {reason}: framesize {old[0]}->{framesize}, quality {old[1]}->{quality} "
+                 f"(fps {self.last_window.get('fps')}, rssi {self.rssi})")
+        if framesize != old[0]:
+            self._jobs.put(('control', ('framesize', framesize)))
+        if quality != old[1]:
+            self._jobs.put(('control', ('quality', quality)))
+        if self._worker is None:
+            self._drain_jobs()
+        return framesize, quality
+
+    def adopt(self, framesize: int, quality: int):
+        """把相機目前的實際設定對應到最接近的階 (啟動時 / 手動調整後)"""
+        def distance(entry):
+            return abs(entry[0] - framesize) * 10 + abs(entry[1] - quality)
+        self.level = min(range(len(self.ladder)), key=lambda i: distance(self.ladder[i]))
+
+    def stats(self) -> Dict[str, object]:
+        framesize, quality = self.ladder[self.level]
+        return {'enabled': self.enabled, 'level': self.level, 'framesize': framesize,
+                'quality': quality, 'rssi': self.rssi, **self.last_window}
+
+    # ------------------------------------------------------------------
+    # Background HTTP
+    # ------------------------------------------------------------------
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _drain_jobs(self):
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                self._run_job(job)
+
+    def _run_job(self, job):
+        kind, payload = job
+        try:
+            if kind == 'control':
+                var, val = payload
+                if not self._send(var, val):
+                    self.log(f"⚠️ Camera /control {var}={val} failed")
+            elif kind == 'status':
+                status = self._fetch_status()
+                if status:
+                    self.rssi = status.get('rssi')
+                    if self._adopt_pending and 'framesize' in status and 'quality' in status:
+                        self._adopt_pending = False
+                        self.adopt(int(status['framesize']), int(status['quality']))
+        except Exception as e:
+            self.log(f"⚠️ Camera rate control error: {e}")
+
+    def _http_session(self):
+        if self._session is None:
+            import requests
+            session = requests.Session()
+            if self._source_ip:
+                from network_utils import SourceAddressAdapter
+                session.mount('http://', SourceAddressAdapter(self._source_ip))
+            self._session = session
+        return self._session
+
+    def _http_send(self, var: str, val: int) -> bool:
+        if not self.host:
+            return False
+        resp = self._http_session().get(f"http://{self.host}/control",
+                                        params={'var': var, 'val': val}, timeout=2)
+        return resp.status_code == 200
+
+    def _http_status(self) -> Optional[dict]:
+        if not self.host:
+            return None
+        resp = self._http_session().get(f"http://{self.host}/status", timeout=2)
+        return resp.json() if resp.status_code == 200 else None
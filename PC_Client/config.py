@@ -16,6 +16,32 @@ FALLBACK_IPS = [
     "10.28.14.133",
 ]
 
+# ========= 🎥 影像管線設定 =========
+# 影格最大年齡 (ms)：在 decode / AI 推論 / encode / 推送前檢查，過期直接丟棄
+# 遙控時新鮮的畫面比完整的序列更重要；設為 0 可停用
+MAX_FRAME_AGE_MS = 250
+# 影像進程 -> web server 的 shared memory JPEG 槽位大小 (SVGA q=12 約 30-60 KB，超過改走 queue)
+FRAME_RING_SLOT_SIZE = 512 * 1024
+# 沒有人觀看 /video_feed (且 AI 關閉) 超過此秒數就暫停讀取 ESP32 串流 (None = 永不暫停)
+STREAM_IDLE_GRACE_S = 10.0
+# /video_feed 自動畫質：每幀傳送延遲目標 (毫秒)，以及每個 client 的 socket send buffer 上限
+# (send buffer 太大時，慢速連線會在 kernel 裡累積數秒的舊畫面)
+STREAM_TARGET_LATENCY_MS = 150
+STREAM_SNDBUF_BYTES = 64 * 1024
+# ESP32 相機閉迴路碼率控制：依實際幀率 / 重連 / RSSI 自動調整 framesize 與 quality
+# (手動從 /api/camera_settings 調整 framesize / quality 時會自動停用，auto_rate=1 重新啟用)
+CAMERA_RATE_CONTROL = True
+CAMERA_TARGET_FPS = 15.0
+# 本機 frame bus (127.0.0.1)：錄影 / 校正工具訂閱畫面，不必再連一次 ESP32 (None = 停用)
+FRAME_BUS_PORT = 8765
+# 串流超過此毫秒數沒有完整幀就判定停滯並立即重連 (0 = 停用)
+STREAM_STALL_TIMEOUT_MS = 600
+
+# 原始串流錄影 (資料夾或檔名，None = 不錄)，用於事後重現卡頓或 AI 漏偵測
+STREAM_RECORD_PATH = os.getenv("STREAM_RECORD_PATH") or None
+# 以錄影檔取代 ESP32 串流 (例如 "replay://recordings/stream_20251209_120000.mjpg")
+STREAM_REPLAY_URL = os.getenv("STREAM_REPLAY_URL") or None
+
 # Arduino CLI 路徑 (燒錄用)
 SKETCH_DIR = "../Firmware/esp32s3_integrated"
 SKETCH_NAME = "esp32s3_integrated.ino"
@@ -29,6 +55,41 @@ BAUD_RATE = 115200
 # ========= 網頁伺服器設定 =========
 WEB_HOST = "0.0.0.0"  # 允許從區域網路連線
 WEB_PORT = 5000
+# Web 層執行模式："threading" (werkzeug，每個連線一個線程) / "gevent" / "eventlet"
+# (事件迴圈，觀看者與 SocketIO client 多時較省資源；需另外 pip install gevent 或 eventlet)
+SERVER_MODE = os.getenv("SERVER_MODE", "threading").lower()
+# 狀態推播的合併窗 (毫秒)：每個窗最多推一次，只送有變化的欄位與新的 log
+STATUS_COALESCE_MS = 50
+# 系統 log：環形 buffer 行數、console 批次輸出間隔、每個來源 ([TAG]) 的限速
+LOG_RING_SIZE = 256
+LOG_FLUSH_MS = 200
+LOG_RATE_PER_SOURCE = 10.0   # 行/秒
+LOG_BURST_PER_SOURCE = 20
+# 底盤指令派送：最高送出頻率 (停車指令不受限)、指令等待超過此毫秒數才送出時計入 late
+CONTROL_MAX_RATE_HZ = 12.5
+CONTROL_DEADLINE_MS = 250
+# /ws/control 心跳：每隔此毫秒數 ping，連續 N 個間隔沒有回應就改走 HTTP /motor 並在背景重連
+CONTROL_WS_HEARTBEAT_MS = 200
+CONTROL_WS_HEARTBEAT_MISSES = 3
+# 底盤指令傳輸："ws" (/ws/control，斷線時改走 HTTP) / "udp" (RM 封包，韌體需支援 UDP 控制) / "http" (只用 /motor)
+CONTROL_TRANSPORT = os.getenv("CONTROL_TRANSPORT", "ws").lower()
+# UDP 底盤通道：裝置 port、keepalive 間隔、裝置端 dead-man 時間 (超過沒收到封包就停車)
+CONTROL_UDP_PORT = 4212
+CONTROL_UDP_KEEPALIVE_MS = 100
+CONTROL_UDP_DEADLINE_MS = 300
+# 手臂指令只在角度變化時送出：各關節 (base, shoulder, elbow, gripper) 的變化門檻 (度)、
+# 移動中最高送出頻率 (低於 20 Hz 的手把迴圈才有節流效果)、靜止時的 keepalive 間隔 (秒)
+ARM_EPSILON_DEG = (0.5, 0.5, 0.5, 1.0)
+ARM_MAX_RATE_HZ = 12.5
+ARM_KEEPALIVE_S = 1.0
+# 裝置註冊表：超過此秒數沒有 beacon 視為離線 (beacon 每 3 秒一次)
+DEVICE_TTL_S = 10.0
+# 同一網段有多台車 / 手臂時，控制與影像只跟隨這個裝置 ID (None = 第一個出現的裝置，見 /api/devices)
+CAR_DEVICE_ID = os.getenv("CAR_DEVICE_ID") or None
+ARM_DEVICE_ID = os.getenv("ARM_DEVICE_ID") or None
+# /api/snapshot：?after= long-poll 最長等待秒數 / 串流暫停中時等待第一幀的秒數
+SNAPSHOT_LONG_POLL_S = 10.0
+SNAPSHOT_FIRST_FRAME_WAIT_S = 3.0
 
 # ========= 遙控指令 =========
 CMD_FORWARD = 'F'
@@ -0,0 +1,227 @@
+"""
+ESP32 /ws/control 的低延遲控制 client
+
+連線後以 HELLO 協商二進位協定 (見 control_protocol)；裝置支援時每個指令都帶序號與
+時間戳，裝置回 ACK，``stats()`` 提供實際 RTT、遺失與亂序。舊韌體不回 HELLO，
+維持 JSON 文字 frame。
+
+心跳：每 heartbeat_interval 送一次 WebSocket ping (ESP-IDF httpd 自動回 pong)。
+連續 miss_threshold 個間隔沒有收到任何 frame 就判定連線已死：``connected`` 立刻變 False，
+send() 失敗，呼叫端當場改走 HTTP /motor，背景重連成功後自動切回 WebSocket。
+half-open 的 Wi-Fi 連線上 recv() 可能好幾秒都不會出錯，不能只靠它偵測斷線。
+"""
+
+import json
+import struct
+import threading
+import time
+
+import websocket
+
+import control_protocol as proto
+from network_utils import race_first
+
+
+# ⭐ WebSocket Client for Low Latency Control
+class AsyncControlClient:
+    def __init__(self, target_ip, fallback_ips=(), hello_timeout=0.3, request_acks=True,
+                 heartbeat_interval=0.2, miss_threshold=3, reconnect_delay=0.5):
+        """
+        Args:
+            target_ip: 裝置位址 (可含 port，例如模擬器的 "127.0.0.1:8080")
+            fallback_ips: 裝置可能出現的其他位址 (AP/STA 切換)，連線時一起競速
+            hello_timeout: 等待 HELLO 回應的秒數，逾時則使用 JSON
+            request_acks: 二進位模式下是否要求裝置回 ACK
+            heartbeat_interval: ping 間隔 (秒，0 = 停用心跳)
+            miss_threshold: 連續幾個間隔沒有收到任何 frame 就判定斷線
+            reconnect_delay: 斷線後多久重連 (秒)
+        """
+        self.target_ip = target_ip
+        self.ws_url = f"ws://{target_ip}/ws/control"
+        # Other hosts the car may answer on (AP/STA switch); raced against target_ip on connect
+        self.fallback_ips = [ip for ip in fallback_ips if ip and ip != target_ip]
+        self.hello_timeout = hello_timeout
+        self.request_acks = request_acks
+        self.connected_ip = None
+        self.ws = None
+        self.connected = False
+        self.protocol = None  # 'binary' / 'json' once connected
+        self.link = proto.LinkStats()
+        self.heartbeat_interval = heartbeat_interval
+        self.miss_threshold = max(1, miss_threshold)
+        self.reconnect_delay = reconnect_delay
+        self.lock = threading.Lock()
+        self.running = True
+        self._seq = 0
+
+        # Liveness / path accounting
+        self._last_rx = 0.0
+        self.ping_rtt = None          # 最近一次 ping -> pong (秒)
+        self.heartbeat_failures = 0   # 心跳判定斷線的次數
+        self.failovers = 0            # WebSocket -> HTTP 的切換次數
+        self.path_seconds = {"ws": 0.0, "http": 0.0}
+        self._path_since = time.monotonic()
+
+        # Start background worker
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+        if self.heartbeat_interval > 0:
+            threading.Thread(target=self._heartbeat, daemon=True).start()
+
+    def _set_connected(self, connected):
+        """Flip the active path and account the time spent on the previous one."""
+        with self.lock:
+            if connected == self.connected:
+                return
+            now = time.monotonic()
+            self.path_seconds["ws" if self.connected else "http"] += now - self._path_since
+            self._path_since = now
+            self.connected = connected
+            if not connected:
+                self.failovers += 1
+
+    def _worker(self):
+        print(f"[WS] Worker started for {self.ws_url}")
+        while self.running:
+            try:
+                # 1. Connect (race target against fallback hosts)
+                self.ws, self.connected_ip = self._connect()
+                self.protocol = self._negotiate(self.ws)
+
+                self._last_rx = time.monotonic()
+                self._set_connected(True)
+                print(f"[WS] ✅ Connected to {self.connected_ip} ({self.protocol})")
+
+                # 2. Receive Loop (ACKs, pongs); dead links are caught by the heartbeat, not here
+                self.ws.settimeout(None)
+                while self.running:
+                    try:
+                        opcode, data = self.ws.recv_data(control_frame=True)
+                    except (websocket.WebSocketException, ConnectionError, OSError):
+                        if self.connected:
+                            print("[WS] ⚠️ Connection Lost")
+                        break
+                    self._last_rx = time.monotonic()
+                    if opcode == websocket.ABNF.OPCODE_CLOSE:
+                        print("[WS] ⚠️ Connection Closed by device")
+                        break
+                    if opcode == websocket.ABNF.OPCODE_BINARY:
+                        self._on_binary(data)
+                    elif opcode == websocket.ABNF.OPCODE_PONG and len(data) == 8:
+                        self.ping_rtt = time.monotonic() - struct.unpack('<d', data)[0]
+
+            except Exception as e:
+                # print(f"[WS] Connection Failed: {e}") # Reduce noise
+                time.sleep(1) # Retry delay
+            finally:
+                self._set_connected(False)
+                if self.ws:
+                    try: self.ws.close()
+                    except: pass
+                # Reconnect delay (HTTP carries the commands meanwhile)
+                time.sleep(self.reconnect_delay)
+
+    def _heartbeat(self):
+        """Ping every interval; silence for miss_threshold intervals means the link is dead."""
+        while self.running:
+            time.sleep(self.heartbeat_interval)
+            ws = self.ws
+            if not self.connected or ws is None:
+                continue
+            silence = time.monotonic() - self._last_rx
+            if silence > self.heartbeat_interval * self.miss_threshold:
+                self.heartbeat_failures += 1
+                print(f"[WS] 💔 No response for {silence * 1000:.0f} ms, switching to HTTP")
+                self._drop(ws)
+                continue
+            try:
+                ws.ping(struct.pack('<d', time.monotonic()))
+            except Exception:
+                self._drop(ws)
+
+    def _drop(self, ws):
+        """Fail over right away; abort() wakes the receive loop, which then reconnects."""
+        self._set_connected(False)
+        try:
+            ws.abort()
+        except Exception:
+            pass
+
+    def _connect(self):
+        """Open the control WebSocket; with fallbacks, the first host to answer wins."""
+        hosts = [self.target_ip] + self.fallback_ips
+
+        def attempt(host):
+            def run():
+                ws = websocket.WebSocket()
+                ws.connect(f"ws://{host}/ws/control", timeout=1.0)
+                return ws
+            return run
+
+        if len(hosts) == 1:
+            return attempt(self.target_ip)(), self.target_ip
+
+        winner = race_first([attempt(h) for h in hosts], 1.5, cleanup=lambda ws: ws.close())
+        if winner is None:
+            raise ConnectionError(f"No control host answered ({', '.join(hosts)})")
+        index, ws = winner
+        return ws, hosts[index]
+
+    def _negotiate(self, ws):
+        """Send HELLO; a device that answers HELLO speaks the binary protocol."""
+        ws.send_binary(proto.encode_hello())
+        ws.settimeout(self.hello_timeout)
+        deadline = time.time() + self.hello_timeout
+        try:
+            while time.time() < deadline:
+                opcode, data = ws.recv_data()
+                if opcode == websocket.ABNF.OPCODE_BINARY and proto.decode(data) == ('hello',):
+                    return 'binary'
+        except websocket.WebSocketTimeoutException:
+            pass
+        return 'json'
+
+    def _on_binary(self, data):
+        message = proto.decode(data)
+        if message and message[0] == 'ack':
+            self.link.on_ack(message[1])
+
+    def send(self, left, right):
+        if not self.connected:
+            return False
+
+        try:
+            with self.lock:
+                if self.protocol == 'binary':
+                    self._seq = (self._seq + 1) & 0xFFFFFFFF
+                    if self.request_acks:
+                        self.link.on_send(self._seq)  # Before sending: on a fast link the ACK can beat us back
+                    self.ws.send_binary(proto.encode_command(self._seq, left, right, ack=self.request_acks))
+                else:
+                    self.ws.send(json.dumps({"l": left, "r": right}))
+            return True
+        except Exception as e:
+            print(f"[WS] Send Error: {e}")
+            return False
+
+    def stats(self):
+        with self.lock:
+            paths = dict(self.path_seconds)
+            paths["ws" if self.connected else "http"] += time.monotonic() - self._path_since
+        stats = {
+            "connected": self.connected,
+            "host": self.connected_ip,
+            "protocol": self.protocol,
+            "ping_rtt_ms": round(self.ping_rtt * 1000, 1) if self.ping_rtt is not None else None,
+            "heartbeat_failures": self.heartbeat_failures,
+            "failovers": self.failovers,
+            "ws_seconds": round(paths["ws"], 1),
+            "http_seconds": round(paths["http"], 1),
+        }
+        if self.protocol == 'binary':
+            stats.update(self.link.stats())
+        return stats
+
+    def close(self):
+        self.running = False
+        if self.ws: self.ws.close()
@@ -0,0 +1,127 @@
+"""
+底盤馬達指令派送 (latest-wins)
+
+原本 send_control_command 在 SocketIO handler / /api/control 的線程上同步送出，
+HTTP 又帶 Retry(total=3)，會把已經過時的指令重送；MIN_CMD_INTERVAL 節流則是直接丟掉「最新」的指令。
+
+改為單一派送線程：
+- 只保留最新的 (left, right)；送出前被新指令取代的舊指令直接作廢
+- 最高送出頻率 max_rate；停車 (0, 0) 不等節流，立刻送
+- 被取代的舊指令才丟棄；最新的指令即使等待超過 deadline (前一次送出很慢) 也照送，只記為 late。
+  呼叫端只在數值改變時 submit，丟掉最新的指令會讓車子一直執行更舊的指令
+- submit() 立即返回，下一個送出的一定是最新的意圖
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+class ControlDispatcher:
+    """在背景線程以固定最高頻率送出最新的馬達指令"""
+
+    def __init__(self,
+                 send: Callable[[int, int], bool],
+                 max_rate: float = 12.5,
+                 deadline: float = 0.25,
+                 log_callback: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            send: send(left, right) -> bool，實際送出 (WS / HTTP)，在派送線程上呼叫
+            max_rate: 每秒最多送出幾次 (停車指令不受限)
+            deadline: 指令從 submit 到送出的預期上限 (秒)，超過仍會送出但計入 late
+        """
+        self._send = send
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.deadline = deadline
+        self.log = log_callback or print
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[int, int, float]] = None
+        self._last_send = 0.0
+        self._thread = None
+        self.running = False
+
+        self.submitted = 0
+        self.superseded = 0   # 送出前就被新指令取代
+        self.late = 0         # 超過 deadline 才送出 (仍是最新的指令)
+        self.sent = 0
+        self.failed = 0
+        self.last_sent: Optional[Tuple[int, int]] = None
+        self.last_ok: Optional[bool] = None
+        self.last_latency = 0.0  # 最近一次 submit -> 送出完成 (秒)
+
+    def start(self) -> 'ControlDispatcher':
+        if not self.running:
+            self.running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def submit(self, left: int, right: int):
+        """設定最新的目標值並立即返回"""
+        with self._cond:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = (int(left), int(right), time.monotonic())
+            self.submitted += 1
+            self._cond.notify()
+
+    def _next_command(self) -> Optional[Tuple[int, int, float]]:
+        """等到有指令且節流時間已到 (停車指令不等)；停止時返回 None"""
+        with self._cond:
+            while self.running:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                left, right, _ = self._pending
+                wait = self._last_send + self.interval - time.monotonic()
+                if wait > 0 and (left, right) != (0, 0):
+                    # 等待期間來的新指令會取代 pending；停車指令會把這裡叫醒
+                    self._cond.wait(timeout=wait)
+                    continue
+                command, self._pending = self._pending, None
+                return command
+        return None
+
+    def _run(self):
+        while True:
+            command = self._next_command()
+            if command is None:
+                return
+            left, right, submitted_at = command
+            now = time.monotonic()
+            # 取出的一定是最新的意圖 (較舊的已被 submit 取代)，過了 deadline 也要送
+            if now - submitted_at > self.deadline:
+                self.late += 1
+            self._last_send = now
+            try:
+                ok = bool(self._send(left, right))
+            except Exception as e:
+                self.log(f"[CONTROL] ❌ Dispatch error: {e}")
+                ok = False
+            self.last_sent = (left, right)
+            self.last_ok = ok
+            self.last_latency = time.monotonic() - submitted_at
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "failed": self.failed,
+            "superseded": self.superseded,
+            "late": self.late,
+            "last_sent": self.last_sent,
+            "last_latency_ms": round(self.last_latency * 1000, 1),
+        }
@@ -0,0 +1,146 @@
+"""
+/ws/control 的二進位控制協定
+
+原本每個指令都是 ``json.dumps({"l": .., "r": ..})`` 文字 frame，裝置不回任何東西，
+PC 端無從得知指令實際延遲或是否遺失。二進位 frame (little-endian)：
+
+    HELLO  <BB       version, TYPE_HELLO                      雙向；裝置回 HELLO 表示支援
+    CMD    <BBBIhhI  version, TYPE_CMD, flags, seq, left, right, sent_ms
+    ACK    <BBII     version, TYPE_ACK, seq, sent_ms (原樣送回)
+
+連線後 client 先送 HELLO，在短時間內收到 HELLO 才改用二進位，否則維持 JSON
+(舊韌體把二進位 frame 當作找不到 "l"/"r" 的文字而忽略，不會誤動作)。
+``flags & FLAG_ACK`` 時裝置對該指令回 ACK，``LinkStats`` 以此計算 RTT、遺失與亂序。
+"""
+
+import collections
+import struct
+import time
+from typing import Deque, Dict, Optional, Tuple
+
+PROTOCOL_VERSION = 1
+TYPE_HELLO = 0x00
+TYPE_CMD = 0x01
+TYPE_ACK = 0x02
+FLAG_ACK = 0x01
+
+HELLO = struct.Struct('<BB')
+CMD = struct.Struct('<BBBIhhI')
+ACK = struct.Struct('<BBII')
+
+
+def now_ms() -> int:
+    """協定用的 32-bit 毫秒時間戳 (monotonic，只用來算差值)"""
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+def encode_hello() -> bytes:
+    return HELLO.pack(PROTOCOL_VERSION, TYPE_HELLO)
+
+
+def encode_command(seq: int, left: int, right: int, sent_ms: Optional[int] = None, ack: bool = True) -> bytes:
+    left = max(-32768, min(32767, int(left)))
+    right = max(-32768, min(32767, int(right)))
+    return CMD.pack(PROTOCOL_VERSION, TYPE_CMD, FLAG_ACK if ack else 0, seq & 0xFFFFFFFF,
+                    left, right, now_ms() if sent_ms is None else sent_ms & 0xFFFFFFFF)
+
+
+def encode_ack(seq: int, sent_ms: int) -> bytes:
+    return ACK.pack(PROTOCOL_VERSION, TYPE_ACK, seq & 0xFFFFFFFF, sent_ms & 0xFFFFFFFF)
+
+
+def decode(frame: bytes) -> Optional[Tuple]:
+    """
+    解析二進位 frame
+
+    Returns:
+        ('hello',) / ('cmd', flags, seq, left, right, sent_ms) / ('ack', seq, sent_ms)；
+        版本或長度不符時返回 None
+    """
+    if len(frame) < HELLO.size or frame[0] != PROTOCOL_VERSION:
+        return None
+    kind = frame[1]
+    if kind == TYPE_HELLO:
+        return ('hello',)
+    if kind == TYPE_CMD and len(frame) >= CMD.size:
+        _, _, flags, seq, left, right, sent_ms = CMD.unpack_from(frame)
+        return ('cmd', flags, seq, left, right, sent_ms)
+    if kind == TYPE_ACK and len(frame) >= ACK.size:
+        _, _, seq, sent_ms = ACK.unpack_from(frame)
+        return ('ack', seq, sent_ms)
+    return None
+
+
+class LinkStats:
+    """以 ACK 統計指令的 RTT、遺失與亂序"""
+
+    def __init__(self, loss_timeout: float = 1.0, window: int = 200, max_outstanding: int = 256):
+        """
+        Args:
+            loss_timeout: 超過此秒數沒有 ACK 視為遺失
+            window: 計算 RTT 百分位的樣本數
+            max_outstanding: 最多追蹤幾個未確認的指令
+        """
+        self.loss_timeout = loss_timeout
+        self.max_outstanding = max_outstanding
+        self._outstanding: "collections.OrderedDict[int, float]" = collections.OrderedDict()
+        self._rtts: Deque[float] = collections.deque(maxlen=window)
+        self.sent = 0
+        self.acked = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.last_rtt: Optional[float] = None
+        self._highest_acked = -1
+
+    def on_send(self, seq: int, now: Optional[float] = None):
+        now = now if now is not None else time.monotonic()
+        self.sent += 1
+        self._outstanding[seq] = now
+        self._expire(now)
+        while len(self._outstanding) > self.max_outstanding:
+            self._outstanding.popitem(last=False)
+            self.lost += 1
+
+    def on_ack(self, seq: int, now: Optional[float] = None) -> Optional[float]:
+        """記錄 ACK，返回該指令的 RTT (秒)；重複或已判定遺失的 ACK 返回 None"""
+        now = now if now is not None else time.monotonic()
+        sent_at = self._outstanding.pop(seq, None)
+        if sent_at is None:
+            self.duplicates += 1
+            return None
+        if seq < self._highest_acked:
+            self.reordered += 1
+        self._highest_acked = max(self._highest_acked, seq)
+        rtt = now - sent_at
+        self.acked += 1
+        self.last_rtt = rtt
+        self._rtts.append(rtt)
+        return rtt
+
+    def _expire(self, now: float):
+        while self._outstanding:
+            seq, sent_at = next(iter(self._outstanding.items()))
+            if now - sent_at < self.loss_timeout:
+                break
+            self._outstanding.popitem(last=False)
+            self.lost += 1
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, object]:
+        self._expire(now if now is not None else time.monotonic())
+        rtts = sorted(self._rtts)
+
+        def pct(p):
+            return round(rtts[min(len(rtts) - 1, int(p / 100 * len(rtts)))] * 1000, 1) if rtts else None
+
+        resolved = self.acked + self.lost
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "lost": self.lost,
+            "reordered": self.reordered,
+            "loss_rate": round(self.lost / resolved, 3) if resolved else 0.0,
+            "rtt_ms": round(self.last_rtt * 1000, 1) if self.last_rtt is not None else None,
+            "rtt_p50_ms": pct(50),
+            "rtt_p95_ms": pct(95),
+        }
@@ -0,0 +1,152 @@
+"""
+裝置註冊表：以裝置 ID 記錄所有發出 beacon 的車子 / 手臂
+
+原本 SystemState 只有一個 camera_ip 與一個 arm_ip，誰的 beacon 最後到就覆寫誰；
+同一個子網路上有兩台車時，IP 來回跳動，控制與影像連線不斷重建。
+
+- 每個裝置以 ``(type, id)`` 記錄位址、介面、capabilities 與最後出現時間，超過 ttl 視為離線
+- 每種類型「綁定」一個裝置 ID；只有被綁定的裝置位址改變時才需要重建連線，其他裝置只是被記錄
+- 沒有指定綁定時，第一個出現的裝置自動綁定 (維持單機時的行為)；自動綁定的裝置離線後
+  改綁另一個在線的同類裝置。明確指定 (config / API) 的綁定不會自動改變
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Device:
+    __slots__ = ('id', 'type', 'address', 'interface', 'capabilities', 'first_seen', 'last_seen', 'beacons')
+
+    def __init__(self, device_id: str, device_type: str, address: str, now: float):
+        self.id = device_id
+        self.type = device_type
+        self.address = address
+        self.interface: Optional[str] = None
+        self.capabilities: Tuple[str, ...] = ()
+        self.first_seen = now
+        self.last_seen = now
+        self.beacons = 0
+
+    def to_dict(self, now: float, ttl: float) -> Dict[str, object]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "address": self.address,
+            "interface": self.interface,
+            "capabilities": list(self.capabilities),
+            "age_s": round(now - self.last_seen, 1),
+            "alive": now - self.last_seen <= ttl,
+            "beacons": self.beacons,
+        }
+
+
+class DeviceRegistry:
+    """執行緒安全的裝置表與每種類型的綁定"""
+
+    def __init__(self, ttl: float = 10.0, preferred: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            ttl: 超過此秒數沒有 beacon 視為離線
+            preferred: 明確綁定，例如 {"car": "car-a1b2c3"}
+        """
+        self.ttl = ttl
+        self._devices: Dict[Tuple[str, str], Device] = {}
+        self._bindings: Dict[str, Tuple[str, bool]] = {}  # type -> (device_id, explicit)
+        self._lock = threading.Lock()
+        for device_type, device_id in (preferred or {}).items():
+            if device_id:
+                self._bindings[device_type] = (device_id, True)
+
+    def observe(self, device_id: str, device_type: str, address: str,
+                capabilities: Optional[Iterable[str]] = None,
+                now: Optional[float] = None) -> Tuple[Device, Optional[str]]:
+        """
+        記錄一個 beacon
+
+        Returns:
+            (device, event)；event 為 'new' (第一次出現 / 離線後重新出現)、'moved' (位址改變) 或 None
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            key = (device_type, device_id)
+            device = self._devices.get(key)
+            if device is None:
+                device = self._devices[key] = Device(device_id, device_type, address, now)
+                event = 'new'
+            elif now - device.last_seen > self.ttl:
+                event = 'new'
+            elif device.address != address:
+                event = 'moved'
+            else:
+                event = None
+            if device.address != address:
+                device.interface = None  # 位址變了，介面要重新判斷
+            device.address = address
+            device.last_seen = now
+            device.beacons += 1
+            if capabilities is not None:
+                device.capabilities = tuple(capabilities)
+            if device_type not in self._bindings:
+                self._bindings[device_type] = (device_id, False)
+            return device, event
+
+    def _alive(self, device: Optional[Device], now: float) -> bool:
+        return device is not None and now - device.last_seen <= self.ttl
+
+    def bound(self, device_type: str, now: Optional[float] = None) -> Optional[Device]:
+        """
+        目前綁定的在線裝置；自動綁定的裝置離線時改綁另一個在線的同類裝置
+
+        Returns:
+            裝置，沒有綁定或綁定的裝置離線時返回 None
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            binding = self._bindings.get(device_type)
+            if binding is None:
+                return None
+            device_id, explicit = binding
+            device = self._devices.get((device_type, device_id))
+            if self._alive(device, now):
+                return device
+            if explicit:
+                return None
+            candidates = [d for d in self._devices.values() if d.type == device_type and self._alive(d, now)]
+            if not candidates:
+                return None
+            device = max(candidates, key=lambda d: d.last_seen)
+            self._bindings[device_type] = (device.id, False)
+            return device
+
+    def bind(self, device_type: str, device_id: Optional[str]):
+        """明確綁定 (device_id=None 則恢復自動綁定)"""
+        with self._lock:
+            if device_id:
+                self._bindings[device_type] = (device_id, True)
+            else:
+                self._bindings.pop(device_type, None)
+
+    def get(self, device_type: str, device_id: str) -> Optional[Device]:
+        with self._lock:
+            return self._devices.get((device_type, device_id))
+
+    def expire(self, now: Optional[float] = None, forget_after: float = 10.0) -> List[Device]:
+        """移除離線超過 ttl * forget_after 的裝置 (短暫離線的裝置保留，讓 /api/devices 看得到)"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            gone = [key for key, d in self._devices.items() if now - d.last_seen > self.ttl * forget_after]
+            return [self._devices.pop(key) for key in gone]
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, object]:
+        now = now if now is not None else time.monotonic()
+        self.expire(now)
+        with self._lock:
+            bindings = {t: {"id": device_id, "explicit": explicit}
+                        for t, (device_id, explicit) in self._bindings.items()}
+            devices = [d.to_dict(now, self.ttl) for d in self._devices.values()]
+        for item in devices:
+            binding = bindings.get(item["type"])
+            item["bound"] = binding is not None and binding["id"] == item["id"]
+        devices.sort(key=lambda d: (d["type"], d["id"]))
+        return {"ttl_s": self.ttl, "bindings": bindings, "devices": devices}
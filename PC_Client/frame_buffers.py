@@ -0,0 +1,110 @@
+"""
+影像管線的可重用 buffer
+
+30 fps SVGA 下每幀的 JPEG 輸出都要 ``tobytes()`` 一次，再 pickle 穿過 multiprocessing pipe，
+大部分記憶體頻寬都花在搬資料上。
+
+- ``FrameRing``: shared memory 環形槽，影像進程把 JPEG 直接寫進槽位，
+  queue 只傳 (seq, captured_at, slot)，web server 端讀取時以 seq 檢查是否已被覆寫
+"""
+
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+
+class FrameRing:
+    """
+    以 shared memory 傳遞已編碼 JPEG 的固定槽環形 buffer
+
+    每個槽位 = 檔頭 ``<QdI`` (seq, captured_at, length) + 資料區。
+    寫入時先把 seq 清成 0 再寫資料，最後寫回 seq；讀取端在複製前後各比對一次 seq，
+    被覆寫中的幀直接放棄 (只有讀取端落後 slots 幀以上才會發生)。
+    """
+
+    HEADER = struct.Struct('<QdI')
+
+    def __init__(self, name: Optional[str] = None, slots: int = 4, slot_size: int = 512 * 1024):
+        """
+        Args:
+            name: 既有 shared memory 名稱 (attach)；None 則建立新的
+            slots: 槽位數 (需大於 frame queue 長度)
+            slot_size: 每槽最大 JPEG 大小，超過的幀由呼叫端改走 queue
+        """
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = self.HEADER.size + slot_size
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=self._stride * slots)
+        else:
+            self._shm = _attach_shared_memory(name)
+        self.name = self._shm.name
+        self._next = 0
+
+    @property
+    def spec(self) -> Tuple[str, int, int]:
+        """傳給子進程用來 attach 的 (name, slots, slot_size)"""
+        return self.name, self.slots, self.slot_size
+
+    @classmethod
+    def attach(cls, spec: Tuple[str, int, int]) -> 'FrameRing':
+        name, slots, slot_size = spec
+        return cls(name=name, slots=slots, slot_size=slot_size)
+
+    def write(self, seq: int, captured_at: float, data) -> Optional[int]:
+        """把 JPEG (bytes / ndarray) 寫進下一個槽位，返回槽位編號；太大則返回 None"""
+        view = memoryview(data).cast('B')
+        length = view.nbytes
+        if length > self.slot_size or seq <= 0:
+            return None
+        slot = self._next
+        self._next = (slot + 1) % self.slots
+        base = slot * self._stride
+        buf = self._shm.buf
+        self.HEADER.pack_into(buf, base, 0, 0.0, 0)
+        start = base + self.HEADER.size
+        buf[start:start + length] = view
+        self.HEADER.pack_into(buf, base, seq, captured_at, length)
+        return slot
+
+    def read(self, slot: int, seq: int) -> Optional[bytes]:
+        """複製出槽位中的 JPEG；seq 不符 (已被覆寫) 時返回 None"""
+        if not 0 <= slot < self.slots:
+            return None
+        base = slot * self._stride
+        buf = self._shm.buf
+        stored_seq, _, length = self.HEADER.unpack_from(buf, base)
+        if stored_seq != seq or length > self.slot_size:
+            return None
+        start = base + self.HEADER.size
+        data = bytes(buf[start:start + length])
+        if self.HEADER.unpack_from(buf, base)[0] != seq:
+            return None
+        return data
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """attach 既有 shared memory，但不讓子進程的 resource tracker 在結束時 unlink 它"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
@@ -0,0 +1,320 @@
+"""
+本機 frame pub/sub bus
+
+ESP32 的 httpd 只能好好服務一個串流 client。錄影、校正腳本或
+``tests/reproduce_stutter.py`` 之類的第二個使用者不必再去搶相機連線，
+也不用繞經 Flask 的 MJPEG endpoint，改為訂閱影像進程發布在本機的幀。
+
+- 傳輸：127.0.0.1 TCP (Windows 上 AF_UNIX 支援不完整，loopback TCP 到處都能用)
+- 頻道：``raw`` = ESP32 原始 JPEG，``processed`` = 送往網頁的畫面 (含 AI 標註)
+- 每個訂閱者有自己的有界佇列 (滿了丟最舊的) 與送出線程；publish() 只做 append，
+  慢的訂閱者只會自己掉幀，不會拖慢主管線
+
+協定：訂閱者連線後送一行 ``SUB <channel>\\n``，之後每幀為
+``FRAME_HEADER`` (magic, seq, captured_at, length) + JPEG bytes。
+"""
+
+import collections
+import socket
+import struct
+import threading
+import time
+from queue import Queue, Empty, Full
+from typing import Callable, Dict, List, Optional, Tuple
+
+FRAME_MAGIC = b'FBUS'
+FRAME_HEADER = struct.Struct('<4sQdI')  # magic, seq, captured_at, length
+CHANNELS = ('raw', 'processed')
+DEFAULT_PORT = 8765
+
+
+class _Subscriber:
+    def __init__(self, sock: socket.socket, address, channel: str, maxsize: int):
+        self.sock = sock
+        self.address = address
+        self.channel = channel
+        self.queue = collections.deque(maxlen=maxsize)
+        self.ready = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.alive = True
+
+
+class FrameBusPublisher:
+    """在影像進程中發布幀；publish() 不做任何 I/O"""
+
+    def __init__(self,
+                 port: int = DEFAULT_PORT,
+                 host: str = '127.0.0.1',
+                 queue_size: int = 4,
+                 send_timeout: float = 2.0,
+                 log_callback: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            port: 監聽 port (0 = 自動分配，之後讀 self.port)
+            host: 監聽位址 (預設只接受本機)
+            queue_size: 每個訂閱者最多暫存幾幀
+            send_timeout: 單次送出逾時，卡住的訂閱者會被斷線
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = max(1, queue_size)
+        self.send_timeout = send_timeout
+        self.log = log_callback or print
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._running = False
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> 'FrameBusPublisher':
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(8)
+        server.settimeout(0.5)
+        self._server = server
+        self.port = server.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.log(f"📡 Frame bus listening on {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for sub in subscribers:
+            self._drop(sub)
+
+    def publish(self, channel: str, seq: int, captured_at: float, jpeg) -> int:
+        """把一幀交給該頻道的所有訂閱者，返回訂閱者數"""
+        subscribers = self._subscribers  # list 只整體替換，不用鎖
+        if not subscribers:
+            return 0
+        count = 0
+        for sub in subscribers:
+            if sub.channel != channel:
+                continue
+            if len(sub.queue) == sub.queue.maxlen:
+                sub.dropped += 1
+            sub.queue.append((seq, captured_at, jpeg))
+            sub.ready.set()
+            count += 1
+        return count
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [{'address': f"{s.address[0]}:{s.address[1]}", 'channel': s.channel,
+                 'sent': s.sent, 'dropped': s.dropped} for s in self._subscribers]
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, address = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(sock, address), daemon=True).start()
+
+    def _serve(self, sock: socket.socket, address):
+        try:
+            sock.settimeout(self.send_timeout)
+            line = b''
+            while not line.endswith(b'\n') and len(line) < 64:
+                data = sock.recv(64 - len(line))
+                if not data:
+                    raise ConnectionError("closed before SUB")
+                line += data
+            parts = line.decode('ascii', 'replace').split()
+            channel = parts[1] if len(parts) >= 2 and parts[0] == 'SUB' else ''
+            if channel not in CHANNELS:
+                raise ValueError(f"bad subscription {line!r}")
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (OSError, ValueError, ConnectionError) as e:
+            self.log(f"⚠️ Frame bus rejected {address[0]}:{address[1]}: {e}")
+            sock.close()
+            return
+
+        sub = _Subscriber(sock, address, channel, self.queue_size)
+        with self._lock:
+            self._subscribers = self._subscribers + [sub]
+        self.log(f"📡 Frame bus subscriber {address[0]}:{address[1]} ({channel})")
+        try:
+            while self._running and sub.alive:
+                if not sub.ready.wait(timeout=0.5):
+                    continue
+                sub.ready.clear()
+                while sub.queue:
+                    try:
+                        seq, captured_at, jpeg = sub.queue.popleft()
+                    except IndexError:
+                        break
+                    view = memoryview(jpeg).cast('B')
+                    sock.sendall(FRAME_HEADER.pack(FRAME_MAGIC, seq, captured_at, view.nbytes))
+                    sock.sendall(view)
+                    sub.sent += 1
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not sub]
+            self._drop(sub)
+            self.log(f"📡 Frame bus subscriber {address[0]}:{address[1]} left "
+                     f"(sent {sub.sent}, dropped {sub.dropped})")
+
+    @staticmethod
+    def _drop(sub: _Subscriber):
+        sub.alive = False
+        sub.ready.set()
+        try:
+            sub.sock.close()
+        except OSError:
+            pass
+
+
+class FrameBusSubscriber:
+    """
+    訂閱 frame bus，介面與 MJPEGStreamReader 相同 (start/stop/read/read_timestamped)
+
+    斷線時自動重連 (影像進程重啟時)。
+    """
+
+    def __init__(self,
+                 port: int = DEFAULT_PORT,
+                 host: str = '127.0.0.1',
+                 channel: str = 'raw',
+                 frame_queue_size: int = 2,
+                 reconnect_delay: float = 1.0,
+                 log_callback: Optional[Callable[[str], None]] = None):
+        if channel not in CHANNELS:
+            raise ValueError(f"channel must be one of {CHANNELS}")
+        self.host = host
+        self.port = port
+        self.channel = channel
+        self.url = f"bus://{host}:{port}/{channel}"
+        self.reconnect_delay = reconnect_delay
+        self.log = log_callback or print
+        self.frame_queue = Queue(maxsize=frame_queue_size)
+        self.running = False
+        self.last_seq = None
+        self.received = 0
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def read(self, timeout: float = 0.1) -> Optional[bytes]:
+        packet = self.read_timestamped(timeout)
+        return packet[1] if packet else None
+
+    def read_timestamped(self, timeout: float = 0.1) -> Optional[Tuple[float, bytes]]:
+        try:
+            return self.frame_queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def _recv_exact(self, sock: socket.socket, size: int) -> bytes:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        got = 0
+        while got < size:
+            n = sock.recv_into(view[got:], size - got)
+            if n == 0:
+                raise ConnectionError("frame bus closed")
+            got += n
+        return bytes(buf)
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=2.0)
+            except OSError:
+                time.sleep(self.reconnect_delay)
+                continue
+            self._sock = sock
+            try:
+                sock.settimeout(None)
+                sock.sendall(f"SUB {self.channel}\n".encode('ascii'))
+                while self.running:
+                    magic, seq, captured_at, length = FRAME_HEADER.unpack(
+                        self._recv_exact(sock, FRAME_HEADER.size))
+                    if magic != FRAME_MAGIC:
+                        raise ConnectionError("bad frame header")
+                    jpeg = self._recv_exact(sock, length)
+                    self.last_seq = seq
+                    self.received += 1
+                    if self.frame_queue.full():
+                        try:
+                            self.frame_queue.get_nowait()
+                        except Empty:
+                            pass
+                    try:
+                        self.frame_queue.put_nowait((captured_at, jpeg))
+                    except Full:
+                        pass
+            except (OSError, ConnectionError):
+                pass
+            finally:
+                self._sock = None
+                sock.close()
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Subscribe to the PC client's frame bus")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--channel', choices=CHANNELS, default='raw')
+    parser.add_argument('--record', help="record frames to this path (see stream_recorder.py)")
+    args = parser.parse_args()
+
+    recorder = None
+    if args.record:
+        from stream_recorder import StreamRecorder
+        recorder = StreamRecorder(args.record)
+        print(f"⏺️ Recording to {recorder.segment_path}")
+
+    subscriber = FrameBusSubscriber(port=args.port, channel=args.channel, frame_queue_size=8)
+    subscriber.start()
+    count, last_report = 0, time.time()
+    try:
+        while True:
+            packet = subscriber.read_timestamped(timeout=0.5)
+            if packet and recorder:
+                recorder.append(packet[1], packet[0])
+            count += 1 if packet else 0
+            if time.time() - last_report >= 5:
+                print(f"📊 {count / (time.time() - last_report):.1f} fps (seq {subscriber.last_seq})")
+                count, last_report = 0, time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.stop()
+        if recorder:
+            recorder.close()
@@ -0,0 +1,57 @@
+"""Deadline-based frame dropping shared by the video process and web server.
+
+For teleoperation a fresh frame matters more than a complete sequence: a frame
+that waited behind a slow inference is useless by the time it reaches the
+browser. ``FrameDeadline`` is checked right before each expensive stage and
+tells the caller to drop the frame when it can no longer arrive in time.
+"""
+
+import time
+from typing import Dict, Iterable, Optional
+
+# Stages checked along the pipeline (ESP32 -> decode -> AI -> encode -> web)
+PIPELINE_STAGES = ("decode", "infer", "encode", "publish")
+
+
+class FrameDeadline:
+    """Per-stage frame age gate with drop counters.
+
+    ``captured_at`` is the ``time.time()`` at which the reader completed the
+    JPEG. Wall-clock time is used so the age stays meaningful after the frame
+    crosses the multiprocessing queue into the web server process.
+    """
+
+    def __init__(self, max_age_ms: Optional[float], stages: Iterable[str] = PIPELINE_STAGES):
+        """
+        Args:
+            max_age_ms: maximum frame age in milliseconds (0 / None disables dropping)
+            stages: stage names this instance keeps counters for
+        """
+        self.max_age = (max_age_ms / 1000.0) if max_age_ms else 0.0
+        self.dropped: Dict[str, int] = {stage: 0 for stage in stages}
+        self.passed: Dict[str, int] = {stage: 0 for stage in stages}
+
+    def expired(self, stage: str, captured_at: Optional[float], now: Optional[float] = None) -> bool:
+        """Return True (and count a drop) if the frame is too old for ``stage``."""
+        if self.max_age and captured_at is not None:
+            age = (now if now is not None else time.time()) - captured_at
+            if age > self.max_age:
+                self.dropped[stage] = self.dropped.get(stage, 0) + 1
+                return True
+        self.passed[stage] = self.passed.get(stage, 0) + 1
+        return False
+
+    def total_dropped(self) -> int:
+        return sum(self.dropped.values())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Snapshot of the counters, suitable for JSON."""
+        return {
+            "max_age_ms": int(self.max_age * 1000),
+            "dropped": dict(self.dropped),
+            "passed": dict(self.passed),
+        }
+
+    def summary(self) -> str:
+        """Compact one-line representation for logs, e.g. ``decode=0 infer=3``."""
+        return " ".join(f"{stage}={count}" for stage, count in self.dropped.items())
@@ -0,0 +1,150 @@
+"""
+JPEG 結構檢查 (不解碼)
+
+ESP32 偶爾會送出截斷或損壞的幀。直接丟給 ``cv2.imdecode`` 不是花完整解碼
+時間後失敗，就是解出一張糊掉的影像再送進 AI。這裡只走訪 marker segment：
+
+- 必須以 SOI 開頭、EOI 結尾，每個 segment 長度都在資料範圍內
+- SOS 之前必須有 SOF，entropy data 中不能出現非 RST 的 marker
+  (兩幀黏在一起時，第二個 SOI 會在這裡被抓到)
+- 從 SOF 取出寬高與取樣比例，下游不用試解碼就能配置 buffer / 選擇縮小解碼
+"""
+
+from typing import NamedTuple, Tuple
+
+SOI = 0xD8
+EOI = 0xD9
+SOS = 0xDA
+DNL = 0xDC
+# SOF0-SOF15，排除 DHT (C4)、JPG (C8)、DAC (CC)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+PROGRESSIVE_SOF = frozenset({0xC2, 0xC6, 0xCA, 0xCE})
+# 沒有 length 欄位的 marker
+STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01}
+
+
+class JpegError(ValueError):
+    """JPEG 結構錯誤 (截斷、marker 錯亂、缺少 SOF 等)"""
+
+
+class JpegInfo(NamedTuple):
+    width: int
+    height: int
+    components: int
+    sampling: Tuple[Tuple[int, int], ...]  # 每個 component 的 (H, V) 取樣因子
+    progressive: bool
+    scans: int
+
+    @property
+    def subsampling(self) -> str:
+        """色度取樣，例如 '4:2:0' / '4:2:2' / '4:4:4' / 'gray'"""
+        if self.components == 1:
+            return 'gray'
+        (luma_h, luma_v), (chroma_h, chroma_v) = self.sampling[0], self.sampling[1]
+        ratio = (luma_h // max(1, chroma_h), luma_v // max(1, chroma_v))
+        return {(1, 1): '4:4:4', (2, 1): '4:2:2', (2, 2): '4:2:0', (4, 1): '4:1:1'}.get(
+            ratio, f"{ratio[0]}x{ratio[1]}")
+
+
+def _skip_entropy(data, pos: int, end: int) -> int:
+    """跳過 entropy-coded data，返回下一個 marker 的 0xFF 位置"""
+    find = data.find
+    while True:
+        pos = find(b'\xff', pos, end)
+        if pos == -1 or pos + 1 >= end:
+            raise JpegError("truncated scan data")
+        nxt = data[pos + 1]
+        # FF00 = byte stuffing, FFD0-FFD7 = RST, FFFF = fill
+        if nxt == 0x00 or 0xD0 <= nxt <= 0xD7 or nxt == 0xFF:
+            pos += 2 if nxt != 0xFF else 1
+            continue
+        return pos
+
+
+def probe_jpeg(data) -> JpegInfo:
+    """
+    檢查 JPEG 結構並從 header 取出資訊
+
+    Args:
+        data: JPEG bytes (bytes / bytearray / memoryview)
+
+    Returns:
+        JpegInfo
+
+    Raises:
+        JpegError: 結構不完整或損壞
+    """
+    end = len(data)
+    if end < 4 or data[0] != 0xFF or data[1] != SOI:
+        raise JpegError("missing SOI")
+    if isinstance(data, memoryview):
+        data = data.tobytes()  # memoryview 沒有 find()
+
+    pos = 2
+    frame = None
+    scans = 0
+    while True:
+        if pos + 1 >= end:
+            raise JpegError("missing EOI")
+        if data[pos] != 0xFF:
+            raise JpegError(f"expected marker at offset {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        pos += 2
+
+        if marker == EOI:
+            if frame is None or scans == 0:
+                raise JpegError("EOI before image data")
+            return frame._replace(scans=scans)
+        if marker == SOI:
+            raise JpegError(f"unexpected SOI at offset {pos - 2}")
+        if marker in STANDALONE_MARKERS:
+            continue
+
+        if pos + 2 > end:
+            raise JpegError("truncated segment header")
+        length = (data[pos] << 8) | data[pos + 1]
+        if length < 2 or pos + length > end:
+            raise JpegError(f"bad segment length {length} for marker 0x{marker:02X}")
+
+        if marker in SOF_MARKERS:
+            if frame is not None:
+                raise JpegError("multiple SOF markers")
+            if length < 8:
+                raise JpegError("truncated SOF")
+            height = (data[pos + 3] << 8) | data[pos + 4]
+            width = (data[pos + 5] << 8) | data[pos + 6]
+            components = data[pos + 7]
+            if length != 8 + 3 * components or components == 0:
+                raise JpegError("bad SOF component count")
+            if width == 0 or height == 0:
+                raise JpegError("zero image dimension")
+            sampling = tuple(
+                (data[pos + 9 + 3 * i] >> 4, data[pos + 9 + 3 * i] & 0x0F) for i in range(components)
+            )
+            if any(h == 0 or v == 0 for h, v in sampling):
+                raise JpegError("bad sampling factor")
+            frame = JpegInfo(width, height, components, sampling, marker in PROGRESSIVE_SOF, 0)
+        elif marker == SOS:
+            if frame is None:
+                raise JpegError("SOS before SOF")
+            if length < 6 or length != 6 + 2 * data[pos + 2]:
+                raise JpegError("bad SOS header")
+            scans += 1
+            pos = _skip_entropy(data, pos + length, end)
+            continue
+        elif marker == DNL:
+            raise JpegError("DNL is not supported")
+
+        pos += length
+
+
+def is_valid_jpeg(data) -> bool:
+    """probe_jpeg 的布林版本"""
+    try:
+        probe_jpeg(data)
+        return True
+    except JpegError:
+        return False
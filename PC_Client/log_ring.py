@@ -0,0 +1,168 @@
+"""
+系統 log 的環形儲存與節流
+
+原本 add_log 把每一行 append 到 list 再 ``pop(0)`` (O(n))，並在呼叫者的線程上
+同步 print 與 ``socketio.emit``；重連風暴或 AI log 開啟時，所有 client 被洗版，
+記錄 log 的熱路徑線程也被 I/O 卡住。
+
+- ``LogRing``: 固定大小的環形 buffer，以 ``itertools.count`` 配發序號，寫入不需要鎖；
+  讀取端用序號當游標，只取游標之後的新行
+- ``LogThrottle``: 依來源 (訊息開頭的 ``[TAG]``) 合併重複訊息並限制速率，
+  被合併 / 壓下的行數之後以一行摘要補上
+
+輸出 (console / 網頁) 由單一線程定期批次讀取 ring，add_log 本身不做任何 I/O。
+"""
+
+import itertools
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_TAG = re.compile(r"^\[([^\]]{1,24})\]")
+
+
+def log_source(message: str) -> str:
+    """訊息開頭的 ``[TAG]``，沒有則為 'general'"""
+    match = _TAG.match(message)
+    return match.group(1).strip().upper() if match else "general"
+
+
+class LogRing:
+    """
+    固定大小、寫入不加鎖的 log 環形 buffer
+
+    ``next()`` 在 itertools.count 上與 list 元素賦值在 CPython 中都是原子操作，
+    多個線程同時 append 不會互相覆蓋。每個槽位存 (seq, line)，讀取端比對 seq
+    判斷該行是否已寫入 / 已被覆寫。
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = max(1, size)
+        self._slots: List[Optional[Tuple[int, str]]] = [None] * self.size
+        self._counter = itertools.count(1)
+        self._head = 0  # 最近一次寫入的 seq (只當作讀取起點的提示)
+
+    @property
+    def head(self) -> int:
+        return self._head
+
+    def append(self, line: str) -> int:
+        seq = next(self._counter)
+        self._slots[seq % self.size] = (seq, line)
+        if seq > self._head:
+            self._head = seq
+        return seq
+
+    def since(self, cursor: int, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """
+        cursor 之後的行與新的 cursor
+
+        落後超過 ring 大小時從最舊的一行開始 (中間的行已被覆寫)；
+        遇到已配發序號但還沒寫完的槽位就停下，下次從那裡繼續。
+        """
+        seq = max(cursor + 1, self._head - self.size + 1, 1)
+        lines = []
+        while limit is None or len(lines) < limit:
+            entry = self._slots[seq % self.size]
+            if entry is None or entry[0] < seq:
+                break  # 尚未寫入
+            if entry[0] == seq:
+                lines.append(entry[1])
+            # entry[0] > seq: 讀取中被覆寫，跳過
+            seq += 1
+        return lines, seq - 1
+
+    def tail(self, count: int) -> List[str]:
+        """最後 count 行"""
+        return self.since(max(0, self._head - count))[0][-count:]
+
+
+class _SourceState:
+    __slots__ = ('name', 'last', 'repeats', 'repeat_since', 'tokens', 'refilled',
+                 'suppressed', 'suppressed_since')
+
+    def __init__(self, name: str, burst: float, now: float):
+        self.name = name
+        self.last = None
+        self.repeats = 0
+        self.repeat_since = now
+        self.tokens = burst
+        self.refilled = now
+        self.suppressed = 0
+        self.suppressed_since = now
+
+
+class LogThrottle:
+    """
+    依來源合併重複訊息 + token bucket 限速
+
+    admit() 返回實際要寫入的行 (可能是 0 行、原訊息，或先補一行重複摘要)；
+    flush() 由輸出線程定期呼叫，把累積的重複 / 壓下計數寫成摘要。
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float = 20.0, repeat_window: float = 2.0):
+        """
+        Args:
+            rate: 每個來源每秒可寫入的行數
+            burst: 短時間內可超出 rate 的行數
+            repeat_window: 重複 / 壓下的訊息最久多少秒補一次摘要
+        """
+        self.rate = rate
+        self.burst = burst
+        self.repeat_window = repeat_window
+        self._sources: Dict[str, _SourceState] = {}
+        self._lock = threading.Lock()
+        self.squashed = 0
+        self.suppressed = 0
+
+    def admit(self, source: str, message: str, now: Optional[float] = None) -> List[str]:
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            src = self._sources.get(source)
+            if src is None:
+                src = self._sources[source] = _SourceState(source, self.burst, now)
+            if message == src.last:
+                if src.repeats == 0:
+                    src.repeat_since = now
+                src.repeats += 1
+                self.squashed += 1
+                return []
+
+            out = self._summaries(src, suppressed=False)
+            src.last = message
+            src.tokens = min(self.burst, src.tokens + (now - src.refilled) * self.rate)
+            src.refilled = now
+            if src.tokens >= 1.0:
+                src.tokens -= 1.0
+                out.append(message)
+            else:
+                if src.suppressed == 0:
+                    src.suppressed_since = now
+                src.suppressed += 1
+                self.suppressed += 1
+            return out
+
+    def flush(self, now: Optional[float] = None) -> List[str]:
+        """累積超過 repeat_window 的重複 / 壓下摘要"""
+        now = now if now is not None else time.monotonic()
+        out = []
+        with self._lock:
+            for src in self._sources.values():
+                if src.repeats and now - src.repeat_since >= self.repeat_window:
+                    out.extend(self._summaries(src, suppressed=False))
+                if src.suppressed and now - src.suppressed_since >= self.repeat_window:
+                    out.extend(self._summaries(src, repeats=False))
+        return out
+
+    @staticmethod
+    def _summaries(src: _SourceState, repeats: bool = True, suppressed: bool = True) -> List[str]:
+        out = []
+        if repeats and src.repeats:
+            out.append(f"{src.last} (repeated {src.repeats}x)")
+            src.repeats = 0
+        if suppressed and src.suppressed:
+            tag = f"[{src.name}] " if src.name != "general" else ""
+            out.append(f"{tag}... {src.suppressed} more message(s) suppressed")
+            src.suppressed = 0
+        return out
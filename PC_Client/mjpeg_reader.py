@@ -10,11 +10,14 @@ MJPEG Stream Reader - 專為 ESP32-CAM 優化
 作者: Optimized for ESP32-CAM MJPEG streams
 """
 
+import socket
 import threading
 import time
 import requests
 from queue import Queue, Empty
-from typing import Optional, Callable
+from typing import Optional, Callable, Tuple, List, Sequence
+
+from network_utils import race_first
 
 
 class MJPEGStreamReader:
@@ -41,7 +44,11 @@ class MJPEGStreamReader:
                  reconnect_delay: float = 1.0,  # 減少初始延遲到 1s
                  max_reconnect_delay: float = 30.0,
                  connection_timeout: int = 30,  # 增加 connection timeout
-                 log_callback: Optional[Callable[[str], None]] = None):
+                 log_callback: Optional[Callable[[str], None]] = None,
+                 record_path: Optional[str] = None,
+                 candidate_urls: Optional[Sequence[str]] = None,
+                 connect_timeout: float = 2.0,
+                 stall_timeout: float = 0.6):
         """
         初始化 MJPEG 讀取器
         
@@ -52,8 +59,12 @@ class MJPEGStreamReader:
             chunk_size: socket 讀取 chunk 大小 (增加可提升效率)
             reconnect_delay: 初始重連延遲 (秒)
             max_reconnect_delay: 最大重連延遲 (秒)
-            connection_timeout: HTTP 連接超時 (秒)
+            connection_timeout: HTTP 讀取超時 (秒)
             log_callback: 日誌回調函數
+            record_path: 錄影路徑 (檔名或資料夾)；設定後每個原始 JPEG 幀都會寫入 segment 檔
+            candidate_urls: 其他候選 stream URL (AP/STA 模式、備用 IP)；連線時與 url 同時競速
+            connect_timeout: 建立連線 (含等待 multipart 回應) 的時間上限 (秒)
+            stall_timeout: 距離上一個完整 JPEG 超過此秒數即判定停滯並立即重連 (0 = 停用)
         """
         self.url = url
         self.source_ip = source_ip
@@ -61,15 +72,41 @@ class MJPEGStreamReader:
         self.reconnect_delay = reconnect_delay
         self.max_reconnect_delay = max_reconnect_delay
         self.connection_timeout = connection_timeout
+        self.connect_timeout = connect_timeout
+        self.candidate_urls: List[str] = [u for u in (candidate_urls or []) if u and u != url]
+        self.stall_timeout = stall_timeout
         self.log = log_callback or print
         
         # Frame queue (producer: reader thread, consumer: main loop)
+        # 每個元素為 (captured_at, jpeg_bytes)，captured_at 供 deadline 丟幀使用
         self.frame_queue = Queue(maxsize=frame_queue_size)
         
+        # Recording (optional)
+        self.record_path = record_path
+        self.recorder = None
+
         # Control
         self.running = False
         self.reader_thread = None
         self._buffer = bytearray()
+
+        # Stall watchdog: 以「最後一個完整 JPEG」為準，而非 socket 活動
+        self.watchdog_thread = None
+        self._last_frame_time = 0.0
+        self._active_resp = None
+        self._stalled = False
+        self._standby = None          # 預先開好的備用連線 (url, session, resp)
+        self._standby_thread = None
+        self._standby_lock = threading.Lock()
+        # frames / bytes: 收到的完整 JPEG (在任何丟幀之前)，供相機碼率控制計算實際幀率
+        self.stats = {'connects': 0, 'failed_connects': 0, 'stalls': 0, 'standby_used': 0,
+                      'frames': 0, 'bytes': 0}
+
+        # Pause: 沒人觀看時關閉串流，但保留已驗證的 URL 與一條預先連好的 TCP 連線
+        self.paused = False
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._warm_session = None
         
     def start(self):
         """啟動背景讀取線程"""
@@ -77,9 +114,21 @@ class MJPEGStreamReader:
             self.log("⚠️ Reader already running")
             return
         
+        if self.record_path and self.recorder is None:
+            try:
+                from stream_recorder import StreamRecorder
+                self.recorder = StreamRecorder(self.record_path)
+                self.log(f"⏺️ Recording raw stream to {self.recorder.segment_path}")
+            except Exception as e:
+                self.log(f"⚠️ Failed to start recorder: {e}")
+                self.recorder = None
+
         self.running = True
         self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
         self.reader_thread.start()
+        if self.stall_timeout:
+            self.watchdog_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
+            self.watchdog_thread.start()
         self.log(f"✅ MJPEGStreamReader started: {self.url}")
         
     def stop(self):
@@ -88,10 +137,39 @@ class MJPEGStreamReader:
             return
             
         self.running = False
+        self._resume_event.set()
+        self._abort_active()
         if self.reader_thread:
             self.reader_thread.join(timeout=5)
+        if self.watchdog_thread:
+            self.watchdog_thread.join(timeout=1)
+        self._discard_standby()
+        self._drop_warm_session()
+        if self.recorder:
+            self.recorder.close()
+            self.log(f"⏹️ Recorded {self.recorder.frames} frames to {self.recorder.segment_path}")
+            self.recorder = None
         self.log("🛑 MJPEGStreamReader stopped")
         
+    def pause(self):
+        """
+        暫停串流 (沒有人需要畫面時)：關閉 stream 讓 ESP32 停止送幀，
+        背景線程保留最後成功的 URL 並預先連好 TCP，resume() 後可直接發出請求。
+        """
+        if not self.running or self.paused:
+            return
+        self.paused = True
+        self._resume_event.clear()
+        self._abort_active()
+        self._discard_standby()
+
+    def resume(self):
+        """恢復串流 (跳過候選競速與 backoff，直接連回最後成功的 URL)"""
+        if not self.paused:
+            return
+        self.paused = False
+        self._resume_event.set()
+
     def read(self, timeout: float = 0.1) -> Optional[bytes]:
         """
         讀取下一幀 (JPEG bytes)
@@ -102,25 +180,225 @@ class MJPEGStreamReader:
         Returns:
             bytes: JPEG 影像資料，如果超時則返回 None
         """
+        packet = self.read_timestamped(timeout)
+        return packet[1] if packet else None
+
+    def read_timestamped(self, timeout: float = 0.1) -> Optional[Tuple[float, bytes]]:
+        """
+        讀取下一幀及其完成接收的時間
+
+        Args:
+            timeout: 超時時間 (秒)
+
+        Returns:
+            (captured_at, jpeg_bytes)：captured_at 為 time.time() 時間戳，超時則返回 None
+        """
         try:
             return self.frame_queue.get(timeout=timeout)
         except Empty:
             return None
     
-    def _create_session(self) -> requests.Session:
-        """創建 HTTP session，支援 source IP binding"""
+    def _create_session(self, announce: bool = True) -> requests.Session:
+        """創建 HTTP session，支援 source IP binding (announce=False 時不記錄成功綁定，競速時每個候選都會建立)"""
         session = requests.Session()
         
         if self.source_ip:
             try:
                 from network_utils import SourceAddressAdapter
                 session.mount('http://', SourceAddressAdapter(self.source_ip))
-                self.log(f"📌 Session bound to {self.source_ip}")
+                if announce:
+                    self.log(f"📌 Session bound to {self.source_ip}")
             except Exception as e:
                 self.log(f"⚠️ Failed to bind to {self.source_ip}: {e}")
         
         return session
     
+    def _try_open(self, url: str, header_timeout: Optional[float] = None):
+        """
+        開啟一條 stream 連線，只有在 HTTP 200 且為 multipart 回應時才算成功
+
+        Args:
+            url: stream URL
+            header_timeout: 等待回應 header 的上限 (秒)，預設與讀取超時相同；
+                            連上之後 socket 讀取超時恢復為 connection_timeout
+
+        Returns:
+            (url, session, response)，失敗則返回 None
+        """
+        if url == self.url and self._warm_session is not None:
+            session, self._warm_session = self._warm_session, None
+        else:
+            # 候選 URL 也要綁定同一張網卡，否則競速可能經由預設路由 (另一張網卡) 勝出
+            session = self._create_session(announce=url == self.url)
+        try:
+            resp = session.get(url, stream=True,
+                               timeout=(self.connect_timeout, header_timeout or self.connection_timeout))
+        except requests.exceptions.RequestException:
+            session.close()
+            raise
+        content_type = resp.headers.get('Content-Type', '')
+        if resp.status_code != 200 or 'multipart' not in content_type.lower():
+            self.log(f"❌ HTTP {resp.status_code} ({content_type or 'no content-type'}) from {url}")
+            resp.close()
+            session.close()
+            return None
+        if header_timeout:
+            sock = getattr(getattr(resp.raw, 'connection', None), 'sock', None)
+            if sock is not None:
+                sock.settimeout(self.connection_timeout)
+        return url, session, resp
+
+    @staticmethod
+    def _close_opened(opened):
+        _, session, resp = opened
+        resp.close()
+        session.close()
+
+    def _open_stream(self, header_timeout: Optional[float] = None):
+        """
+        Happy-eyeballs：同時連線所有候選 URL，採用第一個回應有效 multipart 的連線，其餘取消
+
+        Returns:
+            (url, session, response)，全部失敗則返回 None
+        """
+        urls = [self.url] + [u for u in self.candidate_urls if u != self.url]
+        if len(urls) == 1:
+            return self._try_open(urls[0], header_timeout)
+
+        attempts = [(lambda u=u: self._try_open(u, header_timeout)) for u in urls]
+        winner = race_first(attempts, self.connect_timeout + 0.5, cleanup=self._close_opened)
+        return winner[1] if winner else None
+
+    # ------------------------------------------------------------------
+    # Stall watchdog & standby connection
+    # ------------------------------------------------------------------
+    def _watchdog_loop(self):
+        """
+        監看幀到達時間：超過 stall_timeout 沒有完整 JPEG 就中斷連線。
+
+        過了一半時間就先在背景開好備用連線，真正判定停滯時可以立即切換；
+        幀恢復時立即丟掉備用連線 (ESP32 一次只服務一個串流，備用連線不能一直佔住或排隊)。
+        """
+        interval = max(0.02, self.stall_timeout / 5)
+        while self.running:
+            time.sleep(interval)
+            resp = self._active_resp
+            if resp is None or self._stalled:
+                continue
+            silence = time.time() - self._last_frame_time
+            if silence > self.stall_timeout / 2:
+                self._prepare_standby()
+            elif self._standby is not None or self._standby_thread is not None:
+                self._discard_standby()
+            if silence > self.stall_timeout:
+                self._stalled = True
+                self.stats['stalls'] += 1
+                self.log(f"🧊 Stream stalled ({silence * 1000:.0f} ms without a frame), reconnecting")
+                self._abort_active()
+
+    def _abort_active(self):
+        """關閉目前的 stream socket，讓阻塞中的 iter_content 立即返回"""
+        resp = self._active_resp
+        if resp is None:
+            return
+        try:
+            sock = getattr(getattr(resp.raw, 'connection', None), 'sock', None)
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            resp.close()
+        except Exception:
+            pass
+
+    def _prepare_standby(self):
+        """
+        在背景開啟備用連線 (已有或正在開啟則略過)
+
+        等待 header 只給 connect_timeout：單一串流的裝置要等目前的連線釋放才會回應，
+        取消後遲到的請求不會卡住 30 秒的讀取超時。
+        """
+        with self._standby_lock:
+            if self._standby is not None or self._standby_thread is not None:
+                return
+
+            def run():
+                try:
+                    opened = self._open_stream(header_timeout=self.connect_timeout)
+                except Exception:
+                    opened = None
+                with self._standby_lock:
+                    current = self._standby_thread is threading.current_thread()
+                    if current and self.running:
+                        self._standby = opened
+                        self._standby_thread = None
+                        return
+                # 已被取消：關掉遲到的連線
+                if opened:
+                    self._close_opened(opened)
+
+            self._standby_thread = threading.Thread(target=run, daemon=True)
+            self._standby_thread.start()
+
+    def _take_standby(self, wait: float):
+        """取出備用連線；若正在建立中，最多等待 wait 秒，逾時仍未完成則取消 (遲到的連線會自行關閉)"""
+        with self._standby_lock:
+            thread = self._standby_thread
+        if thread is not None:
+            thread.join(timeout=wait)
+        with self._standby_lock:
+            opened, self._standby = self._standby, None
+            self._standby_thread = None
+        return opened
+
+    def _discard_standby(self):
+        with self._standby_lock:
+            opened, self._standby = self._standby, None
+            self._standby_thread = None  # 進行中的建立完成後會自行關閉
+        if opened:
+            self._close_opened(opened)
+
+    # ------------------------------------------------------------------
+    # Pause / warm connection
+    # ------------------------------------------------------------------
+    def _park(self):
+        """暫停期間停在這裡，直到 resume() 或 stop()"""
+        self.log("⏸️ Stream paused (no viewers)")
+        # 清掉暫停前的舊幀，恢復後不會先送出過期畫面
+        while not self.frame_queue.empty():
+            try:
+                self.frame_queue.get_nowait()
+            except Empty:
+                break
+        self._prewarm()
+        while self.running and self.paused:
+            self._resume_event.wait(timeout=0.5)
+        if self.running:
+            self.log("▶️ Stream resumed")
+
+    def _prewarm(self):
+        """
+        先建立到 self.url 的 TCP 連線並放進 session 的連線池 (不送 HTTP 請求，ESP32 不會開始送幀)。
+        恢復時省掉 TCP handshake；若連線已被 ESP32 關閉，urllib3 會自動重連。
+        """
+        self._drop_warm_session()
+        session = self._create_session()
+        try:
+            pool = session.get_adapter(self.url).poolmanager.connection_from_url(self.url)
+            conn = pool._get_conn()
+            conn.timeout = self.connect_timeout
+            conn.connect()
+            pool._put_conn(conn)
+        except Exception:
+            pass  # 仍保留 session，恢復時照常連線
+        self._warm_session = session
+
+    def _drop_warm_session(self):
+        session, self._warm_session = self._warm_session, None
+        if session is not None:
+            session.close()
+
     def _reader_loop(self):
         """背景線程主循環 - 持續讀取 stream"""
         current_delay = self.reconnect_delay
@@ -128,35 +406,79 @@ class MJPEGStreamReader:
         connection_count = 0
         
         while self.running:
+            if self.paused:
+                self._park()
+                current_delay = self.reconnect_delay
+                continue
+
+            session = None
+            streaming = False
+            frames_before = self.stats['frames']
             try:
                 connection_count += 1
-                session = self._create_session()
                 
-                # 建立持久連接
-                self.log(f"🔌 Connecting to {self.url} (attempt #{connection_count})")
-                with session.get(self.url, stream=True, timeout=self.connection_timeout) as resp:
-                    if resp.status_code != 200:
-                        self.log(f"❌ HTTP {resp.status_code} from {self.url}")
-                        time.sleep(current_delay)
-                        current_delay = min(current_delay * 2, self.max_reconnect_delay)
-                        continue
-                    
-                    # 連接成功，重置 delay
-                    current_delay = self.reconnect_delay
+                # 停滯後優先使用預先開好的備用連線
+                opened = None
+                if self._stalled:
+                    opened = self._take_standby(wait=self.connect_timeout)
+                    if opened:
+                        self.stats['standby_used'] += 1
+                self._stalled = False
+
+                if opened is None:
+                    # 建立持久連接 (多個候選時同時競速)
+                    targets = self.url if not self.candidate_urls else f"{self.url} (+{len(self.candidate_urls)} candidates)"
+                    self.log(f"🔌 Connecting to {targets} (attempt #{connection_count})")
+                    opened = self._open_stream()
+                if opened is None:
+                    self.stats['failed_connects'] += 1
+                    now = time.time()
+                    if now - last_log_time > 10:  # 節流日誌
+                        self.log(f"❌ No stream candidate answered, retrying in {current_delay}s")
+                        last_log_time = now
+                    time.sleep(current_delay)
+                    current_delay = min(current_delay * 2, self.max_reconnect_delay)
+                    continue
+
+                url, session, resp = opened
+                with resp:
+                    if url != self.url:
+                        # 勝出的候選成為主要 URL，原本的 URL 退為候選
+                        self.log(f"🏁 {url} answered first, switching from {self.url}")
+                        self.candidate_urls = [self.url] + [u for u in self.candidate_urls if u != url]
+                        self.url = url
+
+                    streaming = True
+                    self.stats['connects'] += 1
+                    self._buffer.clear()
+                    # 第一幀給予 connect_timeout 的寬限
+                    self._last_frame_time = time.time() + self.connect_timeout
+                    self._active_resp = resp
+                    self._discard_standby()
                     self.log(f"✅ Connected to {self.url}")
                     
                     # 讀取 stream
                     for chunk in resp.iter_content(chunk_size=self.chunk_size):
-                        if not self.running:
+                        if not self.running or self._stalled or self.paused:
                             break
                         
                         if chunk:
                             self._process_chunk(chunk)
                     
                     # Stream 正常結束
-                    self.log("📡 Stream ended normally")
+                    if not self._stalled and self.running and not self.paused:
+                        if self.stats['frames'] > frames_before:
+                            self.log("📡 Stream ended normally")
+                        else:
+                            # 回了 multipart 卻沒有任何幀就結束 (例如相機初始化失敗)：backoff，不要空轉重連
+                            self.log(f"📡 Stream ended without a frame, retrying in {current_delay}s")
+                            time.sleep(current_delay)
+                            current_delay = min(current_delay * 2, self.max_reconnect_delay)
                     
             except requests.exceptions.Timeout as e:
+                if streaming or self._stalled or self.paused:
+                    continue  # 已連上過：立即重連，不 backoff
+                self.stats['failed_connects'] += 1
                 now = time.time()
                 if now - last_log_time > 10:  # 節流日誌
                     self.log(f"⏱️ Timeout: {e}, retrying in {current_delay}s")
@@ -165,7 +487,10 @@ class MJPEGStreamReader:
                 time.sleep(current_delay)
                 current_delay = min(current_delay * 2, self.max_reconnect_delay)
                 
-            except requests.exceptions.ConnectionError as e:
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if streaming or self._stalled or self.paused:
+                    continue
+                self.stats['failed_connects'] += 1
                 now = time.time()
                 if now - last_log_time > 10:
                     self.log(f"🔌 Connection error: {e}, retrying in {current_delay}s")
@@ -175,9 +500,19 @@ class MJPEGStreamReader:
                 current_delay = min(current_delay * 2, self.max_reconnect_delay)
                 
             except Exception as e:
+                if self._stalled or self.paused or not self.running:
+                    continue
                 self.log(f"💥 Unexpected error: {e}")
                 time.sleep(current_delay)
                 current_delay = min(current_delay * 2, self.max_reconnect_delay)
+
+            finally:
+                self._active_resp = None
+                if session is not None:
+                    session.close()
+                # 收到過幀才重置 delay (backoff 用於連續失敗，包括連上但沒有幀的情況)
+                if self.stats['frames'] > frames_before:
+                    current_delay = self.reconnect_delay
     
     def _process_chunk(self, chunk: bytes):
         """
@@ -224,6 +559,19 @@ class MJPEGStreamReader:
             
             # 從 buffer 移除這個幀
             self._buffer = self._buffer[frame_end:]
+            captured_at = time.time()
+            self._last_frame_time = captured_at
+            self.stats['frames'] += 1
+            self.stats['bytes'] += len(frame_bytes)
+
+            # 錄影：原始 bytes 直接附加到 segment 檔
+            if self.recorder:
+                try:
+                    self.recorder.append(frame_bytes, captured_at)
+                except Exception as e:
+                    self.log(f"⚠️ Recorder error: {e}, recording stopped")
+                    self.recorder.close()
+                    self.recorder = None
             
             # 放入隊列（如果隊列滿了，丟棄最舊的幀以保持低延遲）
             try:
@@ -233,6 +581,6 @@ class MJPEGStreamReader:
                     except Empty:
                         pass
                 
-                self.frame_queue.put_nowait(frame_bytes)
+                self.frame_queue.put_nowait((captured_at, frame_bytes))
             except:
                 pass  # 隊列可能已關閉，忽略錯誤
@@ -1,4 +1,7 @@
+import queue
 import socket
+import threading
+import time
 from requests.adapters import HTTPAdapter
 from urllib3.poolmanager import PoolManager
 
@@ -29,3 +32,92 @@ class SourceAddressAdapter(HTTPAdapter):
             source_address=(self.source_address, 0),
             **pool_kwargs
         )
+
+
+def race_first(attempts, timeout, cleanup=None):
+    """
+    Happy-eyeballs style race: run every attempt concurrently and return the first success.
+
+    :param attempts: sequence of zero-argument callables; an attempt succeeds by returning
+                     a value other than None and fails by raising or returning None.
+    :param timeout: overall time budget in seconds.
+    :param cleanup: called with the result of every successful attempt that lost the race
+                    (or finished after the deadline), e.g. to close its socket.
+    :return: (index, result) of the winning attempt, or None if nothing succeeded in time.
+    """
+    if not attempts:
+        return None
+
+    results = queue.Queue()
+    lock = threading.Lock()
+    decided = [False]
+
+    def run(index, attempt):
+        try:
+            result = attempt()
+        except Exception:
+            result = None
+        with lock:
+            lost = decided[0]
+            if result is not None and not lost:
+                decided[0] = True
+        if result is not None and lost:
+            # Cancel the loser: the race is already decided
+            if cleanup:
+                try:
+                    cleanup(result)
+                except Exception:
+                    pass
+            return
+        results.put((index, result))
+
+    for index, attempt in enumerate(attempts):
+        threading.Thread(target=run, args=(index, attempt), daemon=True).start()
+
+    deadline = time.time() + timeout
+    pending = len(attempts)
+    while pending:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            index, result = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        pending -= 1
+        if result is not None:
+            return index, result
+
+    # Timed out: stragglers that still succeed must be cleaned up
+    with lock:
+        decided[0] = True
+    while True:
+        try:
+            _, result = results.get_nowait()
+        except queue.Empty:
+            break
+        if result is not None and cleanup:
+            try:
+                cleanup(result)
+            except Exception:
+                pass
+    return None
+
+
+def race_tcp_connect(hosts, port, timeout=1.0):
+    """
+    Open TCP connections to all ``hosts`` at once and return the first one that answers.
+
+    :return: the winning host, or None if none connected within ``timeout``.
+    """
+    hosts = [h for h in hosts if h]
+
+    def attempt(host):
+        return lambda: socket.create_connection((host, port), timeout=timeout)
+
+    winner = race_first([attempt(h) for h in hosts], timeout, cleanup=lambda sock: sock.close())
+    if winner is None:
+        return None
+    index, sock = winner
+    sock.close()
+    return hosts[index]
@@ -0,0 +1,35 @@
+"""
+Server -> 瀏覽器 SocketIO 事件的出口佇列
+
+控制 / 手把 / 狀態線程只把事件放進 ``ws_outbox`` (SimpleQueue.put 不會阻塞)，
+由單一 emitter 線程取出後呼叫 ``socketio.emit``；序列化與 socket 寫入都不在熱路徑線程上。
+
+emitter 每次把佇列中累積的事件一次取完，``LATEST_WINS`` 中的事件 (例如 controller_data)
+同一目標只保留最新一筆；其他事件 (版本化的 status_update 差異) 依序全部送出。
+廣播不帶 callback，python-socketio 對所有 client 只編碼一次封包。
+"""
+
+from typing import Iterable, List, NamedTuple, Optional
+
+# 只有最新值有意義的事件：積壓時舊的直接丟掉
+LATEST_WINS = frozenset({'controller_data'})
+
+
+class OutboxEvent(NamedTuple):
+    event: str
+    data: object
+    to: Optional[str] = None  # None = 廣播，否則為 client sid
+
+
+def coalesce(events: Iterable[OutboxEvent], latest_wins=LATEST_WINS) -> List[OutboxEvent]:
+    """
+    合併一批事件：latest_wins 中的事件每個 (event, to) 只留最後一筆，
+    留在最後一筆的位置；其他事件保持原順序
+    """
+    events = list(events)
+    last_index = {}
+    for i, item in enumerate(events):
+        if item.event in latest_wins:
+            last_index[(item.event, item.to)] = i
+    return [item for i, item in enumerate(events)
+            if item.event not in latest_wins or last_index[(item.event, item.to)] == i]
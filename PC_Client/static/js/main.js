@@ -2,6 +2,10 @@
 let socket;
 let wsConnected = false;
 let lastLogs = [];
+let statusState = { logs: [] };  // Merged status (server pushes only changed fields)
+let statusVersion = null;
+let statusSyncPending = false;
+const STATUS_LOG_TAIL = 30;
 let currentView = 'main';
 let lastFrameTime = 0;
 let radarAngle = 0;
@@ -54,9 +58,9 @@ function initWebSocket() {
         log("WS Disconnected");
     });
 
-    // Handle status updates pushed from server
+    // Handle status updates pushed from server (full status on connect, then deltas)
     socket.on('status_update', (data) => {
-        updateUI(data);
+        applyStatus(data);
     });
 
     // Handle controller feedback (if using hardware controller via server)
@@ -65,11 +69,28 @@ function initWebSocket() {
             window.handleControllerData(data);
         }
     });
+}
 
-    socket.on('log', (data) => {
-        // Optional: Real-time log stream
-        // log(data.data);
-    });
+function applyStatus(msg) {
+    if (msg.full) {
+        statusState = Object.assign({}, msg.state, { logs: msg.logs || [] });
+        statusSyncPending = false;
+    } else {
+        if (msg.base !== statusVersion) {
+            // Missed a delta (or joined mid-stream): ask for the full status once
+            if (!statusSyncPending) {
+                statusSyncPending = true;
+                socket.emit('status_sync');
+            }
+            return;
+        }
+        Object.assign(statusState, msg.changed);
+        if (msg.logs && msg.logs.length) {
+            statusState.logs = statusState.logs.concat(msg.logs).slice(-STATUS_LOG_TAIL);
+        }
+    }
+    statusVersion = msg.version;
+    updateUI(statusState);
 }
 
 function updateUI(data) {
@@ -0,0 +1,61 @@
+"""
+狀態推播的差異計算 (status_update)
+
+原本每 2 秒廣播一次完整狀態 (含最後 30 行 log)，不管有沒有變化；
+真正的變化 (距離、串流連線) 反而要等最多 2 秒才到 UI。
+
+改為版本化的狀態物件：
+- 每個短暫的合併窗 (數十 ms) 比對一次，只送有變化的欄位，沒有變化就不送
+- log 以游標 (累計行數) 追蹤，每次只送新的行
+- 訊息帶 version / base；client 發現 base 不是自己手上的版本 (漏收、重連) 就要求完整狀態
+
+訊息格式：
+    完整: {"version": v, "full": true, "state": {...}, "logs": [...], "log_cursor": n}
+    差異: {"version": v, "base": v - 1, "changed": {...}, "logs": [新行], "log_cursor": n}
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# logs_since(cursor) -> (cursor 之後的新行, 新的 cursor)
+LogSource = Callable[[int], Tuple[List[str], int]]
+
+
+class StatusTracker:
+    """保存上次推播的狀態，產生差異訊息 (推播線程呼叫 diff，連線 handler 呼叫 full)"""
+
+    def __init__(self, logs_since: LogSource, log_tail: int = 30):
+        """
+        Args:
+            logs_since: 取得游標之後的 log 行
+            log_tail: 完整狀態附帶的 log 行數
+        """
+        self.logs_since = logs_since
+        self.log_tail = log_tail
+        self.version = 0
+        self.pushes = 0
+        self._state: Dict[str, object] = {}
+        self._log_cursor = 0
+        self._lock = threading.Lock()
+
+    def diff(self, snapshot: Dict[str, object]) -> Optional[Dict[str, object]]:
+        """與上次的狀態比對；有變化時版本加一並返回差異訊息，否則返回 None"""
+        with self._lock:
+            changed = {k: v for k, v in snapshot.items()
+                       if k not in self._state or self._state[k] != v}
+            logs, cursor = self.logs_since(self._log_cursor)
+            if not changed and not logs:
+                return None
+            self._state.update(changed)
+            self._log_cursor = cursor
+            self.version += 1
+            self.pushes += 1
+            return {"version": self.version, "base": self.version - 1, "changed": changed,
+                    "logs": logs, "log_cursor": cursor}
+
+    def full(self) -> Dict[str, object]:
+        """目前版本的完整狀態 (新連線或 client 要求重新同步時)"""
+        with self._lock:
+            logs, _ = self.logs_since(max(0, self._log_cursor - self.log_tail))
+            return {"version": self.version, "full": True, "state": dict(self._state),
+                    "logs": logs[-self.log_tail:], "log_cursor": self._log_cursor}
@@ -0,0 +1,239 @@
+"""
+/video_feed 的串流 profile (每個 client 可選 fps / 寬度 / JPEG 品質)
+
+例如手機在弱 Wi-Fi 下開 ``/video_feed?fps=10&width=320&q=60``。
+相同 profile 的 client 共用同一份轉檔結果：每個 profile 每幀最多轉檔一次，
+與觀看人數無關。fps 以幀時間對齊取樣，同 profile 的 client 會選到同一批幀。
+
+沒有指定 width / q 時，``AdaptiveQuality`` 依該 client 的實際送出延遲在固定階梯上
+自動升降畫質；同一階的 client 一樣共用轉檔結果。
+"""
+
+import threading
+import time
+from typing import Dict, Mapping, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from jpeg_utils import probe_jpeg, JpegError
+
+MAX_FPS = 30.0
+MIN_WIDTH, MAX_WIDTH = 80, 1600
+MIN_QUALITY, MAX_QUALITY = 10, 95
+DEFAULT_QUALITY = 80
+
+# 縮小解碼：libjpeg 直接在 DCT 階段縮 1/2、1/4、1/8，比完整解碼再 resize 快得多
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                  (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+class StreamProfile(NamedTuple):
+    fps: Optional[float] = None    # None = 跟隨來源幀率
+    width: Optional[int] = None    # None = 原始寬度 (不放大)
+    quality: Optional[int] = None  # None = 沿用來源 JPEG
+
+    @property
+    def transcodes(self) -> bool:
+        """是否需要重新編碼 (只限 fps 時直接轉送原始 JPEG)"""
+        return self.width is not None or self.quality is not None
+
+    def label(self) -> str:
+        parts = [f"fps={self.fps:g}" if self.fps else None,
+                 f"width={self.width}" if self.width else None,
+                 f"q={self.quality}" if self.quality else None]
+        return "&".join(p for p in parts if p) or "source"
+
+
+def _clamp(value, low, high, cast):
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        return None
+    if number <= 0:
+        return None
+    return max(low, min(high, number))
+
+
+def parse_profile(args: Mapping[str, str]) -> StreamProfile:
+    """從 query string (request.args) 解析 profile；不合法的值視為未指定"""
+    fps = _clamp(args.get('fps'), 1.0, MAX_FPS, float)
+    width = _clamp(args.get('width'), MIN_WIDTH, MAX_WIDTH, int)
+    quality = _clamp(args.get('q', args.get('quality')), MIN_QUALITY, MAX_QUALITY, int)
+    return StreamProfile(fps, width, quality)
+
+
+def transcode(jpeg_bytes: bytes, width: Optional[int] = None, quality: Optional[int] = None) -> bytes:
+    """把 JPEG 縮到指定寬度 / 品質；不需要變動時直接返回原始 bytes"""
+    try:
+        source_width = probe_jpeg(jpeg_bytes).width
+    except JpegError:
+        return jpeg_bytes
+    if width is not None and width >= source_width:
+        width = None
+    if width is None and quality is None:
+        return jpeg_bytes
+
+    flags = cv2.IMREAD_COLOR
+    if width is not None:
+        factor = source_width // width
+        for scale, reduced in _REDUCED_FLAGS:
+            if factor >= scale:
+                flags = reduced
+                break
+    image = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), flags)
+    if image is None:
+        return jpeg_bytes
+    if width is not None and image.shape[1] > width:
+        height = max(1, round(image.shape[0] * width / image.shape[1]))
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality or DEFAULT_QUALITY])
+    return buffer.tobytes() if ok else jpeg_bytes
+
+
+class _Entry:
+    __slots__ = ('lock', 'seq', 'data', 'last_used')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = None
+        self.data = None
+        self.last_used = time.time()
+
+
+class ProfileCache:
+    """
+    每個 profile 保留最新一幀的轉檔結果
+
+    同 profile 的多個 client 同時要同一幀時，只有第一個執行轉檔，其他人等待後直接取用。
+    """
+
+    def __init__(self, max_profiles: int = 16, transcoder=None):
+        """
+        Args:
+            max_profiles: 最多保留幾個 profile
+            transcoder: 取代 transcode 的函式 (例如在 gevent / eventlet 下改丟到 thread pool 執行)
+        """
+        self.max_profiles = max_profiles
+        self._transcode = transcoder or transcode
+        self._entries: Dict[StreamProfile, _Entry] = {}
+        self._lock = threading.Lock()
+        self.transcoded = 0
+        self.shared = 0
+
+    def get(self, profile: StreamProfile, seq: int, jpeg_bytes: bytes) -> bytes:
+        if not profile.transcodes:
+            return jpeg_bytes
+        with self._lock:
+            entry = self._entries.get(profile)
+            if entry is None:
+                if len(self._entries) >= self.max_profiles:
+                    # 淘汰最久沒用的 profile
+                    oldest = min(self._entries, key=lambda p: self._entries[p].last_used)
+                    del self._entries[oldest]
+                entry = self._entries[profile] = _Entry()
+        with entry.lock:
+            entry.last_used = time.time()
+            if entry.seq != seq:
+                entry.data = self._transcode(jpeg_bytes, profile.width, profile.quality)
+                entry.seq = seq
+                self.transcoded += 1
+            else:
+                self.shared += 1
+            return entry.data
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            profiles = [p.label() for p in self._entries]
+        return {"profiles": profiles, "transcoded": self.transcoded, "shared": self.shared}
+
+
+def fps_slot(frame_time: float, fps: Optional[float]) -> Optional[int]:
+    """
+    幀時間所屬的取樣格 (每 1/fps 秒一格)；同一格只送第一幀
+
+    用幀的擷取時間而不是各 client 自己的計時，同 profile 的 client 才會挑到同一幀、共用轉檔。
+    """
+    if not fps:
+        return None
+    return int(frame_time * fps)
+
+
+class AdaptiveQuality:
+    """
+    依 client 實際送出速度自動升降畫質 (每個 /video_feed 連線一個)
+
+    generate_frames 每次 yield 後量測「交出這一幀到下一次被呼叫」的時間：socket send buffer
+    滿了 server 寫入就會阻塞，這段時間就是該幀排隊 + 傳送的延遲。超過目標就往下一階，
+    持續遠低於目標一段時間才往上一階 (避免來回跳動)。send buffer 需先調小，
+    否則 kernel 會先吞下好幾秒的資料，量到的延遲永遠很小。
+    """
+
+    # (寬度比例, JPEG 品質)；第 0 階 = 原始 JPEG 直接轉送
+    LADDER = ((1.0, None), (1.0, 65), (0.75, 55), (0.5, 50), (0.5, 35), (0.25, 35))
+
+    def __init__(self, target_latency: float = 0.15, step_down_cooldown: float = 0.5,
+                 step_up_after: float = 3.0, smoothing: float = 0.3):
+        """
+        Args:
+            target_latency: 每幀傳送延遲上限 (秒)
+            step_down_cooldown: 兩次降階的最短間隔，讓新畫質有時間反映在量測上
+            step_up_after: 延遲持續低於目標 30% 多久才升階
+            smoothing: EWMA 係數 (越大反應越快)
+        """
+        self.target_latency = target_latency
+        self.step_down_cooldown = step_down_cooldown
+        self.step_up_after = step_up_after
+        self.smoothing = smoothing
+        self.rung = 0
+        self.delay = 0.0        # 平滑後的每幀延遲 (秒)
+        self.throughput = 0.0   # 平滑後的送出速度 (bytes/s)，只在寫入有阻塞時更新
+        self.changes = 0
+        self._last_change = 0.0
+        self._good_since = None
+
+    def profile(self, base: StreamProfile, source_width: Optional[int]) -> StreamProfile:
+        """目前這一階對應的 profile (保留 base 的 fps)"""
+        scale, quality = self.LADDER[self.rung]
+        width = int(source_width * scale) if source_width and scale < 1.0 else None
+        return StreamProfile(base.fps, width, quality)
+
+    def observe(self, nbytes: int, drain_seconds: float, now: Optional[float] = None) -> bool:
+        """記錄一次 yield 的送出時間；畫質階層改變時返回 True"""
+        now = now if now is not None else time.time()
+        alpha = self.smoothing
+        self.delay = drain_seconds if self.delay == 0.0 else (1 - alpha) * self.delay + alpha * drain_seconds
+        if drain_seconds > 0.005:
+            rate = nbytes / drain_seconds
+            self.throughput = rate if self.throughput == 0.0 else (1 - alpha) * self.throughput + alpha * rate
+
+        if self.delay > self.target_latency:
+            self._good_since = None
+            if self.rung < len(self.LADDER) - 1 and now - self._last_change >= self.step_down_cooldown:
+                return self._step(+1, now)
+        elif self.delay < self.target_latency * 0.3:
+            if self._good_since is None:
+                self._good_since = now
+            elif self.rung > 0 and now - self._good_since >= self.step_up_after:
+                self._good_since = now
+                return self._step(-1, now)
+        else:
+            self._good_since = None
+        return False
+
+    def _step(self, direction: int, now: float) -> bool:
+        self.rung += direction
+        self._last_change = now
+        self.changes += 1
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        scale, quality = self.LADDER[self.rung]
+        return {
+            "rung": self.rung,
+            "scale": scale,
+            "quality": quality,
+            "delay_ms": round(self.delay * 1000, 1),
+            "throughput_kbps": round(self.throughput * 8 / 1000, 1),
+        }
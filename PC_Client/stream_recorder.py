@@ -0,0 +1,297 @@
+"""
+MJPEG Stream Recorder / Replay
+
+把 ESP32 送來的原始 JPEG 幀錄成 segment 檔，之後可以在沒有硬體的情況下
+重現卡頓或 AI 漏偵測，並對影像管線做 benchmark。
+
+檔案格式：
+- ``<name>.mjpg``: 原始 JPEG 幀直接串接 (不重新編碼)
+- ``<name>.idx``:  8 bytes 檔頭 (b'MJIX' + uint32 版本)，之後每幀一筆
+  ``<IdQI`` = (sequence number, timestamp, offset, length)，共 24 bytes
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from queue import Queue, Empty, Full
+from typing import Callable, List, Optional, Tuple
+
+INDEX_MAGIC = b'MJIX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sI')
+INDEX_RECORD = struct.Struct('<IdQI')  # seq, timestamp, offset, length
+
+
+def segment_paths(path: str) -> Tuple[str, str]:
+    """Return (segment, index) paths for a recording, with or without extension."""
+    base, ext = os.path.splitext(path)
+    if ext not in ('.mjpg', '.idx'):
+        base = path
+    return base + '.mjpg', base + '.idx'
+
+
+def load_index(index_path: str) -> List[Tuple[int, float, int, int]]:
+    """Read a ``.idx`` file into a list of (seq, timestamp, offset, length)."""
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    if len(data) < INDEX_HEADER.size:
+        return []
+    magic, version = INDEX_HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError(f"Not a recording index: {index_path}")
+    body = memoryview(data)[INDEX_HEADER.size:]
+    # 忽略寫到一半的最後一筆 (錄影中斷時可能發生)
+    usable = len(body) - len(body) % INDEX_RECORD.size
+    return list(INDEX_RECORD.iter_unpack(body[:usable]))
+
+
+class StreamRecorder:
+    """
+    將原始 JPEG 幀附加到 segment 檔並同步寫入索引
+
+    由 MJPEGStreamReader 的背景線程呼叫，只做 append，不解碼也不重新編碼。
+    """
+
+    def __init__(self, path: str, flush_every: int = 30):
+        """
+        Args:
+            path: 錄影檔路徑 (可省略副檔名)；若為資料夾則自動以時間命名。
+                  檔案已存在時接續寫入 (reader 重新啟動，例如換 URL，不會清掉先前的錄影)
+            flush_every: 每 N 幀 flush 一次，讓錄影中斷時仍保有大部分資料
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, time.strftime("stream_%Y%m%d_%H%M%S"))
+        self.segment_path, self.index_path = segment_paths(path)
+        self.flush_every = max(1, flush_every)
+        self.frames = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path) and os.path.exists(self.segment_path):
+            self._resume()
+        else:
+            self._segment = open(self.segment_path, 'wb')
+            self._index = open(self.index_path, 'wb')
+            self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+
+    def _resume(self):
+        """接續既有錄影：seq 與 offset 從索引最後一筆繼續，截掉索引之後寫到一半的資料"""
+        index = load_index(self.index_path)  # 不是錄影索引時 ValueError，不覆寫別的檔案
+        if index:
+            last_seq, _, last_offset, last_length = index[-1]
+            self.frames = last_seq + 1
+            self._offset = last_offset + last_length
+        os.truncate(self.segment_path, self._offset)
+        os.truncate(self.index_path, INDEX_HEADER.size + len(index) * INDEX_RECORD.size if index else 0)
+        self._segment = open(self.segment_path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        if not index:
+            self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+
+    def append(self, frame_bytes: bytes, timestamp: Optional[float] = None) -> int:
+        """寫入一幀，返回其 sequence number"""
+        ts = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if self._segment is None:
+                return -1
+            seq = self.frames
+            length = len(frame_bytes)
+            self._segment.write(frame_bytes)
+            self._index.write(INDEX_RECORD.pack(seq, ts, self._offset, length))
+            self._offset += length
+            self.frames += 1
+            if self.frames % self.flush_every == 0:
+                self._segment.flush()
+                self._index.flush()
+            return seq
+
+    def close(self):
+        with self._lock:
+            if self._segment is None:
+                return
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+
+class ReplayReader:
+    """
+    以 mmap 重播錄影檔，介面與 MJPEGStreamReader 相同 (start/stop/read/read_timestamped)
+
+    - realtime=True: 依原始時間間隔送出 (queue 滿時丟棄最舊的幀，行為同 live stream)
+    - realtime=False: 盡可能快送出 (queue 滿時等待，不丟幀，適合 benchmark)
+    """
+
+    def __init__(self,
+                 path: str,
+                 realtime: bool = True,
+                 loop: bool = False,
+                 frame_queue_size: int = 2,
+                 log_callback: Optional[Callable[[str], None]] = None):
+        self.segment_path, self.index_path = segment_paths(path)
+        self.url = f"replay://{self.segment_path}"
+        self.realtime = realtime
+        self.loop = loop
+        self.log = log_callback or print
+
+        self.index = load_index(self.index_path)
+        self._seqs = [rec[0] for rec in self.index]
+        self._timestamps = [rec[1] for rec in self.index]
+        self._file = open(self.segment_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+        self.frame_queue = Queue(maxsize=frame_queue_size)
+        self.running = False
+        self.finished = False
+        self.paused = False
+        self.reader_thread = None
+        self._position = 0
+        self._rebase = False
+        self._seek_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self) -> float:
+        if len(self._timestamps) < 2:
+            return 0.0
+        return self._timestamps[-1] - self._timestamps[0]
+
+    def frame(self, position: int) -> bytes:
+        """直接取出第 position 幀的 JPEG bytes (從 mmap 切片)"""
+        _, _, offset, length = self.index[position]
+        return self._mm[offset:offset + length]
+
+    def seek(self, seq: int):
+        """跳到指定 sequence number (或其後第一幀)"""
+        with self._seek_lock:
+            self._position = bisect.bisect_left(self._seqs, seq)
+            self._rebase = True
+
+    def seek_time(self, seconds: float):
+        """跳到錄影開始後 seconds 秒的位置"""
+        if not self._timestamps:
+            return
+        target = self._timestamps[0] + seconds
+        with self._seek_lock:
+            self._position = bisect.bisect_left(self._timestamps, target)
+            self._rebase = True
+
+    def start(self):
+        if self.running:
+            return
+        if not self.index or self._mm is None:
+            self.log(f"⚠️ Empty recording: {self.segment_path}")
+            return
+        self.running = True
+        self.finished = False
+        self.reader_thread = threading.Thread(target=self._replay_loop, daemon=True)
+        self.reader_thread.start()
+        self.log(f"▶️ Replaying {len(self.index)} frames ({self.duration:.1f}s) from {self.segment_path}")
+
+    def stop(self):
+        self.running = False
+        if self.reader_thread:
+            self.reader_thread.join(timeout=2)
+            self.reader_thread = None
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            with self._seek_lock:
+                self._rebase = True  # 從目前位置重新對齊時間軸
+
+    def close(self):
+        self.stop()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def read(self, timeout: float = 0.1) -> Optional[bytes]:
+        packet = self.read_timestamped(timeout)
+        return packet[1] if packet else None
+
+    def read_timestamped(self, timeout: float = 0.1) -> Optional[Tuple[float, bytes]]:
+        try:
+            return self.frame_queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def _replay_loop(self):
+        """依索引送出幀；時間戳為送出當下的 time.time()，讓下游 deadline 判斷照常運作"""
+        base_wall = None
+        base_ts = None
+        while self.running:
+            if self.paused:
+                time.sleep(0.05)
+                continue
+            with self._seek_lock:
+                if self._position >= len(self.index):
+                    if not self.loop:
+                        break
+                    self._position = 0
+                    self._rebase = True
+                if self._rebase:
+                    base_wall = None
+                    self._rebase = False
+                position = self._position
+                self._position += 1
+
+            _, ts, _, _ = self.index[position]
+            if self.realtime:
+                now = time.time()
+                if base_wall is None:
+                    base_wall, base_ts = now, ts
+                delay = (ts - base_ts) - (now - base_wall)
+                if delay > 0:
+                    time.sleep(delay)
+
+            packet = (time.time(), self.frame(position))
+            if self.realtime:
+                if self.frame_queue.full():
+                    try:
+                        self.frame_queue.get_nowait()
+                    except Empty:
+                        pass
+                try:
+                    self.frame_queue.put_nowait(packet)
+                except Full:
+                    pass
+            else:
+                while self.running:
+                    try:
+                        self.frame_queue.put(packet, timeout=0.1)
+                        break
+                    except Full:
+                        continue
+
+        self.finished = True
+        self.running = False
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python stream_recorder.py <recording.mjpg>")
+        sys.exit(1)
+
+    replay = ReplayReader(sys.argv[1])
+    sizes = [rec[3] for rec in replay.index]
+    print(f"Segment : {replay.segment_path}")
+    print(f"Frames  : {len(replay)}")
+    print(f"Duration: {replay.duration:.2f}s")
+    if replay.duration > 0:
+        print(f"Avg FPS : {(len(replay) - 1) / replay.duration:.1f}")
+    if sizes:
+        print(f"Size    : avg {sum(sizes) / len(sizes) / 1024:.1f} KB, max {max(sizes) / 1024:.1f} KB")
+    replay.close()
@@ -0,0 +1,60 @@
+import os
+import socket
+import struct
+import sys
+from pathlib import Path
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+
+import arm_protocol
+
+
+def _legacy_packet(cmd_id, payload_fmt, args):
+    """send_robot_packet 原本的組包方式 (逐位元 CRC16-CCITT)，韌體也是這樣算"""
+    body = b'RM' + struct.pack('B', cmd_id) + struct.pack(payload_fmt, *args)
+    crc = 0xFFFF
+    for byte in body:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return body + struct.pack('<H', crc)
+
+
+def test_packets_match_legacy_encoder():
+    args = (90.0, 45.5, 120.25, 50.0)
+    packet = arm_protocol.encode_angles(*args)
+    assert packet == _legacy_packet(0x03, '<ffff', args)
+    assert len(packet) == 21
+
+    for size in range(0, 40, 7):
+        payload = os.urandom(size)
+        assert arm_protocol.encode_packet(0x05, payload) == _legacy_packet(0x05, f'{size}s', (payload,))
+
+
+def test_decode_rejects_corruption():
+    packet = arm_protocol.encode_angles(1.0, 2.0, 3.0, 4.0)
+    cmd_id, payload = arm_protocol.decode_packet(packet)
+    assert cmd_id == arm_protocol.CMD_SET_ANGLES
+    assert arm_protocol.ANGLES.unpack(payload) == (1.0, 2.0, 3.0, 4.0)
+    assert arm_protocol.decode_packet(packet[:-1] + bytes((packet[-1] ^ 1,))) is None
+    assert arm_protocol.decode_packet(b'XY' + packet[2:]) is None
+    assert arm_protocol.decode_packet(b'RM') is None
+
+
+def test_sender_unicasts_to_known_arm():
+    arm = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    arm.bind(("127.0.0.1", 0))
+    arm.settimeout(2.0)
+    sender = arm_protocol.ArmSender(port=arm.getsockname()[1])
+    try:
+        packet = arm_protocol.encode_angles(90, 90, 90, 50)
+        assert sender.send(packet, "127.0.0.1")
+        assert sender.send(packet, "127.0.0.1")
+        assert arm.recvfrom(64)[0] == packet
+        assert arm.recvfrom(64)[0] == packet
+        assert sender.stats()["unicast"] == 2 and sender.stats()["broadcast"] == 0
+    finally:
+        sender.close()
+        arm.close()
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+
+from arm_stream import ArmStream
+
+
+def test_sends_on_change_and_keepalive_when_still():
+    stream = ArmStream(epsilon=(0.5, 0.5, 0.5, 1.0), max_rate=12.5, keepalive=1.0)
+    still = (90.0, 90.0, 90.0, 50.0)
+
+    assert stream.offer(still, now=0.0) == 'change'   # First command always goes out
+    # Holding still at the 20 Hz loop rate: only one keepalive per second
+    sent = [stream.offer(still, now=0.05 * i) for i in range(1, 40)]
+    assert sent.count('keepalive') == 1
+    assert sent.count(None) == 38
+
+    # Jitter below epsilon is not sent; the gripper has a wider band
+    assert stream.offer((90.3, 90.0, 90.0, 50.8), now=1.5) is None
+    assert stream.offer((90.0, 90.0, 90.0, 51.5), now=1.55) == 'change'
+
+
+def test_rate_rises_while_moving_but_is_capped():
+    stream = ArmStream(epsilon=0.5, max_rate=12.5, keepalive=1.0)
+    stream.offer((90, 90, 90, 50), now=0.0)
+
+    # Moving 2 degrees per 50 ms tick (the 20 Hz gamepad loop): capped to every other tick
+    sent = [stream.offer((90 + 2 * i, 90, 90, 50), now=0.05 * i) for i in range(1, 11)]
+    assert sent == [None, 'change'] * 5
+
+    # Faster than max_rate: intermediate targets are skipped, not queued
+    sent = [stream.offer((120 + i, 90, 90, 50), now=0.5 + 0.01 * i) for i in range(1, 21)]
+    assert 2 <= sent.count('change') <= 3
+
+
+def test_reset_after_failed_send_resends_same_target():
+    stream = ArmStream(epsilon=0.5, max_rate=12.5, keepalive=1.0)
+    assert stream.offer((90, 90, 90, 50), now=0.0) == 'change'
+    stream.reset()  # The packet never went out
+    assert stream.offer((90, 90, 90, 50), now=0.05) == 'change'
+
+
+def test_small_drift_accumulates_against_last_sent():
+    stream = ArmStream(epsilon=0.5, max_rate=0, keepalive=0)
+    stream.offer((90, 90, 90, 50), now=0.0)
+    results = [stream.offer((90 + 0.2 * i, 90, 90, 50), now=0.1 * i) for i in range(1, 4)]
+    assert results == [None, None, 'change']  # 0.6 deg from the last sent target
+    assert stream.offer((90.6, 90, 90, 50), now=100.0) is None  # keepalive disabled
+
+
+def test_unthrottled_offers_only_deduplicate():
+    stream = ArmStream(epsilon=0.5, max_rate=12.5, keepalive=1.0)
+    assert stream.offer((90, 90, 90, 50), now=0.0, throttle=False) == 'change'
+    assert stream.offer((95, 90, 90, 50), now=0.001, throttle=False) == 'change'
+    assert stream.offer((95, 90, 90, 50), now=0.002, throttle=False) is None
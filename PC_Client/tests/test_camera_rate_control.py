@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+from camera_rate_control import RATE_LADDER, CameraRateController
+
+
+class FakeStream:
+    """模擬 MJPEGStreamReader.stats 的累計計數"""
+
+    def __init__(self):
+        self.stats = {"frames": 0, "bytes": 0, "stalls": 0, "failed_connects": 0, "connects": 1}
+
+    def run(self, controller, seconds, fps, now, step=0.5):
+        for _ in range(int(seconds / step)):
+            self.stats["frames"] += int(fps * step)
+            self.stats["bytes"] += int(fps * step) * 30000
+            now += step
+            controller.update(self.stats, now=now)
+        return now
+
+
+def _controller(sent, **kwargs):
+    return CameraRateController(target_fps=20, window=2.0, upgrade_after=10.0,
+                                send=lambda var, val: sent.append((var, val)) or True,
+                                fetch_status=lambda: None, log_callback=lambda _: None, **kwargs)
+
+
+def test_low_frame_rate_degrades_one_step_per_window():
+    sent = []
+    controller = _controller(sent)
+    stream = FakeStream()
+
+    stream.run(controller, 6.0, fps=8, now=100.0)
+
+    assert controller.level == 2
+    assert sent == [("quality", RATE_LADDER[1][1]),
+                    ("framesize", RATE_LADDER[2][0]), ("quality", RATE_LADDER[2][1])]
+
+
+def test_upgrade_needs_sustained_headroom_and_backs_off_when_it_fails():
+    sent = []
+    controller = _controller(sent)
+    controller.level = 3
+    stream = FakeStream()
+
+    now = stream.run(controller, 8.0, fps=25, now=100.0)
+    assert controller.level == 3  # 還沒滿 10 秒
+    now = stream.run(controller, 6.0, fps=25, now=now)
+    assert controller.level == 2
+
+    # 升上去馬上撐不住：降回來，且這一階下次要等兩倍時間
+    now = stream.run(controller, 3.0, fps=10, now=now)
+    assert controller.level == 3
+    now = stream.run(controller, 14.0, fps=25, now=now)
+    assert controller.level == 3
+    stream.run(controller, 10.0, fps=25, now=now)
+    assert controller.level == 2
+
+
+def test_stalls_and_weak_signal_count_as_bad_windows():
+    controller = _controller([])
+    stream = FakeStream()
+    now = stream.run(controller, 2.5, fps=25, now=100.0)
+    stream.stats["stalls"] += 1
+    now = stream.run(controller, 2.0, fps=25, now=now)
+    assert controller.level == 1
+
+    controller.rssi = -85
+    stream.run(controller, 2.0, fps=25, now=now)
+    assert controller.level == 2
+
+
+def test_http_control_reaches_the_camera():
+    pytest.importorskip("cv2")
+    pytest.importorskip("requests")
+    from esp32_emulator import ESP32Emulator
+
+    with ESP32Emulator(http_port=0, stream_port=0, beacon=False, log_callback=lambda _: None) as emulator:
+        emulator.rssi = -60
+        controller = CameraRateController(control_port=emulator.http_port, log_callback=lambda _: None)
+        controller.set_host(emulator.stream_url)
+        controller._run_job(("status", None))
+        assert controller.rssi == -60
+        assert controller._http_send("quality", 25)
+        assert emulator.settings["quality"] == 25
@@ -0,0 +1,94 @@
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+from network_utils import race_first, race_tcp_connect
+
+
+def test_race_first_returns_fastest_success_and_cleans_up_losers():
+    cleaned = []
+
+    def slow():
+        time.sleep(0.2)
+        return "slow"
+
+    def failing():
+        raise OSError("refused")
+
+    winner = race_first([slow, failing, lambda: "fast"], timeout=1.0, cleanup=cleaned.append)
+    time.sleep(0.3)
+
+    assert winner == (2, "fast")
+    assert cleaned == ["slow"]
+
+
+def test_race_first_times_out_when_nothing_answers():
+    assert race_first([lambda: None, lambda: time.sleep(0.5)], timeout=0.1) is None
+
+
+def test_race_tcp_connect_skips_dead_hosts():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    try:
+        assert race_tcp_connect(["127.0.0.2", "127.0.0.1"], port, timeout=1.0) == "127.0.0.1"
+    finally:
+        server.close()
+
+
+def test_reader_uses_first_candidate_with_multipart_response():
+    pytest.importorskip("requests")
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    from mjpeg_reader import MJPEGStreamReader
+
+    emulator = ESP32Emulator(http_port=0, stream_port=0, fps=30, beacon=False, log_callback=lambda msg: None)
+    emulator.start()
+    # Port 1 on loopback refuses; the control port answers but not with multipart
+    dead_url = "http://127.0.0.1:1/stream"
+    wrong_url = f"{emulator.base_url}/stream"
+    reader = MJPEGStreamReader(dead_url, candidate_urls=[wrong_url, emulator.stream_url],
+                               log_callback=lambda msg: None)
+    start = time.time()
+    reader.start()
+    try:
+        frame = None
+        while frame is None and time.time() - start < 3.0:
+            frame = reader.read(timeout=0.05)
+        elapsed = time.time() - start
+    finally:
+        reader.stop()
+        emulator.stop()
+
+    assert frame is not None
+    assert elapsed < 1.0
+    assert reader.url == emulator.stream_url
+
+
+def test_candidate_sessions_are_bound_to_source_ip():
+    pytest.importorskip("requests")
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    from mjpeg_reader import MJPEGStreamReader
+    from network_utils import SourceAddressAdapter
+
+    emulator = ESP32Emulator(http_port=0, stream_port=0, fps=30, beacon=False, log_callback=lambda msg: None)
+    emulator.start()
+    reader = MJPEGStreamReader("http://127.0.0.1:1/stream", source_ip="127.0.0.1",
+                               candidate_urls=[emulator.stream_url], log_callback=lambda msg: None)
+    try:
+        opened = reader._try_open(emulator.stream_url)
+        assert opened is not None
+        _, session, _ = opened
+        assert isinstance(session.get_adapter(emulator.stream_url), SourceAddressAdapter)
+        reader._close_opened(opened)
+    finally:
+        emulator.stop()
@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from control_dispatcher import ControlDispatcher
+
+
+class _Device:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def send(self, left, right):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.received.append((time.monotonic(), (left, right)))
+        return True
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_burst_collapses_to_latest_command_at_max_rate():
+    device = _Device()
+    dispatcher = ControlDispatcher(device.send, max_rate=10.0, deadline=1.0, log_callback=lambda _: None).start()
+    try:
+        dispatcher.submit(100, 100)
+        assert _wait(lambda: len(device.received) == 1)
+        for value in range(101, 121):
+            dispatcher.submit(value, value)
+        assert _wait(lambda: device.received[-1][1] == (120, 120))
+        time.sleep(0.15)
+        # Everything submitted during the rate window collapsed into the newest command
+        commands = [cmd for _, cmd in device.received]
+        assert commands[0] == (100, 100) and commands[-1] == (120, 120) and len(commands) <= 3
+        assert all(b[0] - a[0] >= 0.09 for a, b in zip(device.received, device.received[1:]))
+        assert dispatcher.superseded >= 17
+    finally:
+        dispatcher.stop()
+
+
+def test_stop_skips_the_rate_limit():
+    device = _Device()
+    dispatcher = ControlDispatcher(device.send, max_rate=2.0, deadline=1.0, log_callback=lambda _: None).start()
+    try:
+        dispatcher.submit(200, 200)
+        assert _wait(lambda: len(device.received) == 1)
+        started = time.monotonic()
+        dispatcher.submit(0, 0)
+        assert _wait(lambda: len(device.received) == 2, timeout=0.2)
+        assert device.received[1][1] == (0, 0)
+        assert device.received[1][0] - started < 0.1
+    finally:
+        dispatcher.stop()
+
+
+def test_late_commands_are_sent_only_if_still_newest():
+    device = _Device()
+    device.release.clear()  # Device link hangs on the first send
+    dispatcher = ControlDispatcher(device.send, max_rate=100.0, deadline=0.05, log_callback=lambda _: None).start()
+    try:
+        dispatcher.submit(50, 50)
+        time.sleep(0.02)
+        dispatcher.submit(60, 60)  # Replaced before it could go out
+        dispatcher.submit(70, 70)  # Waits behind the hung send, past the deadline
+        time.sleep(0.1)
+        device.release.set()
+        assert _wait(lambda: len(device.received) == 2)
+        time.sleep(0.05)
+        assert [cmd for _, cmd in device.received] == [(50, 50), (70, 70)]
+        assert dispatcher.superseded == 1
+        assert dispatcher.late == 1
+    finally:
+        dispatcher.stop()
+
+
+def test_stop_is_delivered_even_when_it_waited_past_the_deadline():
+    device = _Device(delay=0.4)  # Every send takes longer than the deadline
+    dispatcher = ControlDispatcher(device.send, max_rate=100.0, deadline=0.25, log_callback=lambda _: None).start()
+    try:
+        dispatcher.submit(200, 200)
+        time.sleep(0.05)
+        dispatcher.submit(0, 0)  # Queued behind the slow send for ~0.35 s
+        assert _wait(lambda: len(device.received) == 2)
+        assert [cmd for _, cmd in device.received] == [(200, 200), (0, 0)]
+    finally:
+        dispatcher.stop()
+
+
+def test_single_change_is_delivered_even_when_it_waited_past_the_deadline():
+    device = _Device(delay=0.4)  # e.g. the HTTP fallback with its 1 s timeout
+    dispatcher = ControlDispatcher(device.send, max_rate=100.0, deadline=0.25, log_callback=lambda _: None).start()
+    try:
+        dispatcher.submit(100, 100)
+        time.sleep(0.05)
+        dispatcher.submit(-200, 200)  # Callers submit only on change: nothing else will replace it
+        assert _wait(lambda: len(device.received) == 2)
+        assert [cmd for _, cmd in device.received] == [(100, 100), (-200, 200)]
+        assert dispatcher.late == 1
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,107 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+import control_protocol as proto
+
+
+def test_command_and_ack_round_trip():
+    frame = proto.encode_command(7, -255, 40000, sent_ms=1234)
+    assert len(frame) == 15
+    assert proto.decode(frame) == ('cmd', proto.FLAG_ACK, 7, -255, 32767, 1234)
+    assert proto.decode(proto.encode_ack(7, 1234)) == ('ack', 7, 1234)
+    assert proto.decode(proto.encode_hello()) == ('hello',)
+    assert proto.decode(b'\x09\x01' + frame[2:]) is None  # Unknown version
+
+
+def test_link_stats_rtt_loss_and_reordering():
+    stats = proto.LinkStats(loss_timeout=1.0)
+    for seq in (1, 2, 3, 4):
+        stats.on_send(seq, now=10.0)
+    assert stats.on_ack(2, now=10.020) == pytest.approx(0.020)
+    assert stats.on_ack(1, now=10.030) == pytest.approx(0.030)  # Older than an acked seq
+    assert stats.on_ack(1, now=10.031) is None                  # Duplicate
+
+    summary = stats.stats(now=11.5)  # 3 and 4 never acked
+    assert summary["acked"] == 2 and summary["lost"] == 2 and summary["reordered"] == 1
+    assert summary["loss_rate"] == 0.5
+    assert summary["rtt_ms"] == 30.0
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_client_negotiates_protocol_with_emulator(binary):
+    pytest.importorskip("websocket")
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    from control_client import AsyncControlClient
+
+    emulator = ESP32Emulator(http_port=0, stream_port=0, beacon=False, binary_control=binary,
+                             log_callback=lambda msg: None).start()
+    client = AsyncControlClient(f"127.0.0.1:{emulator.http_port}")
+    try:
+        deadline = time.time() + 3.0
+        while not client.connected and time.time() < deadline:
+            time.sleep(0.01)
+        assert client.protocol == ('binary' if binary else 'json')
+
+        for value in (100, 120, 140):
+            assert client.send(value, -value)
+        deadline = time.time() + 2.0
+        while len(emulator.commands) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert (emulator.commands[-1].left, emulator.commands[-1].right) == (140, -140)
+
+        if binary:
+            while client.link.acked < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            stats = client.stats()
+            assert stats["acked"] == 3 and stats["lost"] == 0
+            assert stats["rtt_ms"] is not None
+    finally:
+        client.close()
+        emulator.stop()
+
+
+def test_heartbeat_detects_half_open_link_and_recovers():
+    pytest.importorskip("websocket")
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    from control_client import AsyncControlClient
+
+    emulator = ESP32Emulator(http_port=0, stream_port=0, beacon=False, log_callback=lambda msg: None).start()
+    client = AsyncControlClient(f"127.0.0.1:{emulator.http_port}", heartbeat_interval=0.1,
+                                miss_threshold=3, reconnect_delay=0.1)
+    try:
+        deadline = time.time() + 3.0
+        while not client.connected and time.time() < deadline:
+            time.sleep(0.01)
+        assert client.connected
+        time.sleep(0.3)
+        assert client.stats()["ping_rtt_ms"] is not None
+
+        # Socket stays open but nothing comes back: must fail over within a few intervals
+        emulator.blackhole_ws(5.0)
+        started = time.time()
+        while client.connected and time.time() - started < 2.0:
+            time.sleep(0.01)
+        assert not client.connected
+        assert time.time() - started < 0.8
+        assert not client.send(50, 50)  # Caller falls back to HTTP
+
+        # Background reconnect (new connections are healthy) switches back to WebSocket
+        deadline = time.time() + 3.0
+        while not client.connected and time.time() < deadline:
+            time.sleep(0.01)
+        assert client.connected and client.send(60, 60)
+        stats = client.stats()
+        assert stats["heartbeat_failures"] == 1 and stats["failovers"] == 1
+        assert stats["http_seconds"] > 0 and stats["ws_seconds"] > 0
+    finally:
+        client.close()
+        emulator.stop()
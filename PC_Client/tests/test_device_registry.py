@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+
+from device_registry import DeviceRegistry
+
+
+def test_events_and_ttl():
+    registry = DeviceRegistry(ttl=10.0)
+    _, event = registry.observe("car-a", "car", "10.0.0.5", ["stream"], now=0.0)
+    assert event == 'new'
+    assert registry.observe("car-a", "car", "10.0.0.5", now=3.0)[1] is None
+    device, event = registry.observe("car-a", "car", "10.0.0.9", now=6.0)
+    assert event == 'moved' and device.address == "10.0.0.9"
+    assert registry.observe("car-a", "car", "10.0.0.9", now=30.0)[1] == 'new'  # Back after going silent
+
+    snapshot = registry.snapshot(now=35.0)
+    assert snapshot["devices"][0]["alive"] and snapshot["devices"][0]["bound"]
+    assert snapshot["devices"][0]["capabilities"] == ["stream"]
+    assert not registry.snapshot(now=45.0)["devices"][0]["alive"]
+    assert registry.snapshot(now=500.0)["devices"] == []  # Forgotten long after the TTL
+
+
+def test_two_cars_do_not_flap():
+    registry = DeviceRegistry(ttl=10.0)
+    for t in range(0, 30, 3):
+        registry.observe("car-a", "car", "10.0.0.5", now=t)
+        registry.observe("car-b", "car", "10.0.0.6", now=t + 1)
+        assert registry.bound("car", now=t + 1).id == "car-a"  # First seen keeps the session
+
+    # Auto-bound car goes away: fail over to the other live car
+    registry.observe("car-b", "car", "10.0.0.6", now=40.0)
+    assert registry.bound("car", now=40.0).id == "car-b"
+    assert registry.snapshot(now=40.0)["bindings"]["car"] == {"id": "car-b", "explicit": False}
+
+
+def test_explicit_binding_sticks():
+    registry = DeviceRegistry(ttl=10.0, preferred={"car": "car-b", "arm": None})
+    registry.observe("car-a", "car", "10.0.0.5", now=0.0)
+    assert registry.bound("car", now=0.0) is None  # Chosen car not seen yet
+    registry.observe("car-b", "car", "10.0.0.6", now=1.0)
+    assert registry.bound("car", now=1.0).address == "10.0.0.6"
+    registry.observe("car-a", "car", "10.0.0.5", now=20.0)
+    assert registry.bound("car", now=20.0) is None  # car-b offline, but never switch to car-a
+
+    registry.bind("car", None)  # Back to automatic
+    registry.observe("car-a", "car", "10.0.0.5", now=21.0)
+    assert registry.bound("car", now=21.0).id == "car-a"
+
+    registry.observe("arm-1", "arm", "10.0.0.7", now=21.0)
+    assert registry.bound("arm", now=21.0).id == "arm-1"  # Types bind independently
@@ -0,0 +1,75 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+requests = pytest.importorskip("requests")
+pytest.importorskip("cv2")
+
+from esp32_emulator import ESP32Emulator
+from mjpeg_reader import MJPEGStreamReader
+
+
+@pytest.fixture
+def emulator():
+    emu = ESP32Emulator(http_port=0, stream_port=0, fps=30, framesize=5, beacon=False,
+                        log_callback=lambda msg: None)
+    emu.start()
+    yield emu
+    emu.stop()
+
+
+def test_status_and_control_round_trip(emulator):
+    assert requests.get(emulator.base_url + "/status", timeout=2).json()["framesize"] == 5
+
+    resp = requests.get(emulator.base_url + "/control", params={"var": "quality", "val": 20}, timeout=2)
+    assert resp.status_code == 200
+    assert emulator.settings["quality"] == 20
+
+    resp = requests.get(emulator.base_url + "/control", params={"var": "bogus", "val": 1}, timeout=2)
+    assert resp.status_code == 500
+
+
+def test_motor_commands_are_recorded_with_arrival_time(emulator):
+    before = time.time()
+    resp = requests.get(emulator.base_url + "/motor", params={"left": 120, "right": -80}, timeout=2)
+
+    assert resp.text == "OK"
+    assert emulator.motor == (120, -80)
+    assert emulator.commands[-1].transport == "http"
+    assert emulator.commands[-1].arrived_at >= before
+
+
+def test_websocket_control_commands(emulator):
+    websocket = pytest.importorskip("websocket")
+    ws = websocket.create_connection(f"ws://{emulator.host}:{emulator.http_port}/ws/control", timeout=2)
+    ws.send(json.dumps({"l": 200, "r": 150}))
+
+    deadline = time.time() + 2.0
+    while not emulator.commands and time.time() < deadline:
+        time.sleep(0.01)
+    ws.close()
+
+    assert emulator.commands[-1].transport == "ws"
+    assert (emulator.commands[-1].left, emulator.commands[-1].right) == (200, 150)
+
+
+def test_mjpeg_reader_receives_emulated_stream(emulator):
+    reader = MJPEGStreamReader(emulator.stream_url, log_callback=lambda msg: None)
+    reader.start()
+    try:
+        frame = None
+        deadline = time.time() + 3.0
+        while frame is None and time.time() < deadline:
+            frame = reader.read(timeout=0.1)
+    finally:
+        reader.stop()
+
+    assert frame is not None
+    assert frame[:2] == b"\xff\xd8" and frame[-2:] == b"\xff\xd9"
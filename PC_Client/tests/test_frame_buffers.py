@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+np = pytest.importorskip("numpy")
+
+from frame_buffers import FrameRing
+
+
+def test_frame_ring_hands_off_jpeg_between_attached_views():
+    writer = FrameRing(slots=2, slot_size=1024)
+    reader = FrameRing.attach(writer.spec)
+    try:
+        payload = np.frombuffer(b"\xff\xd8jpeg\xff\xd9", np.uint8)
+        slot = writer.write(1, 123.0, payload)
+
+        assert reader.read(slot, 1) == payload.tobytes()
+        assert reader.read(slot, 2) is None  # seq 不符
+        assert writer.write(2, 0.0, b"x" * 2048) is None  # 太大，交給 queue
+
+        writer.write(2, 0.0, b"second")
+        writer.write(3, 0.0, b"third")  # 覆寫 slot 0
+        assert reader.read(slot, 1) is None
+    finally:
+        reader.close()
+        writer.close()
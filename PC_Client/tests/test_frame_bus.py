@@ -0,0 +1,59 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from frame_bus import FrameBusPublisher, FrameBusSubscriber
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_subscriber_receives_frames_on_its_channel_only():
+    bus = FrameBusPublisher(port=0, log_callback=lambda _: None).start()
+    raw = FrameBusSubscriber(port=bus.port, channel="raw", log_callback=lambda _: None)
+    processed = FrameBusSubscriber(port=bus.port, channel="processed", log_callback=lambda _: None)
+    try:
+        assert bus.publish("raw", 1, 1.0, b"nobody") == 0
+        raw.start()
+        processed.start()
+        assert _wait(lambda: bus.subscribers == 2)
+
+        bus.publish("raw", 7, 123.5, b"\xff\xd8raw\xff\xd9")
+        bus.publish("processed", 3, 124.0, memoryview(b"\xff\xd8ai\xff\xd9"))
+
+        assert raw.read_timestamped(timeout=1.0) == (123.5, b"\xff\xd8raw\xff\xd9")
+        assert raw.last_seq == 7
+        assert processed.read(timeout=1.0) == b"\xff\xd8ai\xff\xd9"
+        assert raw.read(timeout=0.1) is None
+    finally:
+        raw.stop()
+        processed.stop()
+        bus.stop()
+
+
+def test_slow_subscriber_drops_old_frames_without_blocking_publish():
+    bus = FrameBusPublisher(port=0, queue_size=2, log_callback=lambda _: None).start()
+    subscriber = FrameBusSubscriber(port=bus.port, frame_queue_size=1, log_callback=lambda _: None)
+    try:
+        subscriber.start()
+        assert _wait(lambda: bus.subscribers == 1)
+
+        frame = b"\x00" * 200_000
+        started = time.perf_counter()
+        for seq in range(1, 201):
+            bus.publish("raw", seq, time.time(), frame)
+        assert time.perf_counter() - started < 0.1  # publish 不做 I/O
+
+        assert _wait(lambda: subscriber.last_seq == 200)
+        assert subscriber.received < 200
+    finally:
+        subscriber.stop()
+        bus.stop()
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from frame_deadline import FrameDeadline
+
+
+def test_fresh_frame_passes_and_late_frame_is_counted():
+    deadline = FrameDeadline(100)
+
+    assert deadline.expired("decode", captured_at=10.0, now=10.05) is False
+    assert deadline.expired("encode", captured_at=10.0, now=10.2) is True
+
+    stats = deadline.stats()
+    assert stats["dropped"]["encode"] == 1
+    assert stats["dropped"]["decode"] == 0
+    assert stats["passed"]["decode"] == 1
+    assert deadline.total_dropped() == 1
+
+
+def test_zero_max_age_disables_dropping():
+    deadline = FrameDeadline(0)
+
+    assert deadline.expired("publish", captured_at=0.0, now=1000.0) is False
+    assert deadline.total_dropped() == 0
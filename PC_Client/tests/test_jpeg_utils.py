@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from jpeg_utils import JpegError, is_valid_jpeg, probe_jpeg
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+
+def _encode(width=320, height=240, **params):
+    image = np.zeros((height, width, 3), np.uint8)
+    cv2.rectangle(image, (20, 20), (width - 20, height - 20), (0, 200, 255), -1)
+    flags = []
+    for key, value in params.items():
+        flags += [getattr(cv2, key), value]
+    ok, buffer = cv2.imencode(".jpg", image, flags)
+    assert ok
+    return buffer.tobytes()
+
+
+def test_probe_reads_dimensions_from_header():
+    info = probe_jpeg(_encode(320, 240))
+
+    assert (info.width, info.height, info.components) == (320, 240, 3)
+    assert info.subsampling == "4:2:0"
+    assert not info.progressive
+    assert info.scans == 1
+
+
+def test_probe_handles_progressive_and_memoryview():
+    data = _encode(IMWRITE_JPEG_PROGRESSIVE=1)
+
+    info = probe_jpeg(memoryview(data))
+    assert info.progressive
+    assert info.scans > 1
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda d: d[: len(d) // 2],                  # 截斷，沒有 EOI
+    lambda d: d[: len(d) // 2] + d,              # 前一幀截斷後黏上下一幀
+    lambda d: d[:200] + b"\xff\xd9",             # header 被截斷
+    lambda d: b"\x00" + d,                       # 沒有 SOI
+    lambda d: d[:2] + b"\xff\xd9",               # 沒有影像資料
+])
+def test_probe_rejects_broken_frames(mangle):
+    data = mangle(_encode())
+
+    with pytest.raises(JpegError):
+        probe_jpeg(data)
+    assert not is_valid_jpeg(data)
@@ -0,0 +1,61 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from log_ring import LogRing, LogThrottle, log_source
+
+
+def test_ring_cursor_returns_only_new_lines_and_skips_overwritten():
+    ring = LogRing(size=4)
+    for i in range(3):
+        ring.append(f"line {i}")
+    lines, cursor = ring.since(0)
+    assert lines == ["line 0", "line 1", "line 2"] and cursor == 3
+    assert ring.since(cursor) == ([], 3)
+
+    for i in range(3, 10):
+        ring.append(f"line {i}")
+    # Fell behind by more than the ring size: resume at the oldest line still stored
+    lines, cursor = ring.since(cursor)
+    assert lines == ["line 6", "line 7", "line 8", "line 9"] and cursor == 10
+    assert ring.tail(2) == ["line 8", "line 9"]
+
+
+def test_ring_concurrent_appends_keep_every_sequence():
+    ring = LogRing(size=4096)
+
+    def writer(n):
+        for i in range(500):
+            ring.append(f"{n}:{i}")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lines, cursor = ring.since(0)
+    assert cursor == 2000 and len(set(lines)) == 2000
+
+
+def test_throttle_squashes_repeats_and_limits_rate_per_source():
+    throttle = LogThrottle(rate=1.0, burst=2.0, repeat_window=2.0)
+    assert throttle.admit("VIDEO", "[VIDEO] reconnecting", now=0.0) == ["[VIDEO] reconnecting"]
+    assert throttle.admit("VIDEO", "[VIDEO] reconnecting", now=0.1) == []
+    assert throttle.admit("VIDEO", "[VIDEO] reconnecting", now=0.2) == []
+    # A different message first reports how often the previous one repeated
+    assert throttle.admit("VIDEO", "[VIDEO] connected", now=0.3) == [
+        "[VIDEO] reconnecting (repeated 2x)", "[VIDEO] connected"]
+
+    # Bucket is empty now; another source is unaffected
+    assert throttle.admit("VIDEO", "[VIDEO] a", now=0.4) == []
+    assert throttle.admit("VIDEO", "[VIDEO] b", now=0.5) == []
+    assert throttle.admit("ARM", "[ARM] moved", now=0.5) == ["[ARM] moved"]
+    assert throttle.flush(now=1.0) == []
+    assert throttle.flush(now=2.5) == ["[VIDEO] ... 2 more message(s) suppressed"]
+
+
+def test_log_source_uses_leading_tag():
+    assert log_source("[UDP SENSOR] bind failed") == "UDP SENSOR"
+    assert log_source("Status Push Thread Started...") == "general"
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from socket_outbox import OutboxEvent, coalesce
+
+
+def test_latest_controller_data_wins_and_status_deltas_keep_order():
+    batch = [
+        OutboxEvent('controller_data', {'cmd': 1}),
+        OutboxEvent('status_update', {'version': 1}),
+        OutboxEvent('controller_data', {'cmd': 2}),
+        OutboxEvent('status_update', {'version': 2}),
+        OutboxEvent('controller_data', {'cmd': 3}),
+    ]
+    assert coalesce(batch) == [
+        OutboxEvent('status_update', {'version': 1}),
+        OutboxEvent('status_update', {'version': 2}),
+        OutboxEvent('controller_data', {'cmd': 3}),
+    ]
+
+
+def test_coalescing_is_per_recipient():
+    batch = [
+        OutboxEvent('controller_data', 1, to='a'),
+        OutboxEvent('controller_data', 2, to='b'),
+        OutboxEvent('controller_data', 3, to='a'),
+    ]
+    assert coalesce(batch) == [OutboxEvent('controller_data', 2, to='b'),
+                               OutboxEvent('controller_data', 3, to='a')]
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from status_delta import StatusTracker
+
+
+class _Log:
+    def __init__(self):
+        self.lines = []
+
+    def add(self, line):
+        self.lines.append(line)
+
+    def since(self, cursor):
+        return self.lines[cursor:], len(self.lines)
+
+
+def test_only_changed_fields_and_new_logs_are_pushed():
+    log = _Log()
+    tracker = StatusTracker(log.since)
+
+    first = tracker.diff({"dist": 1.0, "stream_connected": False})
+    assert first["version"] == 1 and first["base"] == 0
+    assert first["changed"] == {"dist": 1.0, "stream_connected": False}
+
+    # Steady state: nothing to send
+    assert tracker.diff({"dist": 1.0, "stream_connected": False}) is None
+
+    log.add("a")
+    log.add("b")
+    delta = tracker.diff({"dist": 2.5, "stream_connected": False})
+    assert delta["base"] == 1 and delta["version"] == 2
+    assert delta["changed"] == {"dist": 2.5}
+    assert delta["logs"] == ["a", "b"] and delta["log_cursor"] == 2
+
+    log.add("c")
+    delta = tracker.diff({"dist": 2.5, "stream_connected": False})
+    assert delta["changed"] == {} and delta["logs"] == ["c"]
+
+
+def test_full_status_carries_version_and_log_tail():
+    log = _Log()
+    tracker = StatusTracker(log.since, log_tail=2)
+    for line in "abcd":
+        log.add(line)
+    tracker.diff({"ai_status": True})
+
+    full = tracker.full()
+    assert full["full"] is True and full["version"] == tracker.version
+    assert full["state"] == {"ai_status": True}
+    assert full["logs"] == ["c", "d"] and full["log_cursor"] == 4
+
+    # The next delta applies on top of the full status
+    assert tracker.diff({"ai_status": False})["base"] == full["version"]
@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from jpeg_utils import probe_jpeg
+from stream_profiles import AdaptiveQuality, ProfileCache, StreamProfile, fps_slot, parse_profile, transcode
+
+
+def _jpeg(width=800, height=600):
+    image = np.zeros((height, width, 3), np.uint8)
+    cv2.circle(image, (width // 2, height // 2), height // 3, (0, 255, 0), -1)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_parse_profile_clamps_and_ignores_garbage():
+    assert parse_profile({"fps": "10", "width": "320", "q": "60"}) == StreamProfile(10.0, 320, 60)
+    assert parse_profile({"fps": "500", "width": "5", "q": "abc"}) == StreamProfile(30.0, 80, None)
+    assert parse_profile({}) == StreamProfile()
+    assert not parse_profile({"fps": "5"}).transcodes
+
+
+def test_transcode_downscales_but_never_upscales():
+    source = _jpeg()
+
+    small = probe_jpeg(transcode(source, width=320))
+    assert (small.width, small.height) == (320, 240)
+    assert transcode(source, width=1600) is source
+
+
+def test_cache_transcodes_once_per_profile_and_frame():
+    cache = ProfileCache()
+    profile = StreamProfile(width=200)
+    source = _jpeg()
+
+    first = cache.get(profile, 1, source)
+    assert cache.get(profile, 1, source) is first  # 第二個 client 直接共用
+    cache.get(profile, 2, source)
+    assert cache.get(StreamProfile(fps=5), 2, source) is source
+
+    assert (cache.transcoded, cache.shared) == (2, 1)
+
+
+def test_fps_slots_are_aligned_on_capture_time():
+    assert fps_slot(100.05, 10) == fps_slot(100.09, 10)
+    assert fps_slot(100.09, 10) != fps_slot(100.11, 10)
+    assert fps_slot(100.0, None) is None
+
+
+def test_adaptive_quality_steps_down_fast_and_up_slowly():
+    adaptive = AdaptiveQuality(target_latency=0.1, step_down_cooldown=0.5, step_up_after=3.0)
+    now = 1000.0
+
+    # 連線變慢：每 0.5 秒降一階
+    for _ in range(8):
+        adaptive.observe(60000, 0.4, now=now)
+        now += 0.25
+    assert adaptive.rung == 4
+    assert adaptive.profile(StreamProfile(fps=10), 800) == StreamProfile(10, 400, 35)
+
+    # 恢復正常：延遲平滑下降後，要持續 3 秒才升一階
+    for _ in range(10):
+        adaptive.observe(20000, 0.001, now=now)
+        now += 0.1
+    slowest = adaptive.rung
+    for _ in range(30):
+        adaptive.observe(20000, 0.001, now=now)
+        now += 0.1
+    assert adaptive.rung == slowest - 1
+    assert adaptive.stats()["delay_ms"] < 30
+
+
+def test_cache_uses_injected_transcoder():
+    calls = []
+
+    def transcoder(jpeg_bytes, width, quality):
+        calls.append((width, quality))
+        return transcode(jpeg_bytes, width, quality)
+
+    cache = ProfileCache(transcoder=transcoder)
+    cache.get(StreamProfile(width=200, quality=50), 1, _jpeg())
+    cache.get(StreamProfile(width=200, quality=50), 1, _jpeg())
+    assert calls == [(200, 50)]
@@ -0,0 +1,99 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+from stream_recorder import StreamRecorder, ReplayReader, load_index
+
+FRAMES = [b'\xff\xd8frame-%d\xff\xd9' % i for i in range(5)]
+
+
+def _record(tmp_path):
+    recorder = StreamRecorder(str(tmp_path / "rec"))
+    for i, frame in enumerate(FRAMES):
+        recorder.append(frame, timestamp=100.0 + i * 0.01)
+    recorder.close()
+    return recorder
+
+
+def test_index_records_offsets_and_lengths(tmp_path):
+    recorder = _record(tmp_path)
+
+    index = load_index(recorder.index_path)
+    assert [rec[0] for rec in index] == [0, 1, 2, 3, 4]
+    assert index[2][1] == 100.02
+    assert index[1][2] == len(FRAMES[0])
+    assert [rec[3] for rec in index] == [len(f) for f in FRAMES]
+
+
+def test_replay_serves_every_frame_in_fast_mode(tmp_path):
+    _record(tmp_path)
+    replay = ReplayReader(str(tmp_path / "rec.mjpg"), realtime=False, log_callback=lambda msg: None)
+    replay.start()
+
+    received = []
+    deadline = time.time() + 2.0
+    while len(received) < len(FRAMES) and time.time() < deadline:
+        frame = replay.read(timeout=0.1)
+        if frame is not None:
+            received.append(frame)
+    replay.close()
+
+    assert received == FRAMES
+
+
+def test_seek_jumps_to_sequence_number(tmp_path):
+    _record(tmp_path)
+    replay = ReplayReader(str(tmp_path / "rec"), realtime=False, log_callback=lambda msg: None)
+    replay.seek(3)
+    replay.start()
+
+    captured_at, frame = replay.read_timestamped(timeout=1.0)
+    replay.close()
+
+    assert frame == FRAMES[3]
+    assert captured_at > 0
+
+
+def test_restarted_recorder_appends_to_existing_recording(tmp_path):
+    _record(tmp_path)
+    with open(tmp_path / "rec.mjpg", 'ab') as f:
+        f.write(b'\xff\xd8torn')  # Frame written but never indexed (crash before flush)
+
+    recorder = StreamRecorder(str(tmp_path / "rec"))
+    assert recorder.append(b'\xff\xd8after-restart\xff\xd9', timestamp=200.0) == len(FRAMES)
+    recorder.close()
+
+    replay = ReplayReader(str(tmp_path / "rec"), realtime=False, log_callback=lambda msg: None)
+    frames = [bytes(replay.frame(i)) for i in range(len(replay))]
+    replay.close()
+    assert frames == FRAMES + [b'\xff\xd8after-restart\xff\xd9']
+
+
+def test_reader_restart_keeps_recording(tmp_path):
+    pytest.importorskip("requests")
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    from mjpeg_reader import MJPEGStreamReader
+
+    path = str(tmp_path / "live")
+    with ESP32Emulator(http_port=0, stream_port=0, fps=30, framesize=5, beacon=False,
+                       log_callback=lambda _: None) as emulator:
+        counts = []
+        for _ in range(2):  # e.g. CMD_SET_URL stops and restarts the reader
+            reader = MJPEGStreamReader(emulator.stream_url, record_path=path, log_callback=lambda _: None)
+            reader.start()
+            deadline = time.time() + 3.0
+            while reader.stats['frames'] < 3 and time.time() < deadline:
+                time.sleep(0.02)
+            reader.stop()
+            counts.append(reader.stats['frames'])
+
+    index = load_index(path + ".idx")
+    assert len(index) == sum(counts)
+    assert [rec[0] for rec in index] == list(range(len(index)))
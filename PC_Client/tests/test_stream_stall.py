@@ -0,0 +1,122 @@
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+pytest.importorskip("cv2")
+pytest.importorskip("requests")
+
+from esp32_emulator import ESP32Emulator
+from mjpeg_reader import MJPEGStreamReader
+
+
+def _wait_frame(reader, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if reader.read(timeout=0.05) is not None:
+            return True
+    return False
+
+
+def test_reader_recovers_from_half_open_stream_within_a_second():
+    emulator = ESP32Emulator(http_port=0, stream_port=0, fps=30, framesize=5, beacon=False,
+                             log_callback=lambda _: None)
+    with emulator:
+        reader = MJPEGStreamReader(emulator.stream_url, stall_timeout=0.3, log_callback=lambda _: None)
+        reader.start()
+        try:
+            assert _wait_frame(reader, 3.0)
+            # 目前的連線停止送幀但不斷線，新連線仍正常
+            emulator.stall(5.0)
+            while reader.read(timeout=0.01) is not None:
+                pass
+            started = time.time()
+            assert _wait_frame(reader, 1.0)
+            assert time.time() - started < 1.0
+            assert reader.stats['stalls'] >= 1
+            assert reader.stats['standby_used'] >= 1
+        finally:
+            reader.stop()
+
+
+def test_paused_reader_stops_pulling_frames_and_resumes_quickly():
+    with ESP32Emulator(http_port=0, stream_port=0, fps=30, framesize=5, beacon=False,
+                       log_callback=lambda _: None) as emulator:
+        reader = MJPEGStreamReader(emulator.stream_url, log_callback=lambda _: None)
+        reader.start()
+        try:
+            assert _wait_frame(reader, 3.0)
+            reader.pause()
+            time.sleep(0.3)
+            sent = emulator.frames_sent
+            time.sleep(0.3)
+            assert emulator.frames_sent == sent  # ESP32 不再送幀
+            assert reader.read(timeout=0.05) is None
+
+            started = time.time()
+            reader.resume()
+            assert _wait_frame(reader, 1.0)
+            assert time.time() - started < 0.5
+        finally:
+            reader.stop()
+
+
+def test_standby_is_dropped_when_frames_resume():
+    with ESP32Emulator(http_port=0, stream_port=0, fps=30, framesize=5, beacon=False,
+                       log_callback=lambda _: None) as emulator:
+        reader = MJPEGStreamReader(emulator.stream_url, stall_timeout=0.6, log_callback=lambda _: None)
+        reader.start()
+        try:
+            assert _wait_frame(reader, 3.0)
+            emulator.stall(0.4)  # 超過一半的 stall_timeout：開始建立備用連線，但幀在判定停滯前恢復
+            time.sleep(0.8)
+            assert reader._standby is None and reader._standby_thread is None
+            assert reader.stats['stalls'] == 0
+            while reader.read(timeout=0.01) is not None:
+                pass
+            assert _wait_frame(reader, 0.5)
+        finally:
+            reader.stop()
+
+
+def test_empty_stream_backs_off_instead_of_spinning():
+    # 回 multipart header 之後直接關閉，沒有任何幀
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    server.settimeout(0.1)
+    accepted = []
+    done = threading.Event()
+
+    def serve():
+        while not done.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            accepted.append(time.time())
+            conn.recv(4096)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace;boundary=x\r\n"
+                         b"Content-Length: 0\r\n\r\n")
+            conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    reader = MJPEGStreamReader(f"http://127.0.0.1:{server.getsockname()[1]}/stream", reconnect_delay=0.1,
+                               stall_timeout=0, log_callback=lambda _: None)
+    reader.start()
+    try:
+        time.sleep(1.0)
+    finally:
+        reader.stop()
+        done.set()
+        thread.join(timeout=1)
+        server.close()
+    assert 2 <= len(accepted) <= 5  # 0.1 + 0.2 + 0.4 s backoff, not a tight reconnect loop
@@ -0,0 +1,81 @@
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+sys.path.append(str(PC_CLIENT_DIR / "tools"))
+
+import udp_control
+from arm_protocol import encode_packet
+
+
+def test_chassis_packet_round_trip():
+    packet = udp_control.encode_chassis(42, -255, 40000, 300)
+    assert len(packet) == udp_control.PACKET_SIZE == 15
+    assert packet[:3] == b'RM\x10'
+    assert udp_control.decode_chassis(packet) == (42, -255, 32767, 300)
+
+    corrupted = packet[:5] + bytes((packet[5] ^ 0xFF,)) + packet[6:]
+    assert udp_control.decode_chassis(corrupted) is None
+    assert udp_control.decode_chassis(encode_packet(0x03, b'\x00' * 16)) is None
+
+
+def test_seq_compare_wraps():
+    assert udp_control.seq_newer(2, 1)
+    assert not udp_control.seq_newer(1, 2)
+    assert not udp_control.seq_newer(5, 5)
+    assert udp_control.seq_newer(3, 0xFFFFFFFE)
+
+
+@pytest.fixture
+def emulator():
+    pytest.importorskip("cv2")
+    from esp32_emulator import ESP32Emulator
+    emu = ESP32Emulator(http_port=0, stream_port=0, beacon=False, udp_control_port=0,
+                        log_callback=lambda msg: None).start()
+    yield emu
+    emu.stop()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_emulator_drops_stale_packets(emulator):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = (emulator.host, emulator.udp_control_port)
+    try:
+        sock.sendto(udp_control.encode_chassis(10, 100, 100, 1000), target)
+        assert _wait_for(lambda: emulator.motor == (100, 100))
+        sock.sendto(udp_control.encode_chassis(9, -100, -100, 1000), target)  # Late arrival
+        sock.sendto(udp_control.encode_chassis(11, 50, 50, 1000), target)
+        assert _wait_for(lambda: emulator.motor == (50, 50))
+    finally:
+        sock.close()
+    assert emulator.udp_stale == 1
+    assert [c.transport for c in emulator.commands] == ["udp", "udp"]
+
+
+def test_keepalive_holds_and_dead_man_stops(emulator):
+    client = udp_control.UdpChassisClient(emulator.host, port=emulator.udp_control_port,
+                                          keepalive_interval=0.05, deadline_ms=200)
+    try:
+        assert client.send(120, 120)
+        time.sleep(0.5)  # Longer than the deadline: keepalives keep the car moving
+        assert emulator.motor == (120, 120)
+        assert client.keepalives >= 3
+        assert emulator.deadman_stops == 0
+    finally:
+        client.close()
+    # Sender gone: the emulator stops on its own after deadline_ms
+    assert _wait_for(lambda: emulator.motor == (0, 0), timeout=1.0)
+    assert emulator.deadman_stops == 1
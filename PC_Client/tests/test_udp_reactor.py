@@ -0,0 +1,84 @@
+import socket
+import sys
+import time
+from pathlib import Path
+
+PC_CLIENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(PC_CLIENT_DIR))
+
+from udp_reactor import UdpReactor
+
+
+def _reactor(received):
+    reactor = UdpReactor(batch=8, log_callback=lambda msg: None)
+    reactor.register('sensor', lambda data, addr: received.append(('sensor', data)), prefix=b'{"d"')
+    reactor.register('beacon', lambda data, addr: received.append(('beacon', data)), prefix=b'{')
+    reactor.register('rm_angles', lambda data, addr: received.append(('rm_angles', data)), prefix=b'RM', type_byte=0x03)
+    reactor.register('rm_other', lambda data, addr: received.append(('rm_other', data)), prefix=b'RM')
+    return reactor
+
+
+def test_routes_by_prefix_and_type_byte():
+    received = []
+    reactor = _reactor(received)
+    reactor.dispatch(b'{"d": 12.5, "v": 0}', ("10.0.0.2", 4211))
+    reactor.dispatch(b'{"device": "esp32-s3-car", "ip": "10.0.0.3"}', ("10.0.0.3", 4213))
+    reactor.dispatch(b'RM\x03' + b'\x00' * 18, ("10.0.0.1", 4211))
+    reactor.dispatch(b'RM\x10' + b'\x00' * 12, ("10.0.0.1", 4211))
+    reactor.dispatch(b'RM', ("10.0.0.1", 4211))  # Too short for a type byte
+    reactor.dispatch(b'hello', ("10.0.0.9", 4211))
+
+    assert [name for name, _ in received] == ['sensor', 'beacon', 'rm_angles', 'rm_other', 'rm_other']
+    stats = reactor.stats()
+    assert stats["unmatched"] == 1
+    assert stats["routes"]["sensor"]["packets"] == 1
+    assert stats["routes"]["rm_other"]["packets"] == 2
+    assert stats["routes"]["beacon"]["avg_us"] is not None
+
+
+def test_handler_errors_are_counted_not_raised():
+    reactor = UdpReactor(log_callback=lambda msg: None)
+    reactor.register('bad', lambda data, addr: 1 / 0, prefix=b'X')
+    reactor.dispatch(b'X1', ("10.0.0.1", 1))
+    reactor.dispatch(b'X2', ("10.0.0.1", 1))
+    route = reactor.stats()["routes"]["bad"]
+    assert route["packets"] == 2 and route["errors"] == 2
+
+
+def test_rate_window():
+    reactor = UdpReactor(rate_window=1.0, log_callback=lambda msg: None)
+    reactor.register('sensor', lambda data, addr: None, prefix=b'{')
+    start = time.monotonic()
+    for i in range(11):
+        reactor.dispatch(b'{}', ("10.0.0.1", 1), now=start + i * 0.1)  # 10 Hz
+    assert 9.0 <= reactor.stats()["routes"]["sensor"]["rate_hz"] <= 11.0
+
+
+def test_drains_socket_in_batches():
+    received = []
+    reactor = _reactor(received)
+    assert reactor.bind("127.0.0.1", 0)
+    port = reactor.sockets[0].getsockname()[1]
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for i in range(20):
+            sender.sendto(b'{"d": %d}' % i, ("127.0.0.1", port))
+        time.sleep(0.1)
+        handled = [reactor.poll(timeout=1.0) for _ in range(3)]
+        assert handled == [8, 8, 4]  # batch=8 per socket per pass
+        assert len(received) == 20 and all(name == 'sensor' for name, _ in received)
+        assert reactor.poll(timeout=0.05) == 0
+    finally:
+        sender.close()
+        reactor.close()
+
+
+def test_run_calls_tick_without_traffic():
+    reactor = UdpReactor(log_callback=lambda msg: None)
+    assert reactor.bind("127.0.0.1", 0)
+    ticks = []
+    try:
+        reactor.run(lambda: len(ticks) < 3, timeout=0.01, tick=lambda: ticks.append(time.monotonic()))
+    finally:
+        reactor.close()
+    assert len(ticks) == 3
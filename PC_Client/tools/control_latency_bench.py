@@ -0,0 +1,112 @@
+"""
+底盤指令延遲 benchmark：HTTP /motor vs WebSocket /ws/control vs UDP
+
+在本機啟動 ESP32 模擬器，以固定速率透過各個傳輸送出指令，以模擬器記錄的抵達時間
+計算單向延遲 (同一台機器、同一個時鐘)，回報 p50 / p99 與遺失數。
+可注入延遲與丟包，觀察 TCP head-of-line blocking 對 p99 的影響。
+
+用法：
+    python tools/control_latency_bench.py --count 500 --rate 50
+    python tools/control_latency_bench.py --loss 0.05 --transports ws udp
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+import requests
+
+PC_CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PC_CLIENT_DIR)
+
+from esp32_emulator import ESP32Emulator  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+
+def make_sender(transport: str, emulator: ESP32Emulator):
+    """返回 (send(left, right), close())"""
+    host = f"{emulator.host}:{emulator.http_port}"
+    if transport == "http":
+        session = requests.Session()
+
+        def send(left, right):
+            try:
+                session.get(f"http://{host}/motor", params={"left": left, "right": right}, timeout=1.0).close()
+            except requests.RequestException:
+                pass
+        return send, session.close
+
+    if transport == "ws":
+        from control_client import AsyncControlClient
+        client = AsyncControlClient(host, heartbeat_interval=0)
+        deadline = time.time() + 3.0
+        while not client.connected and time.time() < deadline:
+            time.sleep(0.02)
+        if not client.connected:
+            client.close()
+            raise RuntimeError("WebSocket did not connect")
+        return client.send, client.close
+
+    if transport == "udp":
+        from udp_control import UdpChassisClient
+        client = UdpChassisClient(emulator.host, port=emulator.udp_control_port)
+        return client.send, client.close
+
+    raise ValueError(f"unknown transport {transport}")
+
+
+def run(transport: str, emulator: ESP32Emulator, count: int, rate: float) -> Dict[str, float]:
+    send, close = make_sender(transport, emulator)
+    emulator.clear_commands()
+    sent_at: Dict[int, float] = {}
+    interval = 1.0 / rate
+    next_send = time.time()
+    try:
+        for i in range(1, count + 1):
+            sent_at[i] = time.time()
+            send(1, i)  # right 當作指令編號 (left 非 0，keepalive 會持續重送)
+            next_send += interval
+            time.sleep(max(0.0, next_send - time.time()))
+        time.sleep(0.5)  # 等最後的指令抵達
+    finally:
+        close()
+
+    arrived: Dict[int, float] = {}
+    for cmd in list(emulator.commands):
+        if cmd.left == 1 and cmd.right in sent_at and cmd.right not in arrived:
+            arrived[cmd.right] = cmd.arrived_at
+    latencies: List[float] = [(arrived[i] - sent_at[i]) * 1000 for i in arrived]
+    return {
+        "delivered": len(arrived),
+        "lost": count - len(arrived),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chassis command latency per transport (against the local emulator)")
+    parser.add_argument("--transports", nargs="+", default=["http", "ws", "udp"], choices=["http", "ws", "udp"])
+    parser.add_argument("--count", type=int, default=300, help="commands per transport")
+    parser.add_argument("--rate", type=float, default=50.0, help="commands per second")
+    parser.add_argument("--latency", type=float, default=0.0, help="emulator injected latency in ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="emulator drop probability 0-1")
+    args = parser.parse_args()
+
+    emulator = ESP32Emulator(http_port=0, stream_port=0, beacon=False, udp_control_port=0,
+                             latency_ms=args.latency, loss=args.loss, log_callback=lambda msg: None)
+    emulator.start()
+    try:
+        print(f"{'transport':<10}{'delivered':>10}{'lost':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for transport in args.transports:
+            r = run(transport, emulator, args.count, args.rate)
+            print(f"{transport:<10}{r['delivered']:>10}{r['lost']:>6}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['max']:>10.2f}")
+    finally:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
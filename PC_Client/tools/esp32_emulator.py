@@ -0,0 +1,718 @@
+"""
+ESP32-S3 裝置模擬器
+
+模擬 Firmware/ESP32_S3/main/app_httpd.c 的端點，讓 PC Client 可以在沒有硬體的情況下
+進行 benchmark 與回歸測試：
+
+- port 81  GET /stream      MJPEG (multipart/x-mixed-replace，與韌體相同的 boundary)
+- port 80  GET /status      相機設定 JSON (含 rssi)
+- port 80  GET /control     ?var=framesize|quality|...&val=N
+- port 80  GET /motor       ?left=N&right=N  (記錄抵達時間)
+- port 80  WS  /ws/control  {"l": N, "r": N} 或二進位 HELLO / CMD (回 ACK，見 control_protocol.py)
+- UDP 4212 底盤控制 'RM' 0x10 封包 (seq 過濾舊封包、deadline_ms 內沒收到就停車，見 udp_control.py)
+- UDP 4213 discovery beacon {"device": "esp32-s3-car", "id": "...", "ip": "...", "caps": [...]}
+
+支援故障注入：延遲 (latency_ms)、丟包 (loss)、斷線 (disconnect)、串流停滯 (stall)
+與 WebSocket 黑洞 (blackhole_ws，連線不斷但什麼都不回)。
+
+用法：
+    python tools/esp32_emulator.py --host 127.0.0.1 --http-port 8080 --stream-port 8081 --fps 20
+    python tools/esp32_emulator.py --images ./frames --latency 30 --loss 0.05
+"""
+
+import base64
+import binascii
+import glob
+import hashlib
+import json
+import os
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+PART_BOUNDARY = "123456789000000000000987654321"
+STREAM_CONTENT_TYPE = f"multipart/x-mixed-replace;boundary={PART_BOUNDARY}"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# /ws/control 二進位協定 (與 PC_Client/control_protocol.py、韌體 app_httpd.c 相同)
+CTRL_PROTO_VERSION = 1
+CTRL_HELLO = struct.Struct("<BB")
+CTRL_CMD = struct.Struct("<BBBIhhI")
+CTRL_ACK = struct.Struct("<BBII")
+
+# UDP 底盤控制 (與 PC_Client/udp_control.py、韌體 app_udp.c 相同)
+UDP_CHASSIS = struct.Struct("<IhhH")
+UDP_CMD_CHASSIS = 0x10
+UDP_RESYNC_S = 1.0  # 安靜超過此秒數後接受任何 seq (PC 端重啟後序號從頭開始)
+
+# esp32-camera framesize_t -> (width, height)
+FRAME_SIZES = {
+    0: (96, 96), 1: (160, 120), 2: (176, 144), 3: (240, 176), 4: (240, 240),
+    5: (320, 240), 6: (400, 296), 7: (480, 320), 8: (640, 480), 9: (800, 600),
+    10: (1024, 768), 11: (1280, 720), 12: (1280, 1024), 13: (1600, 1200),
+}
+DEFAULT_FRAMESIZE = 9   # FRAMESIZE_SVGA (app_camera.c)
+DEFAULT_QUALITY = 12    # ESP32 JPEG quality (0-63, 越小畫質越好)
+
+
+def esp_quality_to_cv2(quality: int) -> int:
+    """ESP32 quality (0=best, 63=worst) -> OpenCV IMWRITE_JPEG_QUALITY (0-100)."""
+    quality = max(0, min(63, int(quality)))
+    return max(5, int(100 - quality * 90 / 63))
+
+
+class MotorCommand:
+    __slots__ = ("arrived_at", "left", "right", "transport")
+
+    def __init__(self, arrived_at: float, left: int, right: int, transport: str):
+        self.arrived_at = arrived_at
+        self.left = left
+        self.right = right
+        self.transport = transport
+
+    def __repr__(self):
+        return f"MotorCommand({self.transport} L={self.left} R={self.right} @{self.arrived_at:.3f})"
+
+
+class ESP32Emulator:
+    """
+    模擬 ESP32-S3 Car 的 HTTP / WebSocket / UDP 介面
+
+    所有 server 都在背景線程執行；port 設為 0 時由 OS 分配，啟動後可由
+    ``http_port`` / ``stream_port`` 取得實際 port。
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 http_port: int = 80,
+                 stream_port: int = 81,
+                 fps: float = 15.0,
+                 framesize: int = DEFAULT_FRAMESIZE,
+                 quality: int = DEFAULT_QUALITY,
+                 images: Optional[Sequence[str]] = None,
+                 latency_ms: float = 0.0,
+                 loss: float = 0.0,
+                 max_stream_clients: int = 1,
+                 beacon: bool = True,
+                 beacon_address: str = "<broadcast>",
+                 beacon_port: int = 4213,
+                 beacon_interval: float = 3.0,
+                 advertise_ip: Optional[str] = None,
+                 device_id: str = "car-emulator",
+                 binary_control: bool = True,
+                 udp_control_port: Optional[int] = None,
+                 log_callback=None):
+        """
+        Args:
+            host: 綁定的位址
+            http_port / stream_port: 控制與串流 port (韌體為 80 / 81，0 = 自動分配)
+            fps: 串流幀率
+            framesize / quality: 初始相機設定 (同 esp32-camera 的數值定義)
+            images: 影像檔清單或資料夾；None 則產生合成畫面
+            latency_ms: 每個請求 / 指令 / 幀額外注入的延遲
+            loss: 丟包機率 (0~1)，套用於指令、幀與 beacon
+            max_stream_clients: 同時服務的串流數 (韌體的 stream handler 一次只服務一個)
+            beacon*: UDP discovery beacon 設定
+            advertise_ip: beacon 中回報的 IP (預設為 host)
+            device_id: beacon 中的裝置 ID (韌體以 STA MAC 產生，同一網段模擬多台車時要不同)
+            binary_control: 是否支援 /ws/control 二進位協定 (False = 模擬只懂 JSON 的舊韌體)
+            udp_control_port: UDP 底盤控制 port (0 = 自動分配，None = 停用；命令列預設 4212)
+        """
+        self.host = host
+        self.http_port = http_port
+        self.stream_port = stream_port
+        self.fps = fps
+        self.latency_ms = latency_ms
+        self.loss = loss
+        self.beacon_enabled = beacon
+        self.beacon_address = beacon_address
+        self.beacon_port = beacon_port
+        self.beacon_interval = beacon_interval
+        self.advertise_ip = advertise_ip or host
+        self.device_id = device_id
+        self.binary_control = binary_control
+        self.udp_control_port = udp_control_port
+        self.log = log_callback or (lambda msg: print(f"[EMU] {msg}"))
+
+        self.settings: Dict[str, int] = {
+            "framesize": framesize, "quality": quality, "brightness": 0, "contrast": 0,
+            "saturation": 0, "sharpness": 0, "special_effect": 0, "wb_mode": 0, "awb": 1,
+            "awb_gain": 1, "aec": 1, "aec2": 0, "ae_level": 0, "aec_value": 168, "agc": 1,
+            "agc_gain": 0, "gainceiling": 0, "bpc": 0, "wpc": 1, "raw_gma": 1, "lenc": 1,
+            "hmirror": 0, "vflip": 0, "dcw": 1, "colorbar": 0,
+        }
+        self.rssi: Optional[int] = -55  # 回報於 /status (None = 不回報，如 AP 模式)
+        self.motor = (0, 0)
+        self.commands: List[MotorCommand] = []
+        self.frames_sent = 0
+        self.stream_connections = 0
+        self.udp_stale = 0       # seq 比上一個舊而丟掉的 UDP 封包
+        self.deadman_stops = 0   # UDP 指令逾時而自動停車的次數
+
+        self._sources = self._load_images(images)
+        if not CV2_AVAILABLE and not self._sources:
+            raise RuntimeError("OpenCV is required to synthesize frames; pass JPEG files via images")
+        self._frame_cache: Dict[tuple, List[bytes]] = {}
+        self._lock = threading.Lock()
+        self._stream_slots = threading.BoundedSemaphore(max(1, max_stream_clients))
+        self._active_sockets = set()
+        self._stall_until = 0.0
+        self._stall_all = False
+        self._stalled_streams = set()
+        self._stream_sockets = set()
+        self._ws_sockets = set()
+        self._blackholed_ws = set()
+        self._blackhole_until = 0.0
+        self._servers = []
+        self._threads = []
+        self._udp_control_sock = None
+        self.running = False
+
+    # ------------------------------------------------------------------ control
+    def start(self):
+        """啟動 HTTP、串流 server 與 beacon"""
+        emulator = self
+        http_server = ThreadingHTTPServer((self.host, self.http_port), _make_handler(emulator, stream=False))
+        stream_server = ThreadingHTTPServer((self.host, self.stream_port), _make_handler(emulator, stream=True))
+        for server in (http_server, stream_server):
+            server.daemon_threads = True
+        self.http_port = http_server.server_address[1]
+        self.stream_port = stream_server.server_address[1]
+        self._servers = [http_server, stream_server]
+        self.running = True
+
+        for server in self._servers:
+            t = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.beacon_enabled:
+            t = threading.Thread(target=self._beacon_loop, daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.udp_control_port is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.bind((self.host, self.udp_control_port))
+            except OSError as e:
+                # 只影響 UDP 控制；HTTP / WS 照常 (例如另一個模擬器已佔用 4212)
+                sock.close()
+                self.log(f"UDP control disabled: {e}")
+                self.udp_control_port = None
+            else:
+                sock.settimeout(0.02)
+                self._udp_control_sock = sock
+                self.udp_control_port = sock.getsockname()[1]
+                t = threading.Thread(target=self._udp_control_loop, daemon=True)
+                t.start()
+                self._threads.append(t)
+        self.log(f"Emulator up: http://{self.host}:{self.http_port}  stream http://{self.host}:{self.stream_port}/stream")
+        return self
+
+    def stop(self):
+        self.running = False
+        self.disconnect()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+        if self._udp_control_sock is not None:
+            self._udp_control_sock.close()
+            self._udp_control_sock = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def stream_url(self) -> str:
+        return f"http://{self.host}:{self.stream_port}/stream"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.http_port}"
+
+    def set_faults(self, latency_ms: Optional[float] = None, loss: Optional[float] = None):
+        """調整故障注入參數 (執行中可呼叫)"""
+        if latency_ms is not None:
+            self.latency_ms = latency_ms
+        if loss is not None:
+            self.loss = loss
+
+    def disconnect(self):
+        """立即中斷所有串流與 WebSocket 連線 (模擬 Wi-Fi 斷線 / 重開機)"""
+        with self._lock:
+            sockets = list(self._active_sockets)
+            self._active_sockets.clear()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def stall(self, seconds: float, new_connections: bool = False):
+        """
+        串流保持連線但停止送幀 (模擬 half-open link)
+
+        Args:
+            seconds: 停滯時間
+            new_connections: False 時只有目前的串流停滯，新連線照常送幀；True 則全部停滯
+        """
+        with self._lock:
+            self._stalled_streams = set(self._stream_sockets)
+        self._stall_until = time.time() + seconds
+        self._stall_all = new_connections
+
+    def _is_stalled(self, sock) -> bool:
+        if time.time() >= self._stall_until:
+            return False
+        return self._stall_all or sock in self._stalled_streams
+
+    def blackhole_ws(self, seconds: float):
+        """目前的 WebSocket 連線保持開啟，但靜默丟棄所有 frame (含 ping)；新連線正常 (模擬 half-open Wi-Fi)"""
+        with self._lock:
+            self._blackholed_ws = set(self._ws_sockets)
+        self._blackhole_until = time.time() + seconds
+
+    def _is_blackholed(self, sock) -> bool:
+        return time.time() < self._blackhole_until and sock in self._blackholed_ws
+
+    def clear_commands(self):
+        with self._lock:
+            self.commands.clear()
+
+    # ------------------------------------------------------------------ helpers
+    def _should_drop(self) -> bool:
+        return self.loss > 0 and random.random() < self.loss
+
+    def _inject_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _track(self, sock):
+        with self._lock:
+            self._active_sockets.add(sock)
+
+    def _untrack(self, sock):
+        with self._lock:
+            self._active_sockets.discard(sock)
+
+    def _record_command(self, left: int, right: int, transport: str):
+        cmd = MotorCommand(time.time(), left, right, transport)
+        with self._lock:
+            self.commands.append(cmd)
+            self.motor = (left, right)
+        return cmd
+
+    def _load_images(self, images) -> List:
+        if not images:
+            return []
+        if isinstance(images, str):
+            images = [images]
+        paths = []
+        for item in images:
+            if os.path.isdir(item):
+                for ext in ("*.jpg", "*.jpeg", "*.png", "*.bmp"):
+                    paths.extend(sorted(glob.glob(os.path.join(item, ext))))
+            else:
+                paths.append(item)
+        sources = []
+        for path in paths:
+            if CV2_AVAILABLE:
+                img = cv2.imread(path, cv2.IMREAD_COLOR)
+                if img is not None:
+                    sources.append(img)
+            else:
+                with open(path, "rb") as f:
+                    sources.append(f.read())  # 無 OpenCV：直接送原始 JPEG
+        return sources
+
+    def frames_for_current_settings(self) -> List[bytes]:
+        """依目前 framesize / quality 取得 (快取的) JPEG 幀序列"""
+        framesize = self.settings["framesize"]
+        quality = self.settings["quality"]
+        key = (framesize, quality)
+        frames = self._frame_cache.get(key)
+        if frames is not None:
+            return frames
+
+        if not CV2_AVAILABLE:
+            frames = list(self._sources)
+        else:
+            width, height = FRAME_SIZES.get(framesize, FRAME_SIZES[DEFAULT_FRAMESIZE])
+            params = [cv2.IMWRITE_JPEG_QUALITY, esp_quality_to_cv2(quality)]
+            frames = []
+            if self._sources:
+                for src in self._sources:
+                    img = cv2.resize(src, (width, height), interpolation=cv2.INTER_AREA)
+                    ok, buf = cv2.imencode(".jpg", img, params)
+                    if ok:
+                        frames.append(buf.tobytes())
+            else:
+                # 合成畫面：移動的色條 + 幀編號，方便肉眼檢查延遲與掉幀
+                for i in range(30):
+                    img = np.zeros((height, width, 3), dtype=np.uint8)
+                    img[:, :] = (40, 30, 20)
+                    x = int((i / 30.0) * width)
+                    cv2.rectangle(img, (x, 0), (min(width - 1, x + width // 10), height - 1), (0, 200, 255), -1)
+                    cv2.putText(img, f"EMU {i:02d}", (10, max(20, height // 8)),
+                                cv2.FONT_HERSHEY_SIMPLEX, max(0.4, width / 800.0), (255, 255, 255), 2)
+                    ok, buf = cv2.imencode(".jpg", img, params)
+                    if ok:
+                        frames.append(buf.tobytes())
+        self._frame_cache[key] = frames
+        return frames
+
+    def _beacon_loop(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        caps = ["stream", "ws_control"] + (["udp_control"] if self.udp_control_port is not None else [])
+        payload = json.dumps({"device": "esp32-s3-car", "id": self.device_id, "ip": self.advertise_ip,
+                              "caps": caps}).encode()
+        while self.running:
+            if not self._should_drop():
+                try:
+                    sock.sendto(payload, (self.beacon_address, self.beacon_port))
+                except OSError:
+                    pass
+            deadline = time.time() + self.beacon_interval
+            while self.running and time.time() < deadline:
+                time.sleep(0.1)
+        sock.close()
+
+    def _udp_control_loop(self):
+        """UDP 底盤指令：丟棄 CRC 錯誤與晚到的舊 seq，超過封包的 deadline_ms 沒有新封包就停車"""
+        sock = self._udp_control_sock
+        last_seq = None
+        last_rx = 0.0
+        deadline = 0.0
+        while self.running:
+            try:
+                packet, _ = sock.recvfrom(64)
+            except socket.timeout:
+                packet = None
+            except OSError:
+                break
+            now = time.time()
+            command = _decode_udp_chassis(packet) if packet else None
+            if command is not None and not self._should_drop():
+                seq, left, right, deadline_ms = command
+                fresh = (last_seq is None or now - last_rx > UDP_RESYNC_S
+                         or 0 < ((seq - last_seq) & 0xFFFFFFFF) < 0x80000000)
+                if fresh:
+                    last_seq, last_rx, deadline = seq, now, deadline_ms / 1000.0
+                    self._inject_latency()
+                    self._record_command(left, right, "udp")
+                else:
+                    self.udp_stale += 1
+            if deadline and now - last_rx > deadline and self.motor != (0, 0):
+                with self._lock:
+                    self.motor = (0, 0)
+                    self.deadman_stops += 1
+                self.log(f"UDP dead-man: no command for {(now - last_rx) * 1000:.0f} ms, motors stopped")
+
+    # ------------------------------------------------------------------ websocket
+    def _serve_websocket(self, handler):
+        """最小化的 RFC 6455 server：text {l, r}、ping/pong、close"""
+        sock = handler.connection
+        rfile = handler.rfile
+        self._track(sock)
+        with self._lock:
+            self._ws_sockets.add(sock)
+        try:
+            while self.running:
+                opcode, payload = _ws_read_frame(rfile)
+                if self._is_blackholed(sock) and opcode not in (None, 0x8):
+                    continue
+                if opcode is None or opcode == 0x8:
+                    try:
+                        sock.sendall(_ws_frame(0x8, b""))
+                    except OSError:
+                        pass
+                    break
+                if opcode == 0x9:
+                    sock.sendall(_ws_frame(0xA, payload))
+                    continue
+                if opcode in (0x1, 0x2):
+                    self._handle_ws_message(sock, opcode, payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._ws_sockets.discard(sock)
+                self._blackholed_ws.discard(sock)
+            self._untrack(sock)
+
+    def _handle_ws_message(self, sock, opcode, payload):
+        self._inject_latency()
+        if self._should_drop():
+            return
+        if opcode == 0x1:
+            try:
+                data = json.loads(payload.decode("utf-8", errors="ignore"))
+                self._record_command(int(data.get("l", 0)), int(data.get("r", 0)), "ws")
+            except (ValueError, AttributeError):
+                pass
+        elif opcode == 0x2 and self.binary_control:
+            if len(payload) < CTRL_HELLO.size or payload[0] != CTRL_PROTO_VERSION:
+                return
+            if payload[1] == 0x00:  # HELLO
+                sock.sendall(_ws_frame(0x2, CTRL_HELLO.pack(CTRL_PROTO_VERSION, 0x00)))
+            elif payload[1] == 0x01 and len(payload) >= CTRL_CMD.size:
+                _, _, flags, seq, left, right, sent_ms = CTRL_CMD.unpack_from(payload)
+                self._record_command(left, right, "ws")
+                if flags & 0x01:
+                    sock.sendall(_ws_frame(0x2, CTRL_ACK.pack(CTRL_PROTO_VERSION, 0x02, seq, sent_ms)))
+
+
+def _decode_udp_chassis(packet: bytes):
+    """'RM' + 0x10 + <IhhH> + CRC16 -> (seq, left, right, deadline_ms)；不合法返回 None"""
+    if len(packet) != 3 + UDP_CHASSIS.size + 2 or packet[:2] != b"RM" or packet[2] != UDP_CMD_CHASSIS:
+        return None
+    if binascii.crc_hqx(packet[:-2], 0xFFFF) != struct.unpack_from("<H", packet, len(packet) - 2)[0]:
+        return None
+    return UDP_CHASSIS.unpack_from(packet, 3)
+
+
+def _ws_read_exact(rfile, n: int) -> bytes:
+    data = rfile.read(n)
+    if data is None or len(data) < n:
+        raise ValueError("connection closed")
+    return data
+
+
+def _ws_read_frame(rfile):
+    """讀取一個 client frame (client -> server 必定 masked)"""
+    try:
+        header = _ws_read_exact(rfile, 2)
+    except ValueError:
+        return None, b""
+    opcode = header[0] & 0x0F
+    masked = header[1] & 0x80
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _ws_read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _ws_read_exact(rfile, 8))[0]
+    mask = _ws_read_exact(rfile, 4) if masked else None
+    payload = _ws_read_exact(rfile, length) if length else b""
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    """建立 server -> client frame (不 mask)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _make_handler(emulator: ESP32Emulator, stream: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "ESP32-Emulator/1.0"
+
+        def log_message(self, fmt, *args):
+            pass  # 保持安靜，避免淹沒測試輸出
+
+        def _send(self, code: int, body: bytes = b"", content_type: str = "text/plain", close: bool = False):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if close:
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+            if stream:
+                if parsed.path == "/stream":
+                    return self._stream()
+                return self._send(404, b"Not Found")
+
+            emulator._inject_latency()
+            if parsed.path == "/ws/control" and self.headers.get("Upgrade", "").lower() == "websocket":
+                return self._websocket()
+            if parsed.path == "/status":
+                status = dict(emulator.settings)
+                if emulator.rssi is not None:
+                    status["rssi"] = emulator.rssi
+                body = json.dumps(status).encode()
+                return self._send(200, body, "application/json", close=True)
+            if parsed.path == "/control":
+                return self._control(query)
+            if parsed.path == "/motor":
+                return self._motor(query)
+            return self._send(404, b"Not Found")
+
+        def _control(self, query):
+            var, val = query.get("var"), query.get("val")
+            if var is None or val is None:
+                return self._send(404, b"Not Found", close=True)
+            if var not in emulator.settings:
+                return self._send(500, b"", close=True)
+            try:
+                emulator.settings[var] = int(val)
+            except ValueError:
+                return self._send(500, b"", close=True)
+            return self._send(200, b"", close=True)
+
+        def _motor(self, query):
+            if emulator._should_drop():
+                # 模擬封包遺失：不回應直接斷線
+                self.close_connection = True
+                return
+            try:
+                left = int(query.get("left", 0))
+                right = int(query.get("right", 0))
+            except ValueError:
+                left = right = 0
+            self._send(200, b"OK")
+            emulator._record_command(left, right, "http")
+
+        def _websocket(self):
+            key = self.headers.get("Sec-WebSocket-Key", "")
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+            emulator._serve_websocket(self)
+
+        def _stream(self):
+            # 韌體的 stream handler 會佔住 httpd task，第二個 client 只能排隊
+            while emulator.running and not emulator._stream_slots.acquire(timeout=0.1):
+                pass
+            if not emulator.running:
+                return
+            sock = self.connection
+            emulator._track(sock)
+            with emulator._lock:
+                emulator._stream_sockets.add(sock)
+            emulator.stream_connections += 1
+            self.close_connection = True
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", STREAM_CONTENT_TYPE)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+
+                index = 0
+                next_frame = time.time()
+                while emulator.running:
+                    now = time.time()
+                    if now < next_frame:
+                        time.sleep(next_frame - now)
+                    next_frame = max(next_frame + 1.0 / emulator.fps, time.time() - 1.0)
+                    if emulator._is_stalled(sock):
+                        # 停滯中不送幀，但 client 關閉連線時韌體的下一次送出會失敗並釋放 handler
+                        if _peer_closed(sock):
+                            break
+                        continue
+                    emulator._inject_latency()
+                    frames = emulator.frames_for_current_settings()
+                    jpeg = frames[index % len(frames)]
+                    index += 1
+                    if emulator._should_drop():
+                        continue
+                    part = (f"\r\n--{PART_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg
+                    self.wfile.write(b"%x\r\n" % len(part) + part + b"\r\n")
+                    self.wfile.flush()
+                    emulator.frames_sent += 1
+            except (OSError, ValueError):
+                pass
+            finally:
+                emulator._untrack(sock)
+                with emulator._lock:
+                    emulator._stream_sockets.discard(sock)
+                emulator._stream_slots.release()
+
+    return Handler
+
+
+def _peer_closed(sock) -> bool:
+    """client 已關閉 (或重設) 連線"""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ESP32-S3 car emulator (HTTP / MJPEG / WS / UDP beacon)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=80)
+    parser.add_argument("--stream-port", type=int, default=81)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--framesize", type=int, default=DEFAULT_FRAMESIZE, help="esp32-camera framesize (9 = SVGA)")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="ESP32 JPEG quality 0-63")
+    parser.add_argument("--images", nargs="*", help="image files or folders to stream")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected latency in ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="drop probability 0-1")
+    parser.add_argument("--no-beacon", action="store_true")
+    parser.add_argument("--beacon-address", default="<broadcast>")
+    parser.add_argument("--advertise-ip", default=None)
+    parser.add_argument("--device-id", default="car-emulator", help="ID reported in the beacon")
+    parser.add_argument("--udp-control-port", type=int, default=4212, help="UDP chassis control port (-1 = off)")
+    args = parser.parse_args()
+
+    emulator = ESP32Emulator(
+        host=args.host, http_port=args.http_port, stream_port=args.stream_port, fps=args.fps,
+        framesize=args.framesize, quality=args.quality, images=args.images,
+        latency_ms=args.latency, loss=args.loss, beacon=not args.no_beacon,
+        beacon_address=args.beacon_address, advertise_ip=args.advertise_ip, device_id=args.device_id,
+        udp_control_port=None if args.udp_control_port < 0 else args.udp_control_port,
+    )
+    emulator.start()
+    try:
+        last_count = 0
+        while True:
+            time.sleep(5)
+            count = len(emulator.commands)
+            emulator.log(f"frames={emulator.frames_sent} commands={count} (+{count - last_count}) motor={emulator.motor}")
+            last_count = count
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Web 層負載測試：大量 /video_feed 觀看者下的控制延遲
+
+先在沒有觀看者時量測 POST /api/control 的基準延遲，再開 N 個 /video_feed 觀看者
+重測一次，回報延遲百分位與每個觀看者的實際幀率。觀看者變多時控制延遲不應明顯變差；
+p99 超過「基準 p99 + --p99-margin (預設 10 ms)」時以非零狀態結束，可用於比較 SERVER_MODE。
+
+用法：
+    python tools/esp32_emulator.py --http-port 80 --stream-port 81      # 或接真實裝置
+    SERVER_MODE=gevent python web_server.py
+    python tools/load_test.py --viewers 50 --duration 20
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import requests
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_control(server: str, duration: float, rate: float) -> List[float]:
+    """以固定速率送 stop 指令 (left=right=0，不會讓車子動)，返回每次延遲 (ms)"""
+    session = requests.Session()
+    latencies = []
+    interval = 1.0 / rate
+    deadline = time.time() + duration
+    next_send = time.time()
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            resp = session.post(f"{server}/api/control", json={"left": 0, "right": 0}, timeout=5)
+            if resp.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+        except requests.RequestException:
+            pass
+        next_send += interval
+        time.sleep(max(0.0, next_send - time.time()))
+    return latencies
+
+
+class Viewer(threading.Thread):
+    """一個 /video_feed 連線，只計算收到的 multipart 幀數"""
+
+    def __init__(self, server: str, query: str = ""):
+        super().__init__(daemon=True)
+        self.url = f"{server}/video_feed{query}"
+        self.frames = 0
+        self.error = None
+        self.started_at = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with requests.get(self.url, stream=True, timeout=(5, 10)) as resp:
+                self.started_at = time.time()
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    # 每個 part 以 "--frame" boundary 開頭
+                    self.frames += chunk.count(b"--frame")
+                    if self._stop_event.is_set():
+                        break
+        except requests.RequestException as e:
+            self.error = str(e)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def fps(self, now: float) -> float:
+        if not self.started_at or now <= self.started_at:
+            return 0.0
+        return max(0, self.frames - 1) / (now - self.started_at)
+
+
+def summarize(name: str, latencies: List[float]) -> Dict[str, float]:
+    result = {
+        "count": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+    print(f"  {name:<10} n={result['count']:<5} p50={result['p50']:6.1f} ms  "
+          f"p95={result['p95']:6.1f} ms  p99={result['p99']:6.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control latency under many /video_feed viewers")
+    parser.add_argument("--server", default="http://127.0.0.1:5000")
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    parser.add_argument("--control-rate", type=float, default=20.0, help="control requests per second")
+    parser.add_argument("--query", default="", help="query string for viewers, e.g. '?fps=10&width=320'")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds to let viewers connect")
+    parser.add_argument("--p99-margin", type=float, default=10.0,
+                        help="allowed control p99 increase over the baseline (ms)")
+    args = parser.parse_args()
+    server = args.server.rstrip("/")
+
+    try:
+        status = requests.get(f"{server}/api/status", timeout=5).json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Server not reachable at {server}: {e}")
+        return 2
+    print(f"🎯 {server}  stream_connected={status.get('stream_connected')}")
+
+    print(f"⏱️ Baseline: 0 viewers, {args.control_rate:g} req/s for {args.duration:g}s")
+    baseline = summarize("baseline", measure_control(server, args.duration, args.control_rate))
+
+    viewers = [Viewer(server, args.query) for _ in range(args.viewers)]
+    for viewer in viewers:
+        viewer.start()
+    time.sleep(args.warmup)
+    print(f"⏱️ Loaded: {args.viewers} viewers, {args.control_rate:g} req/s for {args.duration:g}s")
+    for viewer in viewers:
+        # 只計算量測期間的幀
+        if viewer.started_at:
+            viewer.frames, viewer.started_at = 0, time.time()
+    loaded = summarize("loaded", measure_control(server, args.duration, args.control_rate))
+
+    now = time.time()
+    rates = [v.fps(now) for v in viewers]
+    failed = [v for v in viewers if v.error or not v.started_at]
+    for viewer in viewers:
+        viewer.stop()
+    if rates:
+        print(f"📺 Viewer fps: min={min(rates):.1f} median={statistics.median(rates):.1f} "
+              f"max={max(rates):.1f}  failed={len(failed)}")
+    try:
+        status = requests.get(f"{server}/api/status", timeout=5).json()
+        print(f"📊 Server reports {status.get('stream_viewers')} viewers")
+    except (requests.RequestException, ValueError):
+        pass
+
+    if not baseline["count"] or not loaded["count"]:
+        print("❌ No successful control requests")
+        return 1
+    limit = baseline["p99"] + args.p99_margin
+    if loaded["p99"] > limit:
+        print(f"❌ Control p99 degraded: {loaded['p99']:.1f} ms > {limit:.1f} ms")
+        return 1
+    print(f"✅ Control p99 {loaded['p99']:.1f} ms within {limit:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+UDP 底盤控制通道
+
+WebSocket / HTTP ``/motor`` 都走 TCP：一個封包遺失，後面所有指令都要等重傳 (head-of-line
+blocking)，HTTP 還要再付一次 request 解析。遙控只在乎「最新」的指令，舊的晚到不如不到，
+所以改成單向 UDP，封包格式沿用手臂的 ``RM`` 協定 (見 arm_protocol)：
+
+    'RM' + cmd_id (0x10) + <IhhH seq, left, right, deadline_ms> + CRC16-CCITT (<H)
+
+- seq: 每個封包 (含 keepalive) 遞增；接收端只接受比上一個新的 seq，晚到的舊封包直接丟掉
+- deadline_ms: 接收端超過此時間沒收到任何封包就停車 (dead-man)
+- keepalive: 非停車指令每 keepalive_interval 重送一次 (新 seq)，停車指令重送 stop_repeats 次後安靜
+
+韌體在 CONTROL_UDP_PORT (4212) 接收，見 Firmware/ESP32_S3/main/app_udp.c；
+不與 4211 (距離 / 手臂廣播) 共用 port，避免手臂廣播封包被車子誤解析。
+"""
+
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from arm_protocol import decode_packet, encode_packet
+
+CMD_CHASSIS = 0x10
+CHASSIS = struct.Struct('<IhhH')
+DEFAULT_PORT = 4212
+PACKET_SIZE = 3 + CHASSIS.size + 2  # 'RM' + cmd_id + payload + CRC16
+
+
+def encode_chassis(seq: int, left: int, right: int, deadline_ms: int) -> bytes:
+    left = max(-32768, min(32767, int(left)))
+    right = max(-32768, min(32767, int(right)))
+    return encode_packet(CMD_CHASSIS, CHASSIS.pack(seq & 0xFFFFFFFF, left, right,
+                                                   max(0, min(0xFFFF, int(deadline_ms)))))
+
+
+def decode_chassis(packet: bytes) -> Optional[Tuple[int, int, int, int]]:
+    """返回 (seq, left, right, deadline_ms)；不是底盤封包返回 None"""
+    decoded = decode_packet(packet)
+    if decoded is None or decoded[0] != CMD_CHASSIS or len(decoded[1]) != CHASSIS.size:
+        return None
+    return CHASSIS.unpack(decoded[1])
+
+
+def seq_newer(seq: int, last: int) -> bool:
+    """32-bit 序號比較 (可跨越 wrap-around)"""
+    return 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
+
+
+class UdpChassisClient:
+    """以 UDP 送出底盤指令，並在背景送 keepalive"""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, keepalive_interval: float = 0.1,
+                 deadline_ms: int = 300, stop_repeats: int = 3):
+        """
+        Args:
+            host: 裝置位址
+            port: 裝置的 UDP 控制 port
+            keepalive_interval: 重送最新指令的間隔 (秒，0 = 不送 keepalive)
+            deadline_ms: 封包內的 dead-man 時間，應大於數個 keepalive 間隔
+            stop_repeats: 停車指令額外重送幾次 (降低停車封包遺失的機會)
+        """
+        self.host = host
+        self.port = port
+        self.keepalive_interval = keepalive_interval
+        self.deadline_ms = deadline_ms
+        self.stop_repeats = stop_repeats
+        # connect() 只設定預設目的地：每次 send 不必再解析位址，ICMP 錯誤也會回報到這個 socket
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((host, port))
+        self.lock = threading.Lock()
+        self.running = True
+        self._seq = 0
+        self._command: Optional[Tuple[int, int]] = None
+        self._repeats_left = 0
+        self._last_tx = 0.0
+
+        self.sent = 0
+        self.keepalives = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+        if keepalive_interval > 0:
+            threading.Thread(target=self._keepalive, daemon=True).start()
+
+    def _transmit(self, left: int, right: int) -> bool:
+        """送出一個封包 (呼叫端持有 lock)"""
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        try:
+            self.sock.send(encode_chassis(self._seq, left, right, self.deadline_ms))
+        except OSError as e:
+            self.errors += 1
+            self.last_error = str(e)
+            return False
+        self._last_tx = time.monotonic()
+        return True
+
+    def send(self, left: int, right: int) -> bool:
+        with self.lock:
+            self._command = (int(left), int(right))
+            self._repeats_left = self.stop_repeats if self._command == (0, 0) else 0
+            ok = self._transmit(left, right)
+            if ok:
+                self.sent += 1
+            return ok
+
+    def _keepalive(self):
+        while self.running:
+            time.sleep(self.keepalive_interval)
+            with self.lock:
+                if not self.running or self._command is None:
+                    continue
+                if time.monotonic() - self._last_tx < self.keepalive_interval:
+                    continue  # 剛送過新指令，不必重送
+                if self._command == (0, 0):
+                    if self._repeats_left <= 0:
+                        continue
+                    self._repeats_left -= 1
+                if self._transmit(*self._command):
+                    self.keepalives += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "seq": self._seq,
+            "sent": self.sent,
+            "keepalives": self.keepalives,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "deadline_ms": self.deadline_ms,
+        }
+
+    def close(self):
+        with self.lock:
+            self.running = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
@@ -0,0 +1,173 @@
+"""
+UDP 接收 reactor：discovery beacon、感測器遙測與其他 UDP 封包共用一個 select 迴圈
+
+原本 discovery 線程對每個封包都 decode + ``json.loads``，連 10 Hz 的感測器封包也一樣，
+``d`` / ``v`` 每個封包處理兩次並 print 每一筆讀值；另一個 (已停用的) 感測器線程也想綁 4211。
+
+``UdpReactor``：
+- 每個可讀的 socket 一次最多取 batch 個封包 (non-blocking recvfrom 直到沒有資料)
+- 依 bytes 前綴 (可再加一個 binary type byte) 分派給註冊的 handler，第一個符合的規則勝出；
+  比對只看開頭幾個 bytes，不 decode、不 parse
+- 每種封包各自統計數量、每秒封包數、handler 平均耗時 (含 parse) 與錯誤數
+"""
+
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[bytes, Tuple[str, int]], None]
+
+
+class _Route:
+    __slots__ = ('name', 'prefix', 'type_byte', 'handler', 'packets', 'errors', 'busy_ns',
+                 'window_start', 'window_packets', 'rate')
+
+    def __init__(self, name: str, prefix: bytes, type_byte: Optional[int], handler: Handler):
+        self.name = name
+        self.prefix = prefix
+        self.type_byte = type_byte
+        self.handler = handler
+        self.packets = 0
+        self.errors = 0
+        self.busy_ns = 0
+        self.window_start = time.monotonic()
+        self.window_packets = 0
+        self.rate = 0.0
+
+    def matches(self, data: bytes) -> bool:
+        if not data.startswith(self.prefix):
+            return False
+        if self.type_byte is None:
+            return True
+        return len(data) > len(self.prefix) and data[len(self.prefix)] == self.type_byte
+
+
+class UdpReactor:
+    """單一線程接收多個 UDP socket，依前綴分派並統計"""
+
+    def __init__(self, batch: int = 64, rate_window: float = 1.0, log_callback=None):
+        """
+        Args:
+            batch: 每個 socket 每輪最多取幾個封包 (避免單一 socket 的洪流餓死其他 socket)
+            rate_window: 計算每秒封包數的時間窗 (秒)
+        """
+        self.batch = max(1, batch)
+        self.rate_window = rate_window
+        self.log = log_callback or print
+        self.sockets: List[socket.socket] = []
+        self._routes: List[_Route] = []
+        self._lock = threading.Lock()
+        self.unmatched = 0
+        self.batches = 0
+
+    def register(self, name: str, handler: Handler, prefix: bytes = b'', type_byte: Optional[int] = None):
+        """
+        註冊 handler；依註冊順序比對，較具體的前綴要先註冊
+
+        Args:
+            name: 統計用名稱
+            handler: handler(data, addr)，在 reactor 線程上呼叫，應該很快返回
+            prefix: 封包開頭的 bytes
+            type_byte: 前綴之後的第一個 byte (例如 RM 協定的 cmd_id)
+        """
+        self._routes.append(_Route(name, prefix, type_byte, handler))
+
+    def bind(self, host: str, port: int) -> bool:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError as e:
+            sock.close()
+            self.log(f"[UDP] Bind {host}:{port} failed: {e}")
+            return False
+        sock.setblocking(False)
+        self.sockets.append(sock)
+        return True
+
+    def dispatch(self, data: bytes, addr: Tuple[str, int], now: Optional[float] = None):
+        for route in self._routes:
+            if route.matches(data):
+                break
+        else:
+            self.unmatched += 1
+            return
+        start = time.perf_counter_ns()
+        try:
+            route.handler(data, addr)
+        except Exception as e:
+            route.errors += 1
+            if route.errors == 1 or route.errors % 100 == 0:
+                self.log(f"[UDP] {route.name} handler error ({route.errors}x): {e}")
+        route.busy_ns += time.perf_counter_ns() - start
+
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            route.packets += 1
+            route.window_packets += 1
+            elapsed = now - route.window_start
+            if elapsed >= self.rate_window:
+                route.rate = route.window_packets / elapsed
+                route.window_start = now
+                route.window_packets = 0
+
+    def poll(self, timeout: float = 1.0) -> int:
+        """等待一次並處理所有可讀 socket 的封包，返回處理的封包數"""
+        if not self.sockets:
+            time.sleep(timeout)
+            return 0
+        readable, _, _ = select.select(self.sockets, [], [], timeout)
+        handled = 0
+        for sock in readable:
+            for _ in range(self.batch):
+                try:
+                    data, addr = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break  # e.g. ICMP error reported on Windows; the socket stays usable
+                self.dispatch(data, addr)
+                handled += 1
+        if handled:
+            self.batches += 1
+        return handled
+
+    def run(self, should_run: Callable[[], bool], timeout: float = 1.0,
+            tick: Optional[Callable[[], None]] = None):
+        """
+        持續 poll 直到 should_run() 為 False
+
+        Args:
+            tick: 每輪 poll 之後在 reactor 線程上呼叫 (例如檢查裝置是否離線)；沒有封包時至少每 timeout 秒一次
+        """
+        while should_run():
+            try:
+                self.poll(timeout)
+                if tick is not None:
+                    tick()
+            except Exception as e:
+                self.log(f"[UDP] Reactor error: {e}")
+                time.sleep(1)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        routes = {}
+        with self._lock:
+            for route in self._routes:
+                elapsed = now - route.window_start
+                # 時間窗內沒有新封包時，速率逐漸衰減而不是停在最後一次的值
+                rate = route.rate if elapsed < self.rate_window else route.window_packets / elapsed
+                routes[route.name] = {
+                    "packets": route.packets,
+                    "rate_hz": round(rate, 1),
+                    "avg_us": round(route.busy_ns / route.packets / 1000, 1) if route.packets else None,
+                    "errors": route.errors,
+                }
+        return {"routes": routes, "unmatched": self.unmatched, "batches": self.batches}
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
@@ -17,4 +17,12 @@ def build_initial_video_config(state: Any) -> Mapping[str, Any]:
         'camera_ip': getattr(state, 'camera_ip', None),
         'camera_net_ip': getattr(state, 'camera_net_ip', None),
         'ai_enabled': getattr(state, 'ai_enabled', False),
+        'max_frame_age_ms': getattr(state, 'max_frame_age_ms', None),
+        'stream_stall_timeout_ms': getattr(state, 'stream_stall_timeout_ms', None),
+        'record_path': getattr(state, 'record_path', None),
+        'stream_candidates': list(getattr(state, 'stream_candidates', []) or []),
+        'frame_ring': getattr(state, 'frame_ring_spec', None),
+        'camera_rate_control': getattr(state, 'camera_rate_control', False),
+        'camera_target_fps': getattr(state, 'camera_target_fps', None),
+        'frame_bus_port': getattr(state, 'frame_bus_port', None),
     }
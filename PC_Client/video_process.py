@@ -10,17 +10,26 @@ from queue import Empty
 import sys
 import os
 import threading
+import requests
 
 # Import custom MJPEG reader and network utils
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from mjpeg_reader import MJPEGStreamReader
 from network_utils import SourceAddressAdapter
+from frame_deadline import FrameDeadline
+from jpeg_utils import probe_jpeg, JpegError
+from frame_buffers import FrameRing
+from camera_rate_control import CameraRateController
+from frame_bus import FrameBusPublisher
 
 # Commands
 CMD_SET_URL = "SET_URL"
 CMD_SET_AI = "SET_AI"
 CMD_SET_MODEL = "SET_MODEL"
 CMD_EXIT = "EXIT"
+CMD_PAUSE = "PAUSE"    # No viewers: park the reader (connection kept warm)
+CMD_RESUME = "RESUME"
+CMD_RATE_CONTROL = "RATE_CONTROL"  # Enable / disable automatic framesize & quality control
 
 
 def start_esp32_stream(esp32_ip):
@@ -107,20 +116,96 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
     ai_frame_skip_counter = 0  # [OPTIMIZATION] Counter for AI frame skipping
     AI_PROCESS_EVERY_N_FRAMES = 5  # Process AI on 1 out of every 5 frames
     last_ai_result = None  # Cache last AI result (JPEG bytes)
+    frame_seq = 0  # Sequence number of frames handed to the web server
+
+    # [Deadline] Drop frames that can no longer arrive in time
+    frame_deadline = FrameDeadline(initial_config.get('max_frame_age_ms'))
+    if frame_deadline.max_age:
+        log(f"Frame deadline: {frame_deadline.max_age * 1000:.0f} ms")
+    invalid_frames = 0  # [Validation] Frames rejected by the JPEG header probe
+    frame_info = None   # JpegInfo of the last valid frame (size / sampling, no decode needed)
+
+    # [Buffers] Encoded JPEGs go through shared memory
+    frame_ring = None
+    if initial_config.get('frame_ring'):
+        try:
+            frame_ring = FrameRing.attach(initial_config['frame_ring'])
+        except Exception as e:
+            log(f"⚠️ Shared frame ring unavailable, using queue: {e}")
+
+    def publish(captured_at, jpeg):
+        # Queue items are (seq, captured_at, payload); the web side re-checks the deadline.
+        # payload is a ring slot (int) or, if the ring is unavailable / frame too large, the JPEG bytes.
+        nonlocal frame_seq
+        frame_seq += 1
+        payload = frame_ring.write(frame_seq, captured_at, jpeg) if frame_ring else None
+        if payload is None:
+            payload = jpeg if isinstance(jpeg, bytes) else jpeg.tobytes()
+        if frame_queue.full():
+            try: frame_queue.get_nowait()
+            except Empty: pass
+        frame_queue.put((frame_seq, captured_at, payload))
+        if frame_bus:
+            frame_bus.publish('processed', frame_seq, captured_at, jpeg)
     
+    record_path = initial_config.get('record_path')
+    stream_candidates = list(initial_config.get('stream_candidates') or [])
+    stall_timeout_ms = initial_config.get('stream_stall_timeout_ms')
+    stall_timeout = (stall_timeout_ms / 1000.0) if stall_timeout_ms is not None else 0.6
+
+    def open_reader(url):
+        """Create a reader for ``url``: live MJPEG, or a recorded segment (replay://path)."""
+        if url.startswith('replay://'):
+            from stream_recorder import ReplayReader
+            return ReplayReader(url[len('replay://'):], realtime=True, loop=True, log_callback=log)
+        # Create MJPEG reader optimized for ESP32-CAM
+        return MJPEGStreamReader(
+            url=url,
+            source_ip=source_ip,  # Bind to specific network interface
+            frame_queue_size=2,   # Small buffer = low latency
+            chunk_size=16384,     # 16KB for better efficiency
+            reconnect_delay=1.0,  # Faster initial reconnect
+            max_reconnect_delay=30.0,
+            connection_timeout=30,  # Longer timeout for ESP32
+            log_callback=log,
+            record_path=record_path,  # Raw stream recording (None = off)
+            candidate_urls=[u for u in stream_candidates if u != url],  # Raced with url on connect
+            connect_timeout=2.0,
+            stall_timeout=stall_timeout  # No frame for this long = half-open link, reconnect now
+        )
+
+    def close_reader(r):
+        """Stop ``r``; a ReplayReader also releases its segment file and mmap."""
+        getattr(r, 'close', r.stop)()
+
+    stream_paused = False  # Set by CMD_PAUSE / CMD_RESUME (demand from the web server)
+
+    # [Frame Bus] Local subscribers (recorders, tools) tap frames without a second ESP32 connection
+    frame_bus = None
+    raw_seq = 0
+    if initial_config.get('frame_bus_port') is not None:
+        try:
+            frame_bus = FrameBusPublisher(port=initial_config['frame_bus_port'], log_callback=log).start()
+        except OSError as e:
+            log(f"⚠️ Frame bus disabled: {e}")
+            frame_bus = None
+
+    def reader_should_pause():
+        # Bus subscribers keep the camera stream alive even when no browser is watching
+        return stream_paused and not (frame_bus and frame_bus.subscribers)
+
+    # [Rate Control] Adjust ESP32 framesize / quality to hold the target frame rate
+    rate_control = None
+    if initial_config.get('camera_rate_control'):
+        rate_control = CameraRateController(
+            target_fps=initial_config.get('camera_target_fps') or 15.0,
+            log_callback=log
+        )
+        rate_control.start()
+
     if video_url:
         try:
-            # Create MJPEG reader optimized for ESP32-CAM
-            reader = MJPEGStreamReader(
-                url=video_url,
-                source_ip=source_ip,  # Bind to specific network interface
-                frame_queue_size=2,   # Small buffer = low latency
-                chunk_size=16384,     # 16KB for better efficiency
-                reconnect_delay=1.0,  # Faster initial reconnect
-                max_reconnect_delay=30.0,
-                connection_timeout=30,  # Longer timeout for ESP32
-                log_callback=log
-            )
+            reader = open_reader(video_url)
             reader.start()
             log(f"✅ MJPEG Reader started: {video_url}")
         except Exception as e:
@@ -137,7 +222,9 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
                     cmd, data = cmd_queue.get_nowait()
 
                     if cmd == CMD_EXIT:
-                        if stream: stream.stop()
+                        if reader: close_reader(reader)
+                        if rate_control: rate_control.stop()
+                        if frame_bus: frame_bus.stop()
                         log("Video process exiting (CMD_EXIT)")
                         return
 
@@ -147,24 +234,32 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
                         
                         # Restart reader with new URL
                         if reader:
-                            reader.stop()
+                            close_reader(reader)
                         
                         try:
-                            reader = MJPEGStreamReader(
-                                url=new_url,
-                                source_ip=source_ip,
-                                frame_queue_size=2,
-                                chunk_size=8192,
-                                reconnect_delay=2.0,
-                                max_reconnect_delay=30.0,
-                                log_callback=log
-                            )
+                            reader = open_reader(new_url)
                             reader.start()
+                            if reader_should_pause():
+                                reader.pause()
+                            if rate_control:
+                                rate_control.reset_window()
                             log(f"Switched stream to {new_url}")
                         except Exception as e:
                             log(f"Failed to switch stream: {e}")
                             reader = None
                                 
+                    elif cmd == CMD_PAUSE:
+                        stream_paused = True  # Applied below, unless the frame bus still has subscribers
+
+                    elif cmd == CMD_RESUME:
+                        stream_paused = False
+
+                    elif cmd == CMD_RATE_CONTROL:
+                        if rate_control:
+                            rate_control.set_enabled(bool(data))
+                        elif data:
+                            log("Camera rate control is off in config (CAMERA_RATE_CONTROL)")
+
                     elif cmd == CMD_SET_AI:
                         enable_ai = bool(data)
                         if enable_ai and detector is None:
@@ -212,13 +307,49 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
             #     # query_esp32_status(target_ip) # This was blocking!
             #     last_status_check = time.time() 
               
+            # [Demand] Park / wake the reader (web viewers via CMD_PAUSE/RESUME, plus bus subscribers)
+            if reader and reader.paused != reader_should_pause():
+                if reader.paused:
+                    reader.resume()
+                    if rate_control:
+                        rate_control.reset_window()
+                else:
+                    reader.pause()
+
+            # [Rate Control] Cheap counter check; /control and /status requests run in the controller thread
+            if rate_control and isinstance(reader, MJPEGStreamReader) and not reader.paused:
+                rate_control.set_host(reader.url, source_ip)
+                rate_control.update(reader.stats)
+
             # 3. Get Latest Frame from MJPEG Reader
             frame = None
             frame_bytes = None
+            captured_at = None
             
             if reader:
                 # Read JPEG bytes from reader (non-blocking)
-                frame_bytes = reader.read(timeout=0.1)
+                packet = reader.read_timestamped(timeout=0.1)
+                if packet:
+                    captured_at, frame_bytes = packet
+                    if frame_bus:
+                        raw_seq += 1
+                        frame_bus.publish('raw', raw_seq, captured_at, frame_bytes)
+                    # [Deadline] Frame waited too long in the reader queue
+                    if frame_deadline.expired('decode', captured_at):
+                        frame_bytes = None
+
+                if frame_bytes:
+                    # [Validation] Reject truncated / corrupted JPEGs before any pixel work
+                    try:
+                        info = probe_jpeg(frame_bytes)
+                        if frame_info is None or info[:4] != frame_info[:4]:
+                            log(f"🖼️ Stream format: {info.width}x{info.height} {info.subsampling}")
+                        frame_info = info
+                    except JpegError as e:
+                        invalid_frames += 1
+                        if invalid_frames == 1 or invalid_frames % 100 == 0:
+                            log(f"⚠️ Invalid JPEG dropped ({invalid_frames} total): {e}")
+                        frame_bytes = None
                 
                 if frame_bytes:
                     # Decode JPEG bytes to numpy array
@@ -235,7 +366,12 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
                         if frame_count % 100 == 0:
                             elapsed = time.time() - last_stats_time
                             fps = 100 / elapsed if elapsed > 0 else 0
-                            log(f"📊 Stream FPS: {fps:.1f}")
+                            stats_msg = f"📊 Stream FPS: {fps:.1f}"
+                            if frame_deadline.total_dropped():
+                                stats_msg += f" | Late drops: {frame_deadline.summary()}"
+                            if invalid_frames:
+                                stats_msg += f" | Invalid: {invalid_frames}"
+                            log(stats_msg)
                             last_stats_time = time.time()
 
             if frame is not None:
@@ -248,40 +384,43 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
                     # Only process AI on every Nth frame
                     if ai_frame_skip_counter >= AI_PROCESS_EVERY_N_FRAMES:
                         ai_frame_skip_counter = 0
+                        # [Deadline] No point running inference on a frame that is already late
+                        if frame_deadline.expired('infer', captured_at):
+                            continue
                         try: 
                             # Process AI detection
-                            annotated_frame, detections, control = detector.detect(frame) 
+                            # Annotate the freshly decoded frame in place (no plot() copy)
+                            annotated_frame, detections, control = detector.detect(frame, in_place=True) 
                             final_frame = annotated_frame 
                             
-                            # 快取編碼後的 JPEG bytes（避免重複編碼）
+                            # 快取編碼後的 JPEG（ndarray，不再 tobytes() 複製一次）
                             ret, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
                             if ret:
-                                last_ai_result = buffer.tobytes()
+                                last_ai_result = buffer
                         except Exception as e: 
                             log(f"AI Error: {e}") 
                     else:
                         # Use cached AI result (JPEG bytes) for frames we skip
                         if last_ai_result is not None:
-                            # Send cached JPEG bytes directly - avoid re-encoding!
+                            # Send cached JPEG directly - avoid re-encoding!
                             try:
-                                if frame_queue.full():
-                                    try: frame_queue.get_nowait()
-                                    except Empty: pass
-                                frame_queue.put(last_ai_result)
+                                publish(captured_at, last_ai_result)
                                 continue  # Skip normal encoding path
                             except:
                                 pass
                   
                 # 5. Send to Web (Queue)
+                # [Deadline] Inference may have pushed the frame past its deadline
+                if frame_deadline.expired('encode', captured_at):
+                    continue
                 try: 
                     ret, buffer = cv2.imencode('.jpg', final_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
                     if ret: 
-                        if frame_queue.full(): 
-                            try: frame_queue.get_nowait()
-                            except Empty: pass
-                        frame_queue.put(buffer.tobytes()) 
+                        publish(captured_at, buffer)  # Copied once, straight into the shared ring
                 except:
                     pass
+            elif reader and reader.paused:
+                time.sleep(0.05) # Nobody watching: only poll for commands
             else:
                 time.sleep(0.01) # Prevent CPU spin if no frame yet
     
@@ -289,5 +428,5 @@ def video_process_target(cmd_queue, frame_queue, log_queue, initial_config):
         # Graceful shutdown on Ctrl+C
         log("Video process interrupted by user (Ctrl+C)")
         if reader:
-            reader.stop()
+            close_reader(reader)
         return
\ No newline at end of file
@@ -1,5 +1,21 @@
 import sys
 import os
+import config
+
+# [Server Mode] SERVER_MODE=gevent / eventlet runs the web tier on an event loop: every
+# /video_feed viewer and SocketIO client is a greenlet instead of an OS thread.
+# The stdlib must be patched before anything else is imported, and only in the server
+# process itself -- the spawned video process re-imports this module as __mp_main__.
+SERVER_MODE = config.SERVER_MODE
+if __name__ == '__main__' and SERVER_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+elif __name__ == '__main__' and SERVER_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+else:
+    SERVER_MODE = 'threading'
+
 import struct
 import cv2
 import time
@@ -17,11 +33,10 @@ from urllib3.util.retry import Retry
 import serial
 import pygame
 import json
-import websocket
 from queue import SimpleQueue, Empty
 from serial.tools import list_ports
 from flask import Flask, render_template, Response, request, jsonify, send_from_directory
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO
 from multiprocessing import Process, Queue
 
 # 路徑設定
@@ -36,9 +51,21 @@ from serial_worker import serial_worker, prepare_sketch, compile_and_upload
 from ai_detector import YOLO_AVAILABLE
 
 # 導入 Video Process
-from video_process import video_process_target, CMD_SET_URL, CMD_SET_AI, CMD_SET_MODEL, CMD_EXIT
+from video_process import video_process_target, CMD_SET_URL, CMD_SET_AI, CMD_SET_MODEL, CMD_EXIT, CMD_PAUSE, CMD_RESUME, CMD_RATE_CONTROL
 from video_config import build_initial_video_config
-from network_utils import SourceAddressAdapter
+from frame_deadline import FrameDeadline
+from frame_buffers import FrameRing
+from stream_profiles import AdaptiveQuality, ProfileCache, StreamProfile, fps_slot, parse_profile, transcode
+from jpeg_utils import probe_jpeg, JpegError
+from status_delta import StatusTracker
+from log_ring import LogRing, LogThrottle, log_source
+from socket_outbox import OutboxEvent, coalesce
+from udp_reactor import UdpReactor
+from device_registry import DeviceRegistry
+from control_dispatcher import ControlDispatcher
+import arm_protocol
+from arm_stream import ArmStream
+from network_utils import SourceAddressAdapter, race_tcp_connect
 
 # 初始化 Flask 和 SocketIO
 template_dir = os.path.join(BASE_DIR, 'templates')
@@ -47,21 +74,11 @@ app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 # CRITICAL: Disable template caching to force browser reload
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 app.config['TEMPLATES_AUTO_RELOAD'] = True
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=SERVER_MODE)
 
 BRIDGE_CACHE_FILE = Path(BASE_DIR) / ".last_bridge_host"
 
 
-def _is_host_reachable(host: str, port: int, timeout: float = 1.0) -> bool:
-    """Check whether a TCP connection to ``host:port`` can be established."""
-
-    try:
-        with socket.create_connection((host, port), timeout=timeout):
-            return True
-    except OSError:
-        return False
-
-
 def _clear_cached_bridge_host():
     """Remove the cached bridge host file when it is stale or invalid."""
 
@@ -163,10 +180,13 @@ def find_reachable_interface(target_ip):
 
     return None
 
-def _apply_camera_ip(ip, stream_url=None, prefix=""):
+_LOOKUP_INTERFACE = object()
+
+def _apply_camera_ip(ip, stream_url=None, prefix="", interface=_LOOKUP_INTERFACE):
     """
     Apply discovered camera IP and update video process configuration.
-    Now includes smart interface detection.
+    Now includes smart interface detection; pass ``interface`` when it is already known
+    (e.g. cached by the device registry, None = default route) to skip the lookup.
     """
     updated = False
     if state.camera_ip != ip:
@@ -175,7 +195,9 @@ def _apply_camera_ip(ip, stream_url=None, prefix=""):
         updated = True
 
         # Find which local interface can reach this camera
-        reachable_interface = find_reachable_interface(ip)
+        if interface is _LOOKUP_INTERFACE:
+            interface = find_reachable_interface(ip)
+        reachable_interface = interface
         if reachable_interface:
             state.camera_net_ip = reachable_interface
         else:
@@ -228,77 +250,9 @@ def _persist_bridge_host(host: str):
     except Exception:
         pass
 
-import websocket
-import threading
-import json
-import time # Added for time.sleep
-
-# ⭐ WebSocket Client for Low Latency Control
-class AsyncControlClient:
-    def __init__(self, target_ip):
-        self.target_ip = target_ip
-        self.ws_url = f"ws://{target_ip}/ws/control"
-        self.ws = None
-        self.connected = False
-        self.lock = threading.Lock()
-        self.running = True
-        
-        # Start background worker
-        self.thread = threading.Thread(target=self._worker, daemon=True)
-        self.thread.start()
-
-    def _worker(self):
-        print(f"[WS] Worker started for {self.ws_url}")
-        while self.running:
-            try:
-                # 1. Connect
-                self.ws = websocket.WebSocket()
-                self.ws.connect(self.ws_url, timeout=1.0)
-                
-                with self.lock:
-                    self.connected = True
-                print(f"[WS] ✅ Connected to {self.target_ip}")
-                
-                # 2. Keep Connection Alive (Receive Loop)
-                while self.running:
-                    try:
-                        # Simple Ping-Pong or just wait for close
-                        # ESP might send stats later
-                        result = self.ws.recv() 
-                    except (websocket.WebSocketException, ConnectionError):
-                        print("[WS] ⚠️ Connection Lost")
-                        break
-                        
-            except Exception as e:
-                # print(f"[WS] Connection Failed: {e}") # Reduce noise
-                time.sleep(2) # Retry delay
-            finally:
-                with self.lock:
-                    self.connected = False
-                if self.ws:
-                    try: self.ws.close()
-                    except: pass
-                # Reconnect delay
-                time.sleep(1)
-
-    def send(self, left, right):
-        if not self.connected:
-            return False
-        
-        try:
-            payload = json.dumps({"l": left, "r": right})
-            with self.lock:
-                self.ws.send(payload)
-            return True
-        except Exception as e:
-            print(f"[WS] Send Error: {e}")
-            return False
-
-    def close(self):
-        self.running = False
-        if self.ws: self.ws.close()
-
-
+# ⭐ WebSocket Client for Low Latency Control (binary protocol with ACK / RTT stats)
+from control_client import AsyncControlClient
+from udp_control import UdpChassisClient
 
 # === 全域狀態 ===
 class SystemState:
@@ -312,16 +266,33 @@ class SystemState:
         self.internet_net_ip = self.net_info["internet_net"]["ip"] if self.net_info["internet_net"] else None
 
         cached_bridge = _load_cached_bridge_host()
-        if cached_bridge and not _is_host_reachable(cached_bridge, config.DEFAULT_STREAM_PORT):
+        default_stream_hosts = getattr(config, "DEFAULT_STREAM_HOSTS", [])
+        default_stream_ip = getattr(config, "DEFAULT_STREAM_IP", "")
+        fallback_ips = getattr(config, "FALLBACK_IPS", [])
+
+        # [Happy Eyeballs] Probe every candidate at once instead of one blocking second per host
+        probe_hosts = _unique_hosts([
+            "192.168.4.1" if self.net_info["camera_net"] else None,
+            cached_bridge,
+            default_stream_ip,
+            *default_stream_hosts,
+            *fallback_ips,
+        ])
+        reachable_host = race_tcp_connect(probe_hosts, config.DEFAULT_STREAM_PORT, timeout=1.0)
+        if reachable_host:
+            print(f"[INIT] {reachable_host} answered first on port {config.DEFAULT_STREAM_PORT} ({len(probe_hosts)} candidates raced)")
+            if reachable_host != cached_bridge:
+                _persist_bridge_host(reachable_host)
+        elif cached_bridge:
             print(f"[INIT] Cached camera IP {cached_bridge} unreachable on port {config.DEFAULT_STREAM_PORT}, clearing cache.")
             cached_bridge = None
             _clear_cached_bridge_host()
 
-        default_stream_hosts = getattr(config, "DEFAULT_STREAM_HOSTS", [])
-        default_stream_ip = getattr(config, "DEFAULT_STREAM_IP", "")
-
         # 2. 自動設定 IP
-        if self.net_info["camera_net"]:
+        if reachable_host:
+            self.camera_ip = reachable_host
+            print(f"[INIT] Auto-selected Camera IP: {self.camera_ip} (first to answer)")
+        elif self.net_info["camera_net"]:
             self.camera_ip = "192.168.4.1"
             print(f"[INIT] Auto-selected Camera IP: {self.camera_ip} (via {self.net_info['camera_net']['name']})")
         else:
@@ -332,29 +303,36 @@ class SystemState:
 
         self.car_ip = getattr(config, "DEFAULT_CAR_IP", "boebot.local")
         self.current_ip = self.car_ip
-        self.bridge_ip = cached_bridge or default_stream_ip or getattr(config, "DEFAULT_CAR_IP", "")
+        self.bridge_ip = reachable_host or cached_bridge or default_stream_ip or getattr(config, "DEFAULT_CAR_IP", "")
 
         self.stream_hosts = _unique_hosts([
             self.camera_ip,
             cached_bridge,
             default_stream_ip,
             *default_stream_hosts,
+            *fallback_ips,
             self.bridge_ip,
         ])
 
         if not self.camera_ip and self.stream_hosts:
             self.camera_ip = self.stream_hosts[0]
 
+        # Candidate stream URLs raced by the video process on every (re)connect
+        self.stream_candidates = [_build_stream_url(h) for h in self.stream_hosts]
+
         self.serial_port = None
         self.preferred_port = None
         self.ser = None
         self.ws_connected = False
         self.ws_client = None # [FIX] Initialize before use
+        self.udp_client = None  # CONTROL_TRANSPORT == "udp"
         self.arm_ip = None  # [Reset] Discovery will fill this
-        self.video_url = _build_stream_url(self.camera_ip)
+        self.video_url = getattr(config, "STREAM_REPLAY_URL", None) or _build_stream_url(self.camera_ip)
+        self.record_path = getattr(config, "STREAM_RECORD_PATH", None)
         self.radar_dist = 0.0
         self.radar_vib = 0  # [NEW] Vibration Sensor State (0/1)
-        self.logs = []
+        self.log_ring = LogRing(config.LOG_RING_SIZE)  # Lock-free; sequence numbers double as cursors
+        self.log_throttle = LogThrottle(rate=config.LOG_RATE_PER_SOURCE, burst=config.LOG_BURST_PER_SOURCE)
         self.is_running = True
         self.ai_enabled = False
         self.is_flashing = False
@@ -362,11 +340,29 @@ class SystemState:
         self.add_log = None
         
         self.frame_buffer = None # Now stores JPEG bytes directly
+        self.frame_seq = 0       # Sequence number assigned by the video process
+        self.frame_time = 0.0    # Capture time (time.time()) of frame_buffer
         self.frame_lock = threading.Lock()
+        self.frame_cond = threading.Condition(self.frame_lock)  # Notified on every new frame
+        self.max_frame_age_ms = getattr(config, "MAX_FRAME_AGE_MS", 0)
+        self.stream_stall_timeout_ms = getattr(config, "STREAM_STALL_TIMEOUT_MS", 600)
+        self.camera_rate_control = getattr(config, "CAMERA_RATE_CONTROL", False)
+        self.camera_target_fps = getattr(config, "CAMERA_TARGET_FPS", 15.0)
+        self.frame_bus_port = getattr(config, "FRAME_BUS_PORT", None)
+        self.frame_deadline = FrameDeadline(self.max_frame_age_ms, stages=("publish",))
         self.stream_connected = False
+        # [Demand] Park the video reader when no one needs frames
+        self.stream_viewers = 0              # Open /video_feed responses
+        self.stream_idle_since = time.time() # Last moment someone needed frames
+        self.stream_paused = False
+        self.stream_idle_grace = getattr(config, "STREAM_IDLE_GRACE_S", 10.0)
+        self.stream_demand_lock = threading.Lock()
+        self.stream_clients = set()          # AdaptiveQuality of each adaptive /video_feed client
         self.last_api_control_time = 0.0  # [Input Priority] Track last API/Keyboard command
         self.last_motor_cmd = (0, 0)      # [Soft Start] Track last sent PWM values
-        self.last_arm_cmd_json = ""       # [Deduplication] Track last sent Arm JSON
+        # [Deduplication] Arm packets go out only when a joint moves (or as a slow keepalive)
+        self.arm_stream = ArmStream(epsilon=config.ARM_EPSILON_DEG, max_rate=config.ARM_MAX_RATE_HZ,
+                                    keepalive=config.ARM_KEEPALIVE_S)
         
         self.consecutive_failures = 0
         self.last_failure_time = 0.0
@@ -380,14 +376,38 @@ class SystemState:
             self._init_ws_client(self.camera_ip)
 
     def _init_ws_client(self, ip):
+        if config.CONTROL_TRANSPORT == "udp":
+            self._init_udp_client(ip)
+            return
+        if config.CONTROL_TRANSPORT == "http":
+            return
         if self.ws_client:
             self.ws_client.close()
         try:
             print(f"[INIT] Starting WebSocket Client to {ip}...")
-            self.ws_client = AsyncControlClient(ip)
+            self.ws_client = AsyncControlClient(
+                ip, fallback_ips=getattr(self, "stream_hosts", []),
+                heartbeat_interval=config.CONTROL_WS_HEARTBEAT_MS / 1000.0,
+                miss_threshold=config.CONTROL_WS_HEARTBEAT_MISSES)
         except Exception as e:
             print(f"[INIT] WS Start Failed: {e}")
 
+    def _init_udp_client(self, ip):
+        # Same host: keep the socket (discovery calls this on every beacon)
+        if self.udp_client and self.udp_client.host == ip:
+            return
+        if self.udp_client:
+            self.udp_client.close()
+            self.udp_client = None
+        try:
+            print(f"[INIT] Starting UDP Control Channel to {ip}:{config.CONTROL_UDP_PORT}...")
+            self.udp_client = UdpChassisClient(
+                ip, port=config.CONTROL_UDP_PORT,
+                keepalive_interval=config.CONTROL_UDP_KEEPALIVE_MS / 1000.0,
+                deadline_ms=config.CONTROL_UDP_DEADLINE_MS)
+        except OSError as e:
+            print(f"[INIT] UDP Start Failed: {e}")
+
     def _create_control_session(self):
         """
         Factory to create a correctly configured requests.Session.
@@ -406,14 +426,8 @@ class SystemState:
         if not bind_ip and self.camera_ip:
             bind_ip = find_reachable_interface(self.camera_ip)
 
-        # Define Retry Strategy (Fast retry for control latency)
-        retry_strategy = Retry(
-            total=3,                # Retry 3 times
-            backoff_factor=0,       # No delay between retries (immediate)
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"],
-            raise_on_status=False
-        )
+        # No retries: a re-sent motor command is already stale, the dispatcher sends the newest one instead
+        retry_strategy = Retry(total=0, raise_on_status=False)
 
         if bind_ip:
             try:
@@ -457,10 +471,12 @@ class SystemState:
         print("="*60)
 
 state = SystemState()
-ws_outbox: "SimpleQueue[str]" = SimpleQueue()
+ws_outbox: "SimpleQueue[OutboxEvent]" = SimpleQueue()  # Every server -> browser event (see socket_emitter_thread)
 browser_controller_state = {"data": None, "timestamp": 0.0}
 # ESP12F UDP Port
 UDP_DIST_PORT = 4211
+# One socket for every arm packet: unicast once discovery knows the arm, broadcast until then
+arm_sender = arm_protocol.ArmSender(port=UDP_DIST_PORT)
 
 # === JOYSTICK MAPPING (Hardware Dependent) ===
 JOY_MAP = {
@@ -477,6 +493,9 @@ JOY_MAP = {
 # Multiprocessing Queues (initialized in main)
 video_cmd_queue = None
 video_frame_queue = None
+frame_ring = None  # Shared-memory JPEG ring written by the video process
+# Per-profile transcoded frames shared by /video_feed clients (cv2 work runs off the event loop)
+profile_cache = ProfileCache(transcoder=lambda *args: offload(transcode, *args))
 video_log_queue = None
 
 # Xbox 手把設定
@@ -561,14 +580,32 @@ class XboxController:
             "dpad_y": hat_y
         }
 
-def add_log(msg):
+def add_log(msg, source=None):
+    """
+    Record a log line. No I/O here: log_output_thread prints new lines in batches and
+    status deltas carry them to the browser, so hot threads never block on logging.
+    Repeated / flooding messages from the same source are squashed by state.log_throttle.
+    """
     timestamp = time.strftime("%H:%M:%S")
-    log_entry = f"[{timestamp}] {msg}"
-    state.logs.append(log_entry)
-    if len(state.logs) > 50:
-        state.logs.pop(0)
-    print(log_entry)
-    socketio.emit('log', {'data': log_entry})
+    for line in state.log_throttle.admit(source or log_source(msg), msg):
+        state.log_ring.append(f"[{timestamp}] {line}")
+
+def log_output_thread():
+    """Single consumer of the log ring: prints new lines to the console every LOG_FLUSH_MS."""
+    cursor = 0
+    interval = config.LOG_FLUSH_MS / 1000.0
+    while True:
+        summaries = state.log_throttle.flush()
+        if summaries:
+            timestamp = time.strftime("%H:%M:%S")
+            for line in summaries:
+                state.log_ring.append(f"[{timestamp}] {line}")
+        lines, cursor = state.log_ring.since(cursor)
+        if lines:
+            print("\n".join(lines), flush=True)
+        if not state.is_running:
+            break
+        time.sleep(interval)
 
 state.add_log = add_log
 
@@ -628,29 +665,30 @@ def _build_cmd_from_state(controller_state: dict) -> dict:
 
     return {"left": left_pwm, "right": right_pwm}
 
-# === Control Governor ===
-last_esp_cmd_time = 0
-MIN_CMD_INTERVAL = 0.08
+def control_link_down() -> bool:
+    """Circuit breaker open: recent sends failed and the backoff has not elapsed."""
+    return (state.consecutive_failures >= 3
+            and time.time() - state.last_failure_time < state.BACKOFF_DURATION)
 
 def send_control_command(left: int, right: int):
     """
-    Send motor control command to ESP32-S3.
-    Endpoint: GET /motor?left=XX&right=YY (HTTP Fallback)
-    Endpoint: WS /ws/control (Primary)
+    Queue a motor command and return immediately (see control_dispatcher).
+
+    Only the newest command is ever sent; the rate limit, stop priority and late-send
+    accounting live in the dispatcher. Returns False while the link's circuit breaker is open.
     """
-    global last_esp_cmd_time, state
+    control_dispatcher.submit(left, right)
+    return not control_link_down()
 
-    # [1. Server-Side Governor]
-    # Protect ESP32 from request floods (Connection Reset)
+def deliver_control_command(left: int, right: int):
+    """
+    Send motor control command to ESP32-S3 (runs on the dispatcher thread).
+    Endpoint: GET /motor?left=XX&right=YY (HTTP Fallback)
+    Endpoint: WS /ws/control (Primary, CONTROL_TRANSPORT="ws")
+    Endpoint: UDP RM 0x10 on CONTROL_UDP_PORT (CONTROL_TRANSPORT="udp", see udp_control)
+    """
     now = time.time()
-    
-    # Always allow STOP or if meaningful change?
-    # We allow STOP (0,0) to bypass rate limit for safety
-    is_stop = (left == 0 and right == 0)
-    
-    if not is_stop and (now - last_esp_cmd_time < MIN_CMD_INTERVAL):
-         return True # Rate limit active
-         
+
     # [Circuit Breaker]
     if state.consecutive_failures >= 3:
         if now - state.last_failure_time < state.BACKOFF_DURATION:
@@ -665,10 +703,15 @@ def send_control_command(left: int, right: int):
     # Update State
     state.last_motor_cmd = (left, right)
 
+    # ⭐ UDP: no handshake or retransmits; the device's dead-man covers lost packets
+    if config.CONTROL_TRANSPORT == "udp" and state.udp_client:
+        if state.udp_client.send(left, right):
+            return True
+        print("[CONTROL] UDP Send Failed, falling back to HTTP")
+
     # ⭐ WebSocket First Strategy
-    if state.ws_client and state.ws_client.connected:
+    elif state.ws_client and state.ws_client.connected:
         if state.ws_client.send(left, right):
-            last_esp_cmd_time = time.time()
             return True
         else:
              print("[CONTROL] WS Send Failed, falling back to HTTP")
@@ -677,7 +720,6 @@ def send_control_command(left: int, right: int):
     # add_log(f"[CONTROL] (HTTP) → {target_ip}/motor L:{left} R:{right}")
 
     try:
-        last_esp_cmd_time = time.time()
         resp = state.control_session.get(
             url, 
             params=params, 
@@ -718,6 +760,37 @@ def send_control_command(left: int, right: int):
         state.last_failure_time = time.time()
         return False
 
+# Latest-wins dispatcher: callers never block on the network
+control_dispatcher = ControlDispatcher(
+    deliver_control_command,
+    max_rate=config.CONTROL_MAX_RATE_HZ,
+    deadline=config.CONTROL_DEADLINE_MS / 1000.0,
+    log_callback=add_log,
+)
+
+def update_stream_demand():
+    """Pause the video reader after the idle grace period; resume as soon as frames are needed."""
+    if video_cmd_queue is None:
+        return
+    now = time.time()
+    wanted = state.stream_viewers > 0 or state.ai_enabled
+    with state.stream_demand_lock:
+        if wanted:
+            state.stream_idle_since = now
+            if state.stream_paused:
+                state.stream_paused = False
+                video_cmd_queue.put((CMD_RESUME, None))
+                add_log("[VIDEO] ▶️ Frames requested, resuming stream")
+        elif (not state.stream_paused and state.stream_idle_grace is not None
+              and now - state.stream_idle_since >= state.stream_idle_grace):
+            state.stream_paused = True
+            video_cmd_queue.put((CMD_PAUSE, None))
+            with state.frame_lock:
+                # Don't greet the next viewer with a frame from minutes ago
+                state.frame_buffer = None
+                state.stream_connected = False
+            add_log(f"[VIDEO] ⏸️ No viewers for {state.stream_idle_grace:.0f}s, pausing stream")
+
 def video_manager_thread():
     """Manages the video stream status and reads frames from the video process."""
     add_log("Video Manager Thread Started...")
@@ -730,24 +803,69 @@ def video_manager_thread():
         try:
             while not video_log_queue.empty():
                 msg = video_log_queue.get_nowait()
-                add_log(msg)
+                add_log(msg, source='VIDEO')
         except:
             pass
+        update_stream_demand()
         time.sleep(0.5)
 
     video_cmd_queue.put((CMD_EXIT, None))
     add_log("Video Manager Stopped")
 
+def cooperative_get(q, timeout):
+    """
+    Blocking get on a multiprocessing queue that also works under gevent / eventlet.
+
+    A plain get(timeout) can block inside the OS (e.g. WaitForMultipleObjects on Windows)
+    and freeze the whole event loop, so async modes poll with a cooperative sleep instead.
+    """
+    if SERVER_MODE == 'threading':
+        return q.get(timeout=timeout)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return q.get_nowait()
+        except queue.Empty:
+            if time.time() >= deadline:
+                raise
+            socketio.sleep(0.005)
+
+def offload(fn, *args):
+    """
+    Run CPU-bound work (cv2 transcode, JPEG probe) off the event loop.
+
+    In gevent / eventlet mode a request greenlet doing a long cv2 call stalls every other
+    greenlet, control requests included; the work goes to the hub's native thread pool instead.
+    """
+    if SERVER_MODE == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+    if SERVER_MODE == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
 def frame_receiver_thread():
     """Reads JPEG bytes from the video process queue."""
     log_counter = 0
     print("[DEBUG] Frame Receiver Thread Started")
     while state.is_running:
         try:
-            frame_bytes = video_frame_queue.get(timeout=0.1)
-            with state.frame_lock:
+            seq, captured_at, frame_bytes = cooperative_get(video_frame_queue, 0.1)
+            # [Deadline] Frame aged out while crossing the process boundary
+            if state.frame_deadline.expired('publish', captured_at):
+                continue
+            if isinstance(frame_bytes, int):
+                # Ring slot index; None if the slot was already overwritten by a newer frame
+                frame_bytes = frame_ring.read(frame_bytes, seq) if frame_ring else None
+                if frame_bytes is None:
+                    continue
+            with state.frame_cond:
                 state.frame_buffer = frame_bytes
+                state.frame_seq = seq
+                state.frame_time = captured_at
                 state.stream_connected = True
+                state.frame_cond.notify_all()
             
             log_counter += 1
             if log_counter % 50 == 0:
@@ -759,34 +877,80 @@ def frame_receiver_thread():
         except Exception as e:
             print(f"Frame Receive Error: {e}")
 
-def generate_frames():
-    """Flask Stream Generator (reads raw JPEG bytes from buffer)"""
+def generate_frames(profile=None, adaptive=None):
+    """Flask Stream Generator (reads raw JPEG bytes from buffer)
+
+    ``profile`` (StreamProfile) throttles / downscales the stream for this client;
+    transcoded frames are shared with every client on the same profile.
+    ``adaptive`` (AdaptiveQuality) picks the quality rung from how long each yield takes to drain.
+    """
+    profile = profile or StreamProfile()
     no_signal_frame_bytes = None
     frame_counter = 0
-    print("[DEBUG] generate_frames generator started")
-    
-    while state.is_running:
-        frame_bytes = None
-        with state.frame_lock:
-            if state.frame_buffer is not None:
+    last_seq = None
+    last_slot = None
+    source_width = None
+    print(f"[DEBUG] generate_frames generator started (profile: {profile.label()}, adaptive: {adaptive is not None})")
+    with state.stream_demand_lock:
+        state.stream_viewers += 1
+        if adaptive is not None:
+            state.stream_clients.add(adaptive)
+    update_stream_demand()
+    try:
+        # Each part is followed by the next boundary so browsers show it without waiting for the next frame
+        yield b'--frame\r\n'
+        while state.is_running:
+            with state.frame_cond:
+                # Sleep until the receiver publishes a new frame (no polling)
+                state.frame_cond.wait_for(
+                    lambda: state.frame_buffer is not None and state.frame_seq != last_seq, timeout=0.5)
                 frame_bytes = state.frame_buffer
+                seq = state.frame_seq
+                frame_time = state.frame_time
         
-        if frame_bytes is None:
-            if no_signal_frame_bytes is None:
-                no_signal_frame = create_no_signal_frame()
-                ret, buffer = cv2.imencode('.jpg', no_signal_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                if ret:
-                    no_signal_frame_bytes = buffer.tobytes()
-            frame_bytes = no_signal_frame_bytes
-        
-        if frame_bytes:
-            frame_counter += 1
-            if frame_counter % 50 == 0:
-                pass # print(f"[DEBUG] generate_frames yielding frame {frame_counter}")
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            if frame_bytes is None:
+                if no_signal_frame_bytes is None:
+                    no_signal_frame = create_no_signal_frame()
+                    ret, buffer = cv2.imencode('.jpg', no_signal_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                    if ret:
+                        no_signal_frame_bytes = buffer.tobytes()
+                frame_bytes = no_signal_frame_bytes
+                last_seq = None
+            elif seq == last_seq:
+                continue  # No new frame within the timeout
+            else:
+                last_seq = seq
+                # [Profile] Keep one frame per 1/fps slot, aligned on capture time across clients
+                slot = fps_slot(frame_time, profile.fps)
+                if slot is not None and slot == last_slot:
+                    continue
+                last_slot = slot
+                if adaptive is not None:
+                    if adaptive.rung and source_width is None:
+                        try:
+                            source_width = offload(probe_jpeg, frame_bytes).width
+                        except JpegError:
+                            pass
+                    frame_profile = adaptive.profile(profile, source_width)
+                else:
+                    frame_profile = profile
+                frame_bytes = profile_cache.get(frame_profile, seq, frame_bytes)
         
-        time.sleep(0.03)
+            if frame_bytes:
+                frame_counter += 1
+                if frame_counter % 50 == 0:
+                    pass # print(f"[DEBUG] generate_frames yielding frame {frame_counter}")
+                sent_at = time.time()
+                yield (b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n--frame\r\n')
+                # [Adaptive] The server blocks on a full send buffer, so this is the frame's queueing delay
+                if adaptive is not None and adaptive.observe(len(frame_bytes), time.time() - sent_at):
+                    source_width = None  # Re-probe in case the camera resolution changed
+    finally:
+        # Runs when the browser closes the connection (GeneratorExit)
+        with state.stream_demand_lock:
+            state.stream_viewers -= 1
+            state.stream_clients.discard(adaptive)
+            state.stream_idle_since = time.time()
 
 def create_no_signal_frame():
     import numpy as np
@@ -797,177 +961,165 @@ def create_no_signal_frame():
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
     return frame
 
-def udp_sensor_thread():
-    """Listens for Sensor Data from ESP12F (or forwarded) on UDP 4211"""
-    add_log("UDP Sensor Listener Started (Port 4211)...")
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    try:
-        # Bind to all interfaces to catch broadcasts or direct packets
-        sock.bind(("0.0.0.0", UDP_DIST_PORT))
-    except Exception as e:
-        add_log(f"[UDP SENSOR] Bind failed: {e}")
-        return
+status_tracker = StatusTracker(state.log_ring.since)
 
-    sock.settimeout(1.0)
+def post_event(event, data, to=None):
+    """Queue a server -> browser event; never blocks on browser I/O."""
+    ws_outbox.put(OutboxEvent(event, data, to))
 
+def socket_emitter_thread():
+    """
+    The only place that calls socketio.emit.
+
+    Drains everything queued since the last pass, keeps just the newest controller_data,
+    and broadcasts each event once (python-socketio encodes a broadcast packet once for all clients).
+    """
     while state.is_running:
         try:
-            data, addr = sock.recvfrom(1024)
-            message = data.decode(errors="ignore").strip()
-            try:
-                # 1. Try simple float (Legacy)
-                dist = float(message)
-                state.radar_dist = dist
-            except ValueError:
-                # 2. Try JSON (New Format with Vibration)
-                try:
-                    sensor_data = json.loads(message)
-                    
-                    if "d" in sensor_data:
-                         state.radar_dist = float(sensor_data["d"])
-                         
-                    if "v" in sensor_data:
-                         # Store Vibration State in SystemState (need to add attrs if missing)
-                         if not hasattr(state, 'radar_vib'): state.radar_vib = 0
-                         state.radar_vib = int(sensor_data["v"])
-                         
-                    # Log significant events? Or just let UI poll.
-                    
-                except:
-                    pass
-        except socket.timeout:
+            batch = [cooperative_get(ws_outbox, 0.5)]
+        except queue.Empty:
             continue
-        except Exception as e:
-            add_log(f"[UDP SENSOR] Error: {e}")
-            time.sleep(1)
+        while True:
+            try:
+                batch.append(ws_outbox.get_nowait())
+            except queue.Empty:
+                break
+        for item in coalesce(batch):
+            try:
+                socketio.emit(item.event, item.data, to=item.to)
+            except Exception as e:
+                print(f"[OUTBOX] Emit {item.event} failed: {e}")
+
+def status_snapshot():
+    return {
+        "ip": state.current_ip,
+        # Map Arm IP to 'car_ip' for UI display (since UI expects car_ip for Control status)
+        "car_ip": state.arm_ip or state.car_ip, 
+        "camera_ip": state.camera_ip,
+        "video_url": state.video_url,
+        "dist": state.radar_dist,
+        "dist_vib": getattr(state, 'radar_vib', 0), # [NEW] Vibration
+        "stream_connected": state.stream_connected,
+        "ai_status": state.ai_enabled
+    }
 
 def status_push_thread():
-    """Background thread to push system status via WebSocket"""
+    """
+    Background thread to push system status via WebSocket.
+
+    Compares the status once per coalescing window and broadcasts only changed fields
+    plus new log lines; nothing is sent while the status is steady.
+    """
     add_log("Status Push Thread Started...")
+    interval = config.STATUS_COALESCE_MS / 1000.0
     while state.is_running:
         try:
-            status_data = {
-                "ip": state.current_ip,
-                # Map Arm IP to 'car_ip' for UI display (since UI expects car_ip for Control status)
-                "car_ip": state.arm_ip or state.car_ip, 
-                "camera_ip": state.camera_ip,
-                "video_url": state.video_url,
-                "dist": state.radar_dist,
-                "dist_vib": getattr(state, 'radar_vib', 0), # [NEW] Vibration
-                "logs": state.logs[-30:],
-                "stream_connected": state.stream_connected,
-                "ai_status": state.ai_enabled
-            }
-            socketio.emit('status_update', status_data)
+            delta = status_tracker.diff(status_snapshot())
+            if delta is not None:
+                post_event('status_update', delta)
         except Exception as e:
             print(f"[STATUS] Push error: {e}")
 
-        time.sleep(2)  # Push every 2 seconds
+        time.sleep(interval)
+
+def _apply_sensor_reading(info):
+    """Radar distance / vibration from an ESP8266 telemetry packet (no logging: it arrives at 10 Hz)."""
+    if "d" in info:
+        state.radar_dist = float(info["d"])
+    if "v" in info:
+        state.radar_vib = int(info["v"])
+
+def _on_sensor_packet(data, addr):
+    info = json.loads(data)
+    if isinstance(info, dict):
+        _apply_sensor_reading(info)
+
+def _on_distance_text(data, addr):
+    # Legacy plain-text "D:123.4"
+    state.radar_dist = float(data[2:].decode('ascii', errors='ignore').strip())
+
+# Every car / arm that beacons, keyed by device ID; sessions follow only the bound one per type
+device_registry = DeviceRegistry(ttl=config.DEVICE_TTL_S,
+                                 preferred={"car": config.CAR_DEVICE_ID, "arm": config.ARM_DEVICE_ID})
+
+def _sync_bound_device(device_type):
+    """Point the video / control (car) or arm session at the bound device if its address changed."""
+    device = device_registry.bound(device_type)
+    if device is None:
+        if device_type == "arm" and state.arm_ip:
+            # Bound arm went silent: stop unicasting to a dead address, broadcast until it beacons again
+            print(f"[DISCOVERY] 🦾 Robot Arm at {state.arm_ip} offline, falling back to broadcast")
+            state.arm_ip = None
+            state.arm_stream.reset()
+        return
+    if device_type == "car" and state.camera_ip != device.address:
+        # A replay source stays in place; only control follows the car
+        _apply_camera_ip(device.address, stream_url=getattr(config, "STREAM_REPLAY_URL", None),
+                         prefix=f"[DISCOVERY] 🎥 {device.id}: ", interface=device.interface)
+    elif device_type == "arm" and state.arm_ip != device.address:
+        print(f"[DISCOVERY] 🦾 Robot Arm {device.id} at {device.address}")
+        state.arm_ip = device.address
+        state.arm_stream.reset()  # Resend the current target to the new address
+
+def _observe_device(device_type, device_id, address, capabilities=None):
+    device, event = device_registry.observe(device_id, device_type, address, capabilities)
+    if event:
+        # Only on first sight / address change: psutil walks every interface
+        device.interface = find_reachable_interface(address)
+        print(f"[DISCOVERY] {device_type} {device_id} {event} at {address}")
+    _sync_bound_device(device_type)
+
+def _on_arm_beacon(data, addr):
+    # Simple Beacon from the ESP8266 arm firmware: the sender address is the arm (no ID, so key by address)
+    _observe_device("arm", f"esp8266-arm@{addr[0]}", addr[0])
+
+def _on_json_beacon(data, addr):
+    # Expecting JSON: {"device": "esp32-s3-car", "id": "car-a1b2c3", "ip": "192.168.x.x", "caps": [...]}
+    info = json.loads(data)
+    if not isinstance(info, dict):
+        return
+    # Telemetry may share the packet (key order is not guaranteed on MicroPython)
+    _apply_sensor_reading(info)
+    if "ip" not in info:
+        return
 
-def discovery_listener_thread():
-    """Listens for UDP Broadcasts from ESP32 to auto-configure IP"""
+    remote_ip = info["ip"]
+    device = info.get("device", "esp32-s3-car")
+    device_type = "arm" if device == "esp8266-arm" else "car"  # Legacy: anything else is the camera car
+    # Older firmware sends no ID: fall back to the address
+    device_id = str(info.get("id") or f"{device}@{remote_ip}")
+    _observe_device(device_type, device_id, remote_ip, info.get("caps"))
+
+# One reactor for every inbound UDP packet; routes are matched on the first bytes, in order
+udp_reactor = UdpReactor(log_callback=add_log)
+udp_reactor.register('sensor', _on_sensor_packet, prefix=b'{"d"')
+udp_reactor.register('beacon', _on_json_beacon, prefix=b'{')
+udp_reactor.register('arm_beacon', _on_arm_beacon, prefix=b'ESP8266_ARM')
+udp_reactor.register('distance_text', _on_distance_text, prefix=b'D:')
+udp_reactor.register('arm_echo', lambda data, addr: None, prefix=arm_protocol.MAGIC)  # Our own arm broadcasts on 4211
+
+def udp_ingest_thread():
+    """Receives discovery beacons and sensor telemetry for both UDP ports (see udp_reactor)"""
     PORTS = [config.CAMERA_DISCOVERY_PORT, config.ARM_DISCOVERY_PORT]
-    add_log(f"Discovery Listener Started on Ports {PORTS}...")
-
-    sockets = []
+    add_log(f"UDP Ingest Started on Ports {PORTS}...")
 
     # 1. Bind to 0.0.0.0 for EACH Port
     for port in PORTS:
-        try:
-            sock_all = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock_all.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock_all.bind(("0.0.0.0", port))
-            sock_all.setblocking(False)
-            sockets.append(sock_all)
-        except Exception as e:
-            add_log(f"[DISCOVERY] Bind 0.0.0.0:{port} failed: {e}")
+        udp_reactor.bind("0.0.0.0", port)
 
     # 2. Bind to Internet Net IP to fix Windows Dual-NIC issues
     if state.internet_net_ip:
         for port in PORTS:
-            try:
-                sock_specific = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock_specific.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                sock_specific.bind((state.internet_net_ip, port))
-                sock_specific.setblocking(False)
-                sockets.append(sock_specific)
+            if udp_reactor.bind(state.internet_net_ip, port):
                 add_log(f"[DISCOVERY] Binding {state.internet_net_ip}:{port}")
-            except Exception as e:
-                pass
 
-    if not sockets:
+    if not udp_reactor.sockets:
         add_log("[DISCOVERY] No sockets created. Discovery disabled.")
         return
 
-    while state.is_running:
-        try:
-            readable, _, _ = select.select(sockets, [], [], 1.0)
-
-            for s in readable:
-                try:
-                    data, addr = s.recvfrom(1024)
-                    msg = data.decode('utf-8', errors='ignore')
-                    
-                    # [NEW] Support Simple Beacon from MicroPython
-                    if "ESP8266_ARM" in msg:
-                        remote_ip = addr[0]
-                        if state.arm_ip != remote_ip:
-                            print(f"[DISCOVERY] 🦾 Robot Arm Found at {remote_ip} (Beacon)")
-                            state.arm_ip = remote_ip
-                        continue
-
-                    # Expecting JSON: {"device": "esp32-s3-car", "ip": "192.168.x.x"}
-                    if "{" in msg:
-                        try:
-                            info = json.loads(msg)
-                            
-                            # [Telemetry] Sensor Data (Prioritized)
-                            if "d" in info: 
-                                state.radar_dist = float(info["d"])
-                                print(f"📡 [SENSOR] D:{state.radar_dist:.1f} V:{info.get('v',0)}")
-                            if "v" in info: state.radar_vib = int(info.get("v", 0))
-
-                            if "ip" in info:
-                                # Check if this is the Camera or Arm
-                                # Currently we assume Camera sends 'ip' but Arm also sends 'ip'
-                                # Arm distinguishes itself via 'device' key
-                                
-                                remote_ip = info["ip"]
-                                
-                                if "device" in info and info["device"] == "esp8266-arm":
-                                    # Found the Robot Arm
-                                    if state.arm_ip != remote_ip:
-                                        print(f"[DISCOVERY] 🦾 Robot Arm Found at {remote_ip}")
-                                        state.arm_ip = remote_ip
-                                else:
-                                    # Assume it's the Camera (Legacy behavior)
-                                    if state.camera_ip != remote_ip:
-                                        print(f"[DISCOVERY] 🎥 ESP32 Camera Found at {remote_ip}")
-                                        state.camera_ip = remote_ip
-                                        
-                                        # Trigger WebSocket Reconnection
-                                        if state.ws_client:
-                                            state.ws_client.last_connect_attempt = 0 
-                                            
-                            # Helper for Telemetry (Optional)
-                            if "d" in info:
-                                 state.radar_dist = float(info["d"])
-                            if "v" in info:
-                                 if not hasattr(state, 'radar_vib'): state.radar_vib = 0
-                                 state.radar_vib = int(info["v"])
-
-                            # if "dist" in data: ...
-                        except json.JSONDecodeError:
-                            pass
-                except socket.error:
-                    pass
-        except Exception as e:
-            add_log(f"[DISCOVERY] Error: {e}")
-            time.sleep(1)
-
-    for s in sockets:
-        s.close()
+    # A silent device sends no beacon to react to, so the TTL is also checked between polls
+    udp_reactor.run(lambda: state.is_running, tick=lambda: _sync_bound_device("arm"))
+    udp_reactor.close()
 
 def xbox_controller_thread():
     add_log("Xbox Controller Thread Started...")
@@ -1082,7 +1234,6 @@ def xbox_controller_thread():
             # Initialize static vars for arm state if not exists
             if not hasattr(state, 'arm_angles'):
                 state.arm_angles = {'b': 90.0, 's': 90.0, 'e': 90.0, 'g': 50.0}
-                state.last_arm_send = 0
                 state.gripper_pressed = False
 
             # === HYBRID CONTROL LOGIC ===
@@ -1195,23 +1346,20 @@ def xbox_controller_thread():
                 state.gripper_pressed = False
 
 
-            # Send Packet (Throttled to 10Hz to save bandwidth, or if changed)
-            now = time.time()
-            if now - state.last_arm_send > 0.1: # 10Hz
-                send_robot_packet(0x03, '<ffff', (
-                    state.arm_angles['b'], 
-                    state.arm_angles['s'], 
-                    state.arm_angles['e'], 
-                    state.arm_angles['g']
-                ))
-                state.last_arm_send = now
+            # Send Packet only if a joint moved (loop rate while moving, keepalive when still)
+            send_arm_angles((
+                state.arm_angles['b'],
+                state.arm_angles['s'],
+                state.arm_angles['e'],
+                state.arm_angles['g']
+            ), throttle=True)
 
             # Emit to UI
             try:
                 controller_state_with_cmd = dict(controller_state)
                 controller_state_with_cmd["cmd"] = f"L:{current_pwm[0]} R:{current_pwm[1]}"
                 controller_state_with_cmd["source"] = source
-                socketio.emit('controller_data', controller_state_with_cmd)
+                post_event('controller_data', controller_state_with_cmd)
             except Exception:
                 pass
 
@@ -1234,9 +1382,81 @@ def xbox_controller_thread():
     
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), 
+    # Optional per-client profile, e.g. /video_feed?fps=10&width=320&q=60
+    profile = parse_profile(request.args)
+    adaptive = None
+    if not profile.transcodes and request.args.get('adaptive') != '0':
+        # [Adaptive] Small send buffer so a slow link blocks our writes instead of queueing seconds of video
+        sock = request.environ.get('werkzeug.socket')
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.STREAM_SNDBUF_BYTES)
+            except OSError:
+                pass
+        adaptive = AdaptiveQuality(target_latency=config.STREAM_TARGET_LATENCY_MS / 1000.0)
+    return Response(generate_frames(profile, adaptive), 
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
+def wait_for_frame(after_seq, timeout):
+    """
+    Wait until a frame other than ``after_seq`` is in the buffer (``None`` = any frame).
+
+    The caller counts as a viewer while waiting, so a paused stream resumes right away;
+    leaving resets the idle timer, which keeps periodic snapshots on a warm stream.
+    Returns (jpeg_bytes, seq, captured_at); jpeg_bytes is None on timeout.
+    """
+    with state.stream_demand_lock:
+        state.stream_viewers += 1
+    update_stream_demand()
+    try:
+        with state.frame_cond:
+            state.frame_cond.wait_for(
+                lambda: not state.is_running or
+                (state.frame_buffer is not None and state.frame_seq != after_seq), timeout=timeout)
+            if state.frame_buffer is None or state.frame_seq == after_seq:
+                return None, state.frame_seq, state.frame_time
+            return state.frame_buffer, state.frame_seq, state.frame_time
+    finally:
+        with state.stream_demand_lock:
+            state.stream_viewers -= 1
+            state.stream_idle_since = time.time()
+
+@app.route('/api/snapshot')
+def api_snapshot():
+    """
+    Latest frame as a single JPEG (no re-encoding), ETag = frame sequence number.
+
+    - If-None-Match with the current ETag -> 304
+    - ?after=<seq> long-polls until a different frame is available (?timeout=, default 10s);
+      if none arrives in time -> 304 with the current ETag
+    """
+    after = request.args.get('after', type=int)
+    timeout = request.args.get('timeout', default=config.SNAPSHOT_LONG_POLL_S, type=float)
+    if after is not None:
+        timeout = max(0.0, min(timeout, config.SNAPSHOT_LONG_POLL_S))
+    else:
+        # Plain snapshot: only wait if the stream has to warm up first
+        timeout = config.SNAPSHOT_FIRST_FRAME_WAIT_S
+
+    frame_bytes, seq, captured_at = wait_for_frame(after, timeout)
+    etag = str(seq)
+    if frame_bytes is None:
+        if after is None or not seq:
+            response = jsonify({"error": "No frame available", "stream_paused": state.stream_paused})
+            response.status_code = 503
+            response.headers["Retry-After"] = "1"
+            return response
+        response = Response(status=304)
+    elif request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(frame_bytes, mimetype='image/jpeg')
+        response.headers["X-Frame-Timestamp"] = f"{captured_at:.3f}"
+    response.set_etag(etag)
+    response.headers["X-Frame-Seq"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @app.route('/robot_arm_simulator.html')
 def robot_simulator():
     """Serve the simulator with cache disabled"""
@@ -1258,6 +1478,13 @@ def favicon():
 @socketio.on('connect')
 def handle_connect():
     add_log('Client connected via WebSocket')
+    # Deltas only make sense on top of a full status (queued behind earlier deltas, so ordering holds)
+    post_event('status_update', status_tracker.full(), to=request.sid)
+
+@socketio.on('status_sync')
+def handle_status_sync(data=None):
+    """Client missed a delta (version gap) and asks for the full status again."""
+    post_event('status_update', status_tracker.full(), to=request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -1285,7 +1512,7 @@ def handle_control_command(data):
         state.last_api_control_time = time.time()
 
         # Send to ESP32
-        # Use existing function (it handles threaded requests)
+        # Queued on the control dispatcher, returns immediately
         send_control_command(int(left), int(right))
         
     except Exception as e:
@@ -1313,8 +1540,7 @@ def handle_arm_command(data):
         if state.arm_ip:
             try:
                 msg = json.dumps({"base": int(base), "shoulder": int(shoulder), "elbow": int(elbow)})
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.sendto(msg.encode(), (state.arm_ip, 4211))
+                arm_sender.send(msg.encode(), state.arm_ip)
             except Exception as e:
                 print(f"[WS] Arm UDP Fail: {e}")
 
@@ -1337,11 +1563,42 @@ def api_status():
         "video_url": state.video_url,
         "dist": state.radar_dist,
         "dist_vib": state.radar_vib,
-        "logs": state.logs[-30:],
+        "logs": state.log_ring.tail(30),
         "stream_connected": state.stream_connected,
-        "ai_status": state.ai_enabled
+        "ai_status": state.ai_enabled,
+        "frame_drops": state.frame_deadline.stats(),
+        "stream_viewers": state.stream_viewers,
+        "stream_paused": state.stream_paused,
+        "stream_profiles": profile_cache.stats(),
+        "stream_clients": [client.stats() for client in list(state.stream_clients)],
+        "control": control_dispatcher.stats(),
+        "ws_control": state.ws_client.stats() if state.ws_client else None,
+        "udp_control": state.udp_client.stats() if state.udp_client else None,
+        "arm_link": arm_sender.stats(),
+        "arm_stream": state.arm_stream.stats(),
+        "udp_ingest": udp_reactor.stats(),
+        "devices": device_registry.snapshot()["bindings"]
     })
 
+@app.route('/api/devices')
+def api_devices():
+    """Every device seen on the network, its liveness and which one each session is bound to."""
+    return jsonify(device_registry.snapshot())
+
+@app.route('/api/devices/bind', methods=['POST'])
+def api_devices_bind():
+    """
+    Bind the car / arm session to a device ID.
+    Input: JSON {"type": "car" | "arm", "id": "car-a1b2c3"}  (id null = follow the first device seen)
+    """
+    data = request.get_json(silent=True) or {}
+    device_type = data.get("type")
+    if device_type not in ("car", "arm"):
+        return jsonify({"status": "error", "message": "type must be 'car' or 'arm'"}), 400
+    device_registry.bind(device_type, data.get("id"))
+    _sync_bound_device(device_type)
+    return jsonify({"status": "ok", **device_registry.snapshot()})
+
 @app.route('/api/toggle_ai', methods=['POST'])
 def toggle_ai():
     if not YOLO_AVAILABLE:
@@ -1352,6 +1609,7 @@ def toggle_ai():
     # Notify Process
     if video_cmd_queue:
         video_cmd_queue.put((CMD_SET_AI, state.ai_enabled))
+        update_stream_demand()  # AI needs frames even with no viewer
 
     status_str = "ACTIVATED" if state.ai_enabled else "DEACTIVATED"
     add_log(f"AI HUD {status_str}")
@@ -1418,6 +1676,21 @@ def api_camera_settings():
         if var is None or val is None:
             return jsonify({"error": "Missing var or val"}), 400
 
+        if var == 'auto_rate':
+            # Handled on the PC: (re)enable the closed-loop camera rate control
+            enabled = str(val).lower() in ('1', 'true', 'on')
+            state.camera_rate_control = enabled
+            if video_cmd_queue:
+                video_cmd_queue.put((CMD_RATE_CONTROL, enabled))
+            add_log(f"[Control] Camera auto rate {'ON' if enabled else 'OFF'}")
+            return jsonify({"status": "ok", "var": var, "val": int(enabled)})
+
+        if var in ('framesize', 'quality') and state.camera_rate_control and video_cmd_queue:
+            # A manual setting wins over the automatic controller
+            state.camera_rate_control = False
+            video_cmd_queue.put((CMD_RATE_CONTROL, False))
+            add_log("[Control] Manual camera setting, auto rate control paused")
+
         try:
             # Forward to ESP32 /control?var=X&val=Y
             url = f"http://{target_ip}/control"
@@ -1488,50 +1761,29 @@ def api_control():
 # === Robot Arm UDP Logic (v2.0) ===
 def send_robot_packet(cmd_id, payload_fmt, args):
     """
-    Constructs and sends a v2.0 Binary Packet.
+    Constructs and sends a v2.0 Binary Packet (see arm_protocol).
+    Unicast to state.arm_ip when discovered, broadcast otherwise.
     """
     try:
-        # 1. Construct Payload
-        # Support 3 floats (B,S,E) or 4 floats (B,S,E,G)
-        payload = struct.pack(payload_fmt, *args)
-        
-        # 2. Construct Body
-        header = b'RM'
-        body = header + struct.pack('B', cmd_id) + payload
-        
-        # 3. CRC Calculation
-        crc = 0xFFFF
-        for byte in body:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc <<= 1
-                crc &= 0xFFFF
-        
-        # 4. Final Packet
-        packet = body + struct.pack('<H', crc)
-        
-        # 5. Send
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        target_ip = state.arm_ip if hasattr(state, 'arm_ip') and state.arm_ip else None
-        
-        # [Broadcast Fallback]
-        # Since we don't have robust discovery yet, always broadcast OR use specific IP
-        # If user knows IP, they should set it or we detect it.
-        # For now, let's try strict IP first, then fallback to broadcast if configured?
-        # Actually, broadcast is safer for immediate 'it just works' experience in private net.
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(packet, ('<broadcast>', UDP_DIST_PORT))
-        # if target_ip:
-        #     sock.sendto(packet, (target_ip, UDP_DIST_PORT))
-        
-        return True
+        packet = arm_protocol.encode_packet(cmd_id, struct.pack(payload_fmt, *args))
+        return arm_sender.send(packet, state.arm_ip)
     except Exception as e:
         print(f"[ARM] Send Error: {e}")
         return False
 
+def send_arm_angles(angles, throttle=False):
+    """
+    Send (base, shoulder, elbow, gripper) if it differs from the last sent target (see arm_stream).
+    Only a loop that offers again next tick should pass throttle=True.
+    Returns None when skipped as a duplicate, else whether the packet went out.
+    """
+    if state.arm_stream.offer(angles, throttle=throttle) is None:
+        return None
+    sent = send_robot_packet(arm_protocol.CMD_SET_ANGLES, '<ffff', angles)
+    if not sent:
+        state.arm_stream.reset()  # Never went out: don't dedupe the next offer against it
+    return sent
+
 @app.route('/api/arm', methods=['POST'])
 def handle_arm_command_api():
     """
@@ -1551,7 +1803,10 @@ def handle_arm_command_api():
         # Send 4 Floats (Base, Shoulder, Elbow, Gripper)
         # We use strict '<ffff' format for 4 arguments
         # FW must be updated to accept 16 bytes payload
-        if send_robot_packet(0x03, '<ffff', (base, shoulder, elbow, gripper)):
+        sent = send_arm_angles((base, shoulder, elbow, gripper))
+        if sent is None:
+             return jsonify({"status": "ok", "proto": "v2.0", "deduplicated": True})
+        if sent:
              return jsonify({"status": "ok", "proto": "v2.0"})
         else:
              return jsonify({"status": "error", "message": "Send Failed"}), 500
@@ -1580,7 +1835,7 @@ def handle_arm_command_ws(json_data):
         
         state.last_api_control_time = time.time()
         
-        send_robot_packet(0x03, '<ffff', (base, shoulder, elbow, gripper))
+        send_arm_angles((base, shoulder, elbow, gripper))
         
     except Exception as e:
         print(f"[WS] 💥 Error in arm_command: {e}")
@@ -1609,22 +1864,20 @@ def index():
     return render_template('index.html', version=ver)
 
 if __name__ == '__main__':
-    # Add Retry Adapter
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=0.1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    state.control_session.mount("http://", adapter)
-    
     print("[SYSTEM] Starting PC Client Server...")
     print(f"[SYSTEM] Please open: http://localhost:{config.WEB_PORT}")
+    socketio.start_background_task(log_output_thread)
 
     # Initialize Multiprocessing Queues
     video_cmd_queue = Queue()
     video_frame_queue = Queue(maxsize=3) # Limit buffer to reduce latency
+    try:
+        # Slots > queue size + 1, so a queued slot is never overwritten before it is read
+        frame_ring = FrameRing(slots=6, slot_size=config.FRAME_RING_SLOT_SIZE)
+        state.frame_ring_spec = frame_ring.spec
+    except Exception as e:
+        print(f"[INIT] ⚠️ Shared frame ring unavailable, frames go through the queue: {e}")
+        frame_ring = None
     video_log_queue = Queue()
 
     # Start Video Process (Optional - skip if camera unavailable)
@@ -1647,23 +1900,25 @@ if __name__ == '__main__':
         print("[INIT] Video process disabled (DISABLE_VIDEO=1)")
 
     # Threads
-    # threading.Thread(target=udp_sensor_thread, daemon=True).start() # Merged into discovery_listener_thread
-    threading.Thread(target=xbox_controller_thread, daemon=True).start()
+    # Background loops run as socketio tasks: OS threads in threading mode, greenlets under gevent / eventlet
+    socketio.start_background_task(xbox_controller_thread)
     
     
     # Only start video threads if video process is running
     if p:
-        threading.Thread(target=video_manager_thread, daemon=True).start()
-        threading.Thread(target=frame_receiver_thread, daemon=True).start()
+        socketio.start_background_task(video_manager_thread)
+        socketio.start_background_task(frame_receiver_thread)
     
     # ⭐ Start Motion Control Thread (REVERTED - Moved to Firmware)
     # threading.Thread(target=motion_control_thread, daemon=True).start()
     
-    threading.Thread(target=status_push_thread, daemon=True).start()
-    threading.Thread(target=discovery_listener_thread, daemon=True).start()
+    socketio.start_background_task(socket_emitter_thread)
+    control_dispatcher.start()
+    socketio.start_background_task(status_push_thread)
+    socketio.start_background_task(udp_ingest_thread)
 
     print("=" * 60)
-    print(f"🚀 Web Server: http://127.0.0.1:{config.WEB_PORT}")
+    print(f"🚀 Web Server: http://127.0.0.1:{config.WEB_PORT} ({SERVER_MODE} mode)")
     print(f"📦 YOLO: {YOLO_AVAILABLE}")
     print(f"🎮 Xbox: {'ACTIVE' if pygame.joystick.get_count() > 0 else 'NOT FOUND'}")
     state.print_network_summary()
@@ -1675,13 +1930,14 @@ if __name__ == '__main__':
         # [FIX] Disable debug mode to prevent WinError 10038 socket errors
         # The reloader causes socket issues when combined with multiprocessing
         # For development, manual restart is acceptable
+        run_options = {'allow_unsafe_werkzeug': True} if SERVER_MODE == 'threading' else {}
         socketio.run(
             app, 
             host=config.WEB_HOST, 
             port=config.WEB_PORT, 
             debug=False,  # Disabled to prevent socket errors
             use_reloader=False,  # Prevent file watching socket issues
-            allow_unsafe_werkzeug=True
+            **run_options
         )
     except KeyboardInterrupt:
         print("\n[INIT] 🛑 Shutting down gracefully...")
@@ -1696,4 +1952,7 @@ if __name__ == '__main__':
         print("[INIT] This is usually harmless. Server stopped.")
         state.is_running = False
         if p and video_cmd_queue:
-            video_cmd_queue.put((CMD_EXIT, None))
\ No newline at end of file
+            video_cmd_queue.put((CMD_EXIT, None))
+    finally:
+        if frame_ring:
+            frame_ring.close()  # Unlink the shared memory segment